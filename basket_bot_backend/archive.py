@@ -0,0 +1,143 @@
+"""
+Archiwizacja meczów: zakończone i porzucone mecze (z uczestnikami) trafiają
+z `matches`/`match_participants` do tabel *_archive. Gorące tabele - a więc
+listy, join i ich indeksy - mają rozmiar zbliżony do liczby aktualnych meczów.
+
+Do archiwum idzie mecz, który:
+- skończył się (ends_at) ponad ARCHIVE_GRACE_HOURS temu, albo
+- nie ma terminu i powstał ponad ARCHIVE_STALE_DAYS temu.
+Mecze z niewysłanymi powiadomieniami (notification_outbox) czekają na wysyłkę.
+
+Przenosimy paczkami po ARCHIVE_BATCH meczów, każda w osobnej transakcji.
+Paczkę "blokuje" warunkowy UPDATE ... RETURNING (jak w matchmaking.py):
+równoległy join albo czeka na commit i nie znajduje już meczu, albo
+zdąży przed nami i jego uczestnik zostanie skopiowany razem z meczem.
+
+    python -m basket_bot_backend.archive        # jeden przebieg (np. z crona)
+"""
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, and_, or_, exists, literal, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal, dialect_insert
+from .models import Match, MatchParticipant, MatchArchive, MatchParticipantArchive, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "500"))
+ARCHIVE_MAX_SECONDS = float(os.getenv("ARCHIVE_MAX_SECONDS", "30"))
+ARCHIVE_GRACE_HOURS = float(os.getenv("ARCHIVE_GRACE_HOURS", "24"))
+ARCHIVE_STALE_DAYS = float(os.getenv("ARCHIVE_STALE_DAYS", "30"))
+# 0 = zadanie uruchamiane tylko z zewnątrz (CLI / cron)
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+
+MATCH_COLUMNS = [c.name for c in Match.__table__.columns]
+PARTICIPANT_COLUMNS = [c.name for c in MatchParticipantArchive.__table__.columns]
+
+
+@dataclass
+class ArchiveReport:
+    matches: int = 0
+    participants: int = 0
+    batches: int = 0
+    timed_out: bool = False
+
+
+def archivable(now: datetime):
+    """Warunek WHERE na `matches` dla meczów do przeniesienia."""
+    return and_(
+        or_(
+            Match.ends_at < now - timedelta(hours=ARCHIVE_GRACE_HOURS),
+            and_(Match.starts_at.is_(None), Match.created_at < now - timedelta(days=ARCHIVE_STALE_DAYS)),
+        ),
+        ~exists().where(NotificationOutbox.match_id == Match.match_id),
+    )
+
+
+async def archive_batch(db: AsyncSession, now: datetime, limit: int = ARCHIVE_BATCH) -> tuple[int, int]:
+    """Przenosi do `limit` meczów w bieżącej transakcji; zwraca (mecze, uczestnicy)."""
+    candidates = select(Match.match_id).where(archivable(now)).order_by(Match.match_id).limit(limit)
+    # Pusty UPDATE zakłada blokady wierszy; updated_at podany jawnie, żeby nie zadziałał onupdate
+    match_ids = list(await db.scalars(
+        update(Match)
+        .where(Match.match_id.in_(candidates.scalar_subquery()), archivable(now))
+        .values(updated_at=Match.updated_at)
+        .returning(Match.match_id)
+    ))
+    if not match_ids:
+        return 0, 0
+
+    # Id użyte ponownie przed migracją 0011 (SQLite bez AUTOINCREMENT) już są w archiwum -
+    # zostaje pierwsza kopia, zamiast wywracać każdy kolejny przebieg na UNIQUE
+    await db.execute(
+        dialect_insert(db, MatchArchive.__table__).from_select(
+            MATCH_COLUMNS + ["archived_at"],
+            select(*Match.__table__.c, literal(now, DateTime)).where(Match.match_id.in_(match_ids)),
+        ).on_conflict_do_nothing()
+    )
+    await db.execute(
+        dialect_insert(db, MatchParticipantArchive.__table__).from_select(
+            PARTICIPANT_COLUMNS,
+            select(*[MatchParticipant.__table__.c[name] for name in PARTICIPANT_COLUMNS])
+            .where(MatchParticipant.match_id.in_(match_ids)),
+        ).on_conflict_do_nothing()
+    )
+    participants = await db.execute(delete(MatchParticipant).where(MatchParticipant.match_id.in_(match_ids)))
+    await db.execute(delete(Match).where(Match.match_id.in_(match_ids)))
+    return len(match_ids), participants.rowcount
+
+
+async def run_archive(session_factory=AsyncSessionLocal, max_seconds: float = ARCHIVE_MAX_SECONDS) -> ArchiveReport:
+    """Jeden przebieg: paczki aż do wyczerpania kandydatów albo limitu czasu."""
+    report = ArchiveReport()
+    deadline = time.monotonic() + max_seconds
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        while True:
+            if time.monotonic() > deadline:
+                report.timed_out = True
+                break
+            matches, participants = await archive_batch(db, now)
+            await db.commit()
+            if not matches:
+                break
+            report.matches += matches
+            report.participants += participants
+            report.batches += 1
+
+    if report.matches:
+        logger.info(
+            "Archiwum: %d meczów, %d uczestników w %d paczkach%s",
+            report.matches, report.participants, report.batches, " (limit czasu)" if report.timed_out else "",
+        )
+    return report
+
+
+async def archive_loop(interval: float = ARCHIVE_INTERVAL):
+    """Okresowe przebiegi w procesie aplikacji (gdy ARCHIVE_INTERVAL > 0)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_archive()
+        except Exception:
+            logger.exception("Archiwizacja meczów nie powiodła się")
+
+
+async def main():
+    from .database import dispose_engines
+
+    report = await run_archive()
+    print(
+        f"archived {report.matches} matches, {report.participants} participants "
+        f"in {report.batches} batch(es){' (timed out)' if report.timed_out else ''}"
+    )
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    asyncio.run(main())
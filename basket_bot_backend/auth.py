@@ -1,33 +1,32 @@
 import os
+import time
+import hashlib
+import secrets
 from datetime import datetime, timedelta
 from functools import wraps
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 import jwt
+from .cache import TTLCache, MISSING, profile_cache
+from .database import get_db, dialect_insert
+from .models import User, UsedRefreshToken
+from .schemas import AccountOut
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+ACCESS, REFRESH = "access", "refresh"
 
-security = HTTPBearer()
+# Zweryfikowane tokeny: sha256(token) -> (wallet_address, exp). Każde żądanie z JWT
+# przechodziło przez pełne dekodowanie i HMAC; wpis i tak wygasa razem z tokenem.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
 
-def verify_ton_signature(address: str, message: str, signature: str) -> bool:
-    """
-    Verify TON wallet signature
-    Args:
-        address: TON wallet address
-        message: Original message that was signed
-        signature: The signature from TON wallet
-    Returns:
-        True if signature is valid, False otherwise
-    """
-    try:
-        # Parse the address
-        # In production, implement actual TON signature verification
-        # using tonpy library
-        return True
-    except Exception as e:
-        print(f"Signature verification error: {e}")
-        return False
+security = HTTPBearer()
 
 def create_access_token(wallet_address: str, expires_delta: timedelta = None) -> str:
     """
@@ -44,6 +43,7 @@ def create_access_token(wallet_address: str, expires_delta: timedelta = None) ->
     expire = datetime.utcnow() + expires_delta
     to_encode = {
         "wallet_address": wallet_address,
+        "type": ACCESS,
         "exp": expire,
         "iat": datetime.utcnow()
     }
@@ -51,9 +51,92 @@ def create_access_token(wallet_address: str, expires_delta: timedelta = None) ->
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token(wallet_address: str) -> str:
+    """
+    Create long-lived JWT refresh token (exchanged at /api/auth/refresh for a new pair)
+    Each token is single use: redeem_refresh_token() records its jti, so a copy
+    replayed after the owner refreshed gets 401. If a thief refreshes first, the
+    owner's next refresh fails and they have to log in with the wallet again;
+    the thief's chain of tokens stays valid until it expires (no family revocation).
+    Args:
+        wallet_address: TON wallet address
+    Returns:
+        JWT token
+    """
+    now = datetime.utcnow()
+    to_encode = {
+        "wallet_address": wallet_address,
+        "type": REFRESH,
+        "jti": secrets.token_hex(8),
+        "exp": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "iat": now
+    }
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+async def redeem_refresh_token(db: AsyncSession, token: str) -> str:
+    """
+    Verify a refresh token and mark its jti as used (commit is left to the caller)
+    Args:
+        db: Session of the refresh request
+        token: Encoded refresh JWT
+    Returns:
+        wallet_address from the token
+    Raises:
+        HTTPException if token is invalid, expired or was already exchanged
+    """
+    payload = decode_token(token, REFRESH)
+    jti = payload.get("jti")
+    if not jti:
+        raise _unauthorized("Invalid token")
+
+    now = datetime.utcnow()
+    # Wpisy po terminie nic nie blokują - wygasły token odrzuca już decode_token
+    await db.execute(delete(UsedRefreshToken).where(UsedRefreshToken.expires_at < now))
+    stmt = dialect_insert(db, UsedRefreshToken.__table__).values(
+        jti=jti,
+        wallet_address=payload["wallet_address"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+    )
+    redeemed = await db.scalar(stmt.on_conflict_do_nothing(index_elements=["jti"]).returning(UsedRefreshToken.jti))
+    if redeemed is None:
+        await db.rollback()
+        raise _unauthorized("Refresh token already used")
+    return payload["wallet_address"]
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def decode_token(token: str, token_type: str = ACCESS) -> dict:
+    """
+    Decode and verify JWT of the given type
+    Args:
+        token: Encoded JWT
+        token_type: "access" or "refresh"
+    Returns:
+        Token payload
+    Raises:
+        HTTPException if token is invalid, expired or of another type
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("Token has expired")
+    except jwt.InvalidTokenError:
+        raise _unauthorized("Invalid token")
+    # Tokeny sprzed wprowadzenia refresh nie mają "type" - to zawsze były access tokeny
+    if payload.get("type", ACCESS) != token_type:
+        raise _unauthorized("Invalid token")
+    if payload.get("wallet_address") is None:
+        raise _unauthorized("Could not validate credentials")
+    return payload
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
     """
-    Verify JWT token from request
+    Verify JWT token from request (already verified tokens come from token_cache)
     Args:
         credentials: HTTP Bearer token
     Returns:
@@ -62,27 +145,18 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
         HTTPException if token is invalid
     """
     token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        wallet_address: str = payload.get("wallet_address")
-        if wallet_address is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has expired",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except jwt.InvalidTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    key = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(key)
+    if cached is not MISSING:
+        wallet_address, expires_at = cached
+        if expires_at > time.time():
+            return wallet_address
+        token_cache.delete(key)
+        raise _unauthorized("Token has expired")
+
+    payload = decode_token(token, ACCESS)
+    wallet_address: str = payload["wallet_address"]
+    token_cache.set(key, (wallet_address, payload["exp"]))
     return wallet_address
 
 def get_current_user(wallet_address: str = Depends(verify_token)) -> str:
@@ -94,3 +168,26 @@ def get_current_user(wallet_address: str = Depends(verify_token)) -> str:
         wallet_address
     """
     return wallet_address
+
+async def get_current_account(
+    wallet_address: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+) -> AccountOut | None:
+    """
+    Current user with profile for endpoints that need more than the wallet address.
+    FastAPI resolves it once per request, however many dependencies use it; between
+    requests the snapshot stays in profile_cache until invalidate_profile().
+    Returns:
+        AccountOut, or None if the account no longer exists
+    """
+    cached = profile_cache.get(("wallet", wallet_address))
+    if cached is not MISSING:
+        return cached
+
+    user = await db.scalar(
+        select(User).options(joinedload(User.profile)).where(User.wallet_address == wallet_address)
+    )
+    if user is None:
+        return None
+    account = AccountOut.model_validate(user)
+    profile_cache.set(("wallet", wallet_address), account)
+    return account
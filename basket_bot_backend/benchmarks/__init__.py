@@ -0,0 +1 @@
+# Benchmarki wydajności (uruchamiane ręcznie lub w CI), patrz baselines.json
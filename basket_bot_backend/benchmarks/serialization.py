@@ -0,0 +1,116 @@
+"""
+Koszt serializacji odpowiedzi /api/matches-list (bez bazy i bez sieci).
+
+    python -m basket_bot_backend.benchmarks.serialization
+    python -m basket_bot_backend.benchmarks.serialization --sizes 50,200,1000 --repeat 50
+
+Porównuje dawną ścieżkę (słowniki budowane ręcznie + jsonable_encoder + json.dumps)
+z bieżącą (response_model MatchListResponse + ORJSONResponse), używając tych samych
+funkcji FastAPI, które obsługują prawdziwe żądanie.
+"""
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+
+def make_matches(count: int) -> list:
+    from ..models import Match
+
+    base = datetime(2024, 1, 1)
+    return [
+        Match(
+            match_id=i,
+            organizer_wallet=f"tg_{i}",
+            venue=f"Hala {i % 50}",
+            crowdfund_amount=15,
+            slots_needed=10,
+            current_players=1 + i % 10,
+            # Co drugi mecz z terminem - obie ścieżki muszą tak samo zapisać datetime
+            starts_at=base + timedelta(days=30, hours=i) if i % 2 else None,
+            ends_at=base + timedelta(days=30, hours=i, minutes=90) if i % 2 else None,
+            created_at=base + timedelta(minutes=i),
+            updated_at=base + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+async def legacy_body(matches: list) -> bytes:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    content = {
+        "status": "success",
+        "matches": [
+            {
+                "match_id": m.match_id,
+                "venue": m.venue,
+                "court_id": m.court_id,
+                "starts_at": m.starts_at,
+                "ends_at": m.ends_at,
+                "crowdfund_amount": m.crowdfund_amount,
+                "slots_needed": m.slots_needed,
+                "current_players": m.current_players,
+                "slots_available": m.slots_needed - m.current_players,
+                "organizer_wallet": m.organizer_wallet
+            }
+            for m in matches
+        ],
+        "next_cursor": None
+    }
+    # Bez response_model FastAPI przepuszcza wynik przez jsonable_encoder
+    return JSONResponse(await serialize_response(response_content=content)).body
+
+
+async def typed_body(matches: list, field) -> bytes:
+    from fastapi.responses import ORJSONResponse
+    from fastapi.routing import serialize_response
+    from ..schemas import MatchListResponse
+
+    content = MatchListResponse(matches=matches, next_cursor=None)
+    return ORJSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def run(sizes: list[int], repeat: int) -> dict:
+    import orjson
+    from ..main import app
+
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/api/matches-list")
+    results = {}
+    for size in sizes:
+        matches = make_matches(size)
+        # Obie ścieżki muszą dać ten sam dokument
+        assert orjson.loads(await legacy_body(matches)) == orjson.loads(await typed_body(matches, route.response_field))
+        legacy = await measure(lambda: legacy_body(matches), repeat)
+        typed = await measure(lambda: typed_body(matches, route.response_field), repeat)
+        results[size] = {"legacy_ms": round(legacy, 3), "typed_ms": round(typed, 3)}
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,200,1000,10000")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run([int(s) for s in args.sizes.split(",") if s], args.repeat))
+    print(f"{'matches':>8} {'legacy ms':>10} {'typed ms':>10} {'speedup':>8}")
+    for size, r in results.items():
+        print(f"{size:>8} {r['legacy_ms']:>10.3f} {r['typed_ms']:>10.3f} {r['legacy_ms'] / r['typed_ms']:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Równoległe zapisy do pliku SQLite: domyślny tryb aiosqlite kontra tryb
+strojony z database.py (WAL, busy_timeout, jeden writer, pula czytelników).
+
+    python -m basket_bot_backend.benchmarks.sqlite_concurrency
+    python -m basket_bot_backend.benchmarks.sqlite_concurrency --writers 100 --processes 2
+
+Każdy wirtualny użytkownik zapisuje profile, dołącza do meczów, zakłada mecze
+i czyta profile. `--processes` > 1 uruchamia kilka procesów na tym samym
+pliku (jak kilka workerów uvicorna) - wtedy między procesami działa busy_timeout.
+Liczy się kolumna "errors": odpowiedzi 5xx, czyli głównie "database is locked".
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+from .load import summarize
+from .startup import REPO_ROOT
+
+MODES = {"default": "false", "tuned": "true"}
+PLAYERS = 500
+MATCHES = 20
+
+
+async def seed():
+    import httpx
+    from ..main import app
+    from ..database import dispose_engines
+    from ..migrations import run_migrations
+
+    await run_migrations()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for tg_id in range(1, PLAYERS + 1):
+            await client.post("/api/profile/telegram", json={"telegram_id": tg_id, "nickname": f"gracz{tg_id}"})
+        for _ in range(MATCHES):
+            await client.post("/api/matches", json={"telegram_id": 1, "venue": "Hala", "slots_needed": 1000})
+    await dispose_engines()
+
+
+async def workload(process: int, writers: int, requests: int) -> dict:
+    import httpx
+    from ..main import app
+    from ..database import dispose_engines
+
+    rng = random.Random(process)
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def request(client, i):
+        tg_id = rng.randint(1, PLAYERS)
+        roll = rng.random()
+        if roll < 0.4:
+            return await client.post("/api/profile/telegram", json={"telegram_id": tg_id, "city": f"Miasto {i % 7}"})
+        if roll < 0.6:
+            player = 10_000 * (process + 1) + i  # nowy gracz = nowy wiersz w match_participants
+            return await client.post(f"/api/matches/{rng.randint(1, MATCHES)}/join", json={"telegram_id": player})
+        if roll < 0.7:
+            return await client.post("/api/matches", json={"telegram_id": tg_id, "venue": "Hala", "slots_needed": 10})
+        return await client.get(f"/api/profile/{tg_id}")
+
+    async def user(client):
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                errors += 1
+
+    # Wyjątki aplikacji jako 500, a nie przerwanie benchmarku
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[user(client) for _ in range(writers)])
+        result = summarize(latencies, time.perf_counter() - started)
+    await dispose_engines()
+    return {**result, "errors": errors}
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}",
+            "DB_SQLITE_TUNED": MODES[mode],
+            "DB_AUTO_MIGRATE": "false",
+            "LOG_LEVEL": "CRITICAL",
+        }
+        child = [sys.executable, "-m", "basket_bot_backend.benchmarks.sqlite_concurrency", "--child"]
+        subprocess.run(child + ["--seed"], cwd=REPO_ROOT, env=env, check=True, capture_output=True)
+
+        per_process = args.requests // args.processes
+        workers = [
+            subprocess.Popen(
+                child + [f"--process={p}", f"--writers={args.writers}", f"--requests={per_process}"],
+                cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+            for p in range(args.processes)
+        ]
+        results = []
+        for worker in workers:
+            stdout, stderr = worker.communicate()
+            if worker.returncode != 0:
+                raise RuntimeError(f"{mode}: benchmark failed\n{stderr[-2000:]}")
+            results.append(json.loads(stdout.strip().splitlines()[-1]))
+
+    return {
+        "requests": sum(r["requests"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "p95_ms": max(r["p95_ms"] for r in results),
+        "rps": round(sum(r["rps"] for r in results), 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=50, help="concurrent virtual users per process")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests across processes")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--process", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        if args.seed:
+            asyncio.run(seed())
+        else:
+            print(json.dumps(asyncio.run(workload(args.process, args.writers, args.requests))))
+        return 0
+
+    print(f"{args.processes} process(es) x {args.writers} writers, {args.requests} requests")
+    print(f"{'mode':10} {'reqs':>6} {'errors':>7} {'p95 ms':>9} {'req/s':>9}")
+    failed = False
+    for mode in [m for m in args.modes.split(",") if m]:
+        r = run_mode(mode, args)
+        print(f"{mode:10} {r['requests']:>6} {r['errors']:>7} {r['p95_ms']:>9.2f} {r['rps']:>9.1f}")
+        failed |= mode == "tuned" and r["errors"] > 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
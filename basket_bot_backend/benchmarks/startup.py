@@ -0,0 +1,105 @@
+"""
+Czas zimnego startu: import basket_bot_backend.main mierzony przez `-X importtime`.
+
+    python -m basket_bot_backend.benchmarks.startup            # raport
+    python -m basket_bot_backend.benchmarks.startup --check    # porównaj z baselines.json (CI)
+    python -m basket_bot_backend.benchmarks.startup --update   # zapisz nowy baseline
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+REPO_ROOT = Path(__file__).resolve().parents[2]
+TARGET_MODULE = "basket_bot_backend.main"
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_once(module: str = TARGET_MODULE) -> tuple[float, list[tuple[float, str]]]:
+    """Zwraca (łączny czas importu modułu w ms, najwolniejsze importy najwyższego poziomu)."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total_ms = None
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        depth = len(match.group(3)) - 1
+        name = match.group(4)
+        if name == module:
+            total_ms = cumulative_ms
+        elif depth <= 2:
+            top_level.append((cumulative_ms, name))
+
+    if total_ms is None:
+        raise RuntimeError(f"{module} nie pojawił się w wyjściu -X importtime")
+    return total_ms, sorted(top_level, reverse=True)[:10]
+
+
+def load_baselines() -> dict:
+    if BASELINES_PATH.exists():
+        return json.loads(BASELINES_PATH.read_text())
+    return {}
+
+
+def save_baselines(baselines: dict):
+    BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="fail if slower than baseline")
+    parser.add_argument("--update", action="store_true", help="store the result as the new baseline")
+    args = parser.parse_args(argv)
+
+    # Pierwszy przebieg rozgrzewa cache dysku i .pyc - nie liczymy go
+    measure_once()
+    samples = []
+    slowest = []
+    for _ in range(args.runs):
+        total_ms, slowest = measure_once()
+        samples.append(total_ms)
+
+    median_ms = statistics.median(samples)
+    print(f"import {TARGET_MODULE}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(samples):.1f}, max {max(samples):.1f})")
+    print("slowest imports:")
+    for ms, name in slowest:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    baselines = load_baselines()
+    if args.update:
+        baselines.setdefault("startup", {})["import_ms"] = round(median_ms, 1)
+        save_baselines(baselines)
+        print(f"baseline updated: {median_ms:.1f} ms")
+        return 0
+
+    if args.check:
+        startup = baselines.get("startup", {})
+        limit = startup["import_ms"] * (1 + startup.get("tolerance", 0.5))
+        if median_ms > limit:
+            print(f"FAIL: {median_ms:.1f} ms > {limit:.1f} ms (baseline {startup['import_ms']} ms)")
+            return 1
+        print(f"OK: {median_ms:.1f} ms <= {limit:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
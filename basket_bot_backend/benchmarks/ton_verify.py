@@ -0,0 +1,151 @@
+"""
+Przepustowość weryfikacji ton_proof (bez bazy i bez sieci).
+
+    python -m basket_bot_backend.benchmarks.ton_verify
+    python -m basket_bot_backend.benchmarks.ton_verify --iterations 5000 --workers 1,2,4
+
+Mierzy weryfikacje na sekundę:
+- inline/cold   - parsowanie state_init (BOC + hashe komórek) + ed25519,
+- inline/warm   - sam ed25519 (klucz publiczny z cache),
+- thread/process - ścieżka logowania przez pulę z ton_proof.py, przy N workerach;
+  kolumna "per core" dzieli wynik przez min(N, liczba rdzeni).
+
+Portfel jest syntetyczny: własna komórka kodu z układem danych jak w v4R2,
+zarejestrowana w WALLET_PUBKEY_OFFSETS tylko na czas benchmarku.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+FIXTURE_CODE = b"benchmark wallet code"
+SUBWALLET_ID = 698983191
+
+
+def cell_bytes(bits: int, bit_length: int) -> tuple[int, bytes]:
+    """(d2, dane z bitem zakończenia) dla `bit_length` bitów."""
+    full, rest = divmod(bit_length, 8)
+    if rest:
+        bits = (bits << 1 | 1) << (7 - rest)
+    return full * 2 + (1 if rest else 0), bits.to_bytes(full + (1 if rest else 0), "big")
+
+
+def serialize_boc(root: tuple) -> bytes:
+    """Minimalny BOC bez indeksu i CRC; komórka to (bity, długość, [komórki])."""
+    order, queue = [], [root]
+    while queue:  # BFS - dzieci zawsze za rodzicem, jak wymaga format
+        cell = queue.pop(0)
+        order.append(cell)
+        queue.extend(cell[2])
+    index = {id(cell): i for i, cell in enumerate(order)}
+
+    payload = b""
+    for bits, bit_length, refs in order:
+        d2, data = cell_bytes(bits, bit_length)
+        payload += bytes((len(refs), d2)) + data + bytes(index[id(ref)] for ref in refs)
+    offset_size = max(1, (len(payload).bit_length() + 7) // 8)
+    header = bytes.fromhex("b5ee9c72") + bytes((1, offset_size))
+    header += bytes((len(order), 1, 0)) + len(payload).to_bytes(offset_size, "big") + b"\x00"
+    return header + payload
+
+
+def register_fixture_code():
+    from .. import ton_proof
+
+    code = ton_proof.parse_boc(serialize_boc((int.from_bytes(FIXTURE_CODE, "big"), len(FIXTURE_CODE) * 8, [])))
+    ton_proof.WALLET_PUBKEY_OFFSETS[code.hash] = 64
+
+
+def make_wallet():
+    """(klucz prywatny, state_init BOC, adres '0:<hex>')."""
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+    from .. import ton_proof
+
+    private_key = Ed25519PrivateKey.generate()
+    public_key = private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    code = (int.from_bytes(FIXTURE_CODE, "big"), len(FIXTURE_CODE) * 8, [])
+    # seqno, subwallet_id, public_key, pusty słownik pluginów
+    data = ((SUBWALLET_ID << 256 | int.from_bytes(public_key, "big")) << 1, 32 + 32 + 256 + 1, [])
+    state_init = serialize_boc((0b00110, 5, [code, data]))  # bez split_depth/special, code, data, bez bibliotek
+    address = "0:" + ton_proof.parse_boc(state_init).hash.hex()
+    return private_key, state_init, address
+
+
+def make_job(private_key, state_init: bytes, address: str, domain: str, payload: str):
+    from .. import ton_proof
+
+    workchain, account_hash = ton_proof.parse_address(address)
+    job = ton_proof.ProofJob(workchain, account_hash, domain.encode(), int(time.time()), payload.encode(), b"", state_init)
+    job.signature = private_key.sign(ton_proof.proof_digest(job))
+    return job
+
+
+def inline_rate(job, iterations: int) -> float:
+    from ..ton_proof import check_signature
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        check_signature(job)
+    return iterations / (time.perf_counter() - started)
+
+
+async def pool_rate(executor: Executor, job, iterations: int, concurrency: int) -> float:
+    from .. import ton_proof
+
+    loop = asyncio.get_running_loop()
+    counter = iter(range(iterations))
+
+    async def client():
+        for _ in counter:
+            await loop.run_in_executor(executor, ton_proof.check_signature, job)
+
+    await loop.run_in_executor(executor, ton_proof.check_signature, job)  # rozgrzanie puli
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return iterations / (time.perf_counter() - started)
+
+
+def make_executor(kind: str, workers: int) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers, initializer=register_fixture_code)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--workers", default="1,2,4", help="pool sizes to compare")
+    parser.add_argument("--executors", default="thread,process")
+    args = parser.parse_args(argv)
+
+    from dataclasses import replace
+    from .. import ton_proof
+
+    register_fixture_code()
+    private_key, state_init, address = make_wallet()
+    cold = make_job(private_key, state_init, address, "bench.local", ton_proof.new_challenge()[0])
+    public_key = ton_proof.check_signature(cold)
+    warm = replace(cold, public_key=public_key)
+
+    cores = os.cpu_count() or 1
+    print(f"{args.iterations} verifications, {cores} core(s)")
+    print(f"{'path':16} {'workers':>7} {'verif/s':>10} {'per core':>10}")
+    print(f"{'inline/cold':16} {1:>7} {inline_rate(cold, args.iterations):>10.0f} {'':>10}")
+    print(f"{'inline/warm':16} {1:>7} {inline_rate(warm, args.iterations):>10.0f} {'':>10}")
+
+    for kind in [k for k in args.executors.split(",") if k]:
+        for workers in [int(w) for w in args.workers.split(",") if w]:
+            executor = make_executor(kind, workers)
+            try:
+                rate = asyncio.run(pool_rate(executor, warm, args.iterations, concurrency=workers * 4))
+            finally:
+                executor.shutdown()
+            print(f"{kind + '/warm':16} {workers:>7} {rate:>10.0f} {rate / min(workers, cores):>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import os
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable
+from pydantic import ValidationError
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import dialect_insert
+from .models import User, Profile
+from .schemas import PlayerImport, PROFILE_FIELDS
+from .stats import sync_city
+from .cache import invalidate_profile
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "100000"))
+MAX_REPORTED_ERRORS = 1000
+
+USER_FIELDS = ("name", "age", "height", "number")
+
+
+class ImportTooLarge(Exception):
+    pass
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, object]]:
+    """Dzieli strumień NDJSON na linie bez buforowania całego body."""
+    buffer = b""
+    row = 0
+
+    def parse(line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            return e
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                row += 1
+                yield row, parse(line)
+    if buffer.strip():
+        row += 1
+        yield row, parse(buffer)
+
+
+async def array_rows(items: Iterable) -> AsyncIterator[tuple[int, object]]:
+    for row, item in enumerate(items, start=1):
+        yield row, item
+
+
+async def _resolve_wallets(db: AsyncSession, players: list[PlayerImport]) -> list[str]:
+    """
+    Jak resolve_user_wallet, ale jednym zapytaniem dla całej paczki.
+    Istniejące konto danego telegram_id ma pierwszeństwo przed wallet_address z importu;
+    portfel należący do innego telegram_id jest ignorowany (import nie przejmuje cudzych kont).
+    """
+    telegram_ids = {p.telegram_id for p in players}
+    supplied = {p.wallet_address for p in players if p.wallet_address is not None}
+    result = await db.execute(
+        select(User.telegram_id, User.wallet_address).where(
+            or_(User.telegram_id.in_(telegram_ids), User.wallet_address.in_(supplied))
+        )
+    )
+    by_telegram: dict[int, set[str]] = {}
+    owners: dict[str, int | None] = {}
+    for tg_id, wallet in result:
+        owners[wallet] = tg_id
+        if tg_id is not None:
+            by_telegram.setdefault(tg_id, set()).add(wallet)
+
+    wallets = []
+    for p in players:
+        accounts = by_telegram.get(p.telegram_id)
+        if accounts:
+            # "" to też istniejące konto (/api/profile bez portfela)
+            wallet = p.wallet_address if p.wallet_address in accounts else min(accounts)
+        elif p.wallet_address is not None and owners.get(p.wallet_address, p.telegram_id) in (None, p.telegram_id):
+            wallet = p.wallet_address
+        else:
+            wallet = f"tg_{p.telegram_id}"
+        # Kolejne wiersze tej samej paczki widzą konta założone przez poprzednie
+        owners[wallet] = p.telegram_id
+        by_telegram.setdefault(p.telegram_id, set()).add(wallet)
+        wallets.append(wallet)
+    return wallets
+
+
+async def _write_chunk(db: AsyncSession, players: list[PlayerImport]) -> list[str]:
+    wallets = await _resolve_wallets(db, players)
+    now = datetime.utcnow()
+
+    # Ten sam klucz dwa razy w jednym INSERT ... ON CONFLICT to błąd na Postgresie - wygrywa ostatni
+    users = {}
+    profiles = {}
+    for player, wallet in zip(players, wallets):
+        users[wallet] = {
+            "wallet_address": wallet,
+            "telegram_id": player.telegram_id,
+            **{name: getattr(player, name) for name in USER_FIELDS},
+        }
+        if player.profile is not None:
+            profiles[wallet] = {"user_id": wallet, **player.profile.model_dump(include=set(PROFILE_FIELDS))}
+
+    # Pola pominięte w imporcie (None) nie nadpisują tego, co już jest w bazie.
+    # executemany zamiast jednego wielkiego VALUES - skompilowane zapytanie trafia do cache
+    users_table = User.__table__
+    stmt = dialect_insert(db, users_table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["wallet_address"],
+        set_={
+            # Konflikt nigdy nie przepina konta na inny telegram_id - uzupełnia tylko brakujący
+            "telegram_id": func.coalesce(users_table.c.telegram_id, stmt.excluded.telegram_id),
+            **{name: func.coalesce(stmt.excluded[name], users_table.c[name]) for name in USER_FIELDS},
+            "updated_at": now,
+        },
+    )
+    await db.execute(stmt, [{**row, "created_at": now, "updated_at": now} for row in users.values()])
+
+    if profiles:
+        profiles_table = Profile.__table__
+        stmt = dialect_insert(db, profiles_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                **{name: func.coalesce(stmt.excluded[name], profiles_table.c[name]) for name in PROFILE_FIELDS},
+                "updated_at": now,
+            },
+        )
+        await db.execute(stmt, [{**row, "created_at": now, "updated_at": now} for row in profiles.values()])
+        await sync_city(db, [wallet for wallet, row in profiles.items() if row["city"] is not None])
+
+    return wallets
+
+
+async def import_players(db: AsyncSession, rows: AsyncIterator[tuple[int, object]]) -> dict:
+    """
+    Waliduje wiersze i zapisuje je paczkami upsertów po IMPORT_CHUNK_SIZE,
+    w jednej transakcji. Błędne wiersze są pomijane i raportowane z numerem.
+    Commit zostaje po stronie wywołującego.
+    """
+    failed = 0
+    errors = []
+    chunk: list[PlayerImport] = []
+    touched: dict[str, int] = {}  # wallet -> telegram_id; ten sam gracz w kilku wierszach liczy się raz
+
+    async def flush():
+        wallets = await _write_chunk(db, chunk)
+        touched.update(zip(wallets, (p.telegram_id for p in chunk)))
+        chunk.clear()
+
+    async for row, raw in rows:
+        if row > IMPORT_MAX_ROWS:
+            raise ImportTooLarge(f"Maksymalnie {IMPORT_MAX_ROWS} wierszy na import")
+
+        if isinstance(raw, Exception):
+            row_errors = [{"msg": f"Niepoprawny JSON: {raw}"}]
+        else:
+            try:
+                chunk.append(PlayerImport.model_validate(raw))
+                row_errors = None
+            except ValidationError as e:
+                row_errors = [
+                    {"loc": list(err["loc"]), "msg": err["msg"]}
+                    for err in e.errors(include_url=False)
+                ]
+
+        if row_errors:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": row, "errors": row_errors})
+
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush()
+
+    if chunk:
+        await flush()
+
+    return {
+        "imported": len(touched),
+        "failed": failed,
+        "errors": errors,
+        "touched": [(telegram_id, wallet) for wallet, telegram_id in touched.items()],
+    }
+
+
+def invalidate_imported(touched: list[tuple[int, str]]):
+    for telegram_id, wallet in touched:
+        invalidate_profile(telegram_id, wallet)
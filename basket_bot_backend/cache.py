@@ -0,0 +1,82 @@
+import os
+import time
+from collections import OrderedDict
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "60"))
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Ograniczony cache LRU z TTL (w pamięci procesu).
+    Każdy worker uvicorna ma własną kopię - TTL ogranicza nieaktualność
+    między procesami, w obrębie procesu zapisy unieważniają wpisy jawnie.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Klucze: ("tg", telegram_id) - para (etag, odpowiedź), patrz conditional.py;
+# ("wallet", wallet_address) - AccountOut z get_current_account (auth.py)
+profile_cache = TTLCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+
+
+def invalidate_profile(telegram_id: int | None = None, *wallet_addresses: str | None):
+    """Usuwa z cache wszystkie widoki profilu danego użytkownika."""
+    if telegram_id is not None:
+        profile_cache.delete(("tg", telegram_id))
+    for wallet in wallet_addresses:
+        if wallet:
+            profile_cache.delete(("wallet", wallet))
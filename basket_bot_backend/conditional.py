@@ -0,0 +1,37 @@
+"""
+Warunkowe GET: ETag + If-None-Match -> 304 bez serializacji body.
+
+ETagi liczymy ze stanu wierszy (updated_at itp.), a nie z licznika w pamięci
+procesu - każdy worker uvicorna da ten sam ETag dla tych samych danych.
+"""
+import hashlib
+from fastapi import Request, Response
+
+# Zmiana kształtu odpowiedzi = nowa wersja, żeby stare ETagi klientów nie pasowały
+ETAG_VERSION = "1"
+CACHE_CONTROL = "no-cache"  # Klient może trzymać odpowiedź, ale zawsze ją rewaliduje
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr((ETAG_VERSION, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Porównanie słabe (RFC 9110): W/ nie ma znaczenia
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
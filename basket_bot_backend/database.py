@@ -1,6 +1,16 @@
 import os
+import time
+import random
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql import Select, CompoundSelect
+
+logger = logging.getLogger(__name__)
 
 # 1. Pobieramy adres
 raw_url = os.getenv("DATABASE_URL")
@@ -19,16 +29,245 @@ else:
     # Fallback tylko dla lokalnych testów
     DATABASE_URL = "sqlite+aiosqlite:///./hoop.db"
 
-print(f"DEBUG: Łączę z bazą: {DATABASE_URL.split('@')[0]}...") # Loguje początek adresu dla pewności
+logger.info("Łączę z bazą: %s...", DATABASE_URL.split('@')[0])  # Tylko początek adresu, bez hasła
+
+
+def env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# 3. Konfiguracja silnika z env (domyślne wartości pod Railway Postgres)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+DB_ECHO = LOG_LEVEL == "DEBUG"  # Każde zapytanie na stdout tylko przy debugowaniu
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_SLOW_QUERY_SAMPLE = float(os.getenv("DB_SLOW_QUERY_SAMPLE", "1.0"))
+# Tryb SQLite na małe instalacje: WAL + jeden writer + pula czytelników
+DB_SQLITE_TUNED = env_bool("DB_SQLITE_TUNED", True)
+DB_SQLITE_READERS = int(os.getenv("DB_SQLITE_READERS", "4"))
+DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class PoolStats:
+    """Liczniki pobrań połączeń z puli i czasu czekania na wolne połączenie."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool mierzący, ile trwa zdobycie połączenia."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+def build_engine(url: str):
+    url = make_url(url)
+    options = {"echo": DB_ECHO}
+
+    # SQLite (aiosqlite) zostaje przy domyślnej puli - ustawienia rozmiaru dotyczą serwera bazy
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    if url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+
+    return create_async_engine(url, **options)
+
+
+def sqlite_tuned(url: str) -> bool:
+    url = make_url(url)
+    # :memory: to osobna baza na każde połączenie - tam zostaje jeden silnik
+    return DB_SQLITE_TUNED and url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def build_sqlite_engines(url: str):
+    """
+    Dwa silniki na ten sam plik SQLite:
+    - writer: jedno połączenie (pool_size=1) - transakcje zapisujące czekają
+      na nie w kolejce FIFO puli zamiast walczyć o blokadę pliku ("database is locked"),
+      a BEGIN IMMEDIATE bierze blokadę zapisu od razu (inne procesy czekają busy_timeout);
+    - reader: pula połączeń tylko do odczytu - w trybie WAL nie blokują writera ani siebie.
+    """
+    writer = create_async_engine(
+        url,
+        echo=DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    reader = create_async_engine(
+        url,
+        echo=DB_ECHO,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_SQLITE_READERS,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+
+    def pragmas(dbapi_connection, *statements):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={DB_SQLITE_BUSY_TIMEOUT_MS}")
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+    @event.listens_for(writer.sync_engine, "connect")
+    def _writer_connect(dbapi_connection, connection_record):
+        pragmas(
+            dbapi_connection,
+            "PRAGMA journal_mode=WAL",  # zapisane w pliku bazy - czytelnicy przejmą je sami
+            # W WAL commit nie robi fsync - po awarii zasilania można stracić ostatnie commity, nie spójność
+            "PRAGMA synchronous=NORMAL",
+        )
+        # Transakcje zaczynamy sami (niżej), a nie sterownik przy pierwszym INSERT
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer.sync_engine, "begin")
+    def _writer_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    @event.listens_for(reader.sync_engine, "connect")
+    def _reader_connect(dbapi_connection, connection_record):
+        # Zapis przez złą pulę to od razu błąd, a nie cichy konflikt o blokadę
+        pragmas(dbapi_connection, "PRAGMA query_only=ON")
+
+    return writer, reader
+
+
+def instrument(engine):
+    @event.listens_for(engine.sync_engine.pool, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_stats.checkouts += 1
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        for observer in query_observers:
+            observer(elapsed)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= DB_SLOW_QUERY_MS and random.random() < DB_SLOW_QUERY_SAMPLE:
+            logger.warning("Wolne zapytanie (%.1f ms): %s", elapsed_ms, " ".join(statement.split())[:500])
+
+
+# Funkcje wołane z czasem (s) każdego zapytania, np. metryki w metrics.py
+query_observers = []
+
+# `engine` przyjmuje zapisy (i migracje); `read_engine` to ten sam silnik poza trybem SQLite z pulą czytelników
+if sqlite_tuned(DATABASE_URL):
+    engine, read_engine = build_sqlite_engines(DATABASE_URL)
+    instrument(engine)
+    instrument(read_engine)
+else:
+    engine = read_engine = build_engine(DATABASE_URL)
+    instrument(engine)
+
+
+def _queue_pool_stats(pool) -> dict:
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {}
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def get_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    stats = {
+        "pool": pool.__class__.__name__,
+        "checkouts": pool_stats.checkouts,
+        "waits": pool_stats.waits,
+        "wait_seconds_total": round(pool_stats.wait_seconds_total, 6),
+        "wait_seconds_max": round(pool_stats.wait_seconds_max, 6),
+    }
+    stats.update(_queue_pool_stats(pool))
+    if read_engine is not engine:
+        stats.update({f"read_{key}": value for key, value in _queue_pool_stats(read_engine.sync_engine.pool).items()})
+    return stats
+
+
+class RoutingSession(Session):
+    """
+    Sesja kierująca SELECT-y do `read_engine`, a flush i INSERT/UPDATE/DELETE do `engine`.
+    Po pierwszym zapisie reszta transakcji zostaje na writerze, więc sesja
+    widzi własne niezatwierdzone zmiany (np. UPDATE-blokada, a potem odczyt).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if read_engine is engine:
+            return engine.sync_engine
+        is_read = isinstance(clause, (Select, CompoundSelect)) and clause._for_update_arg is None
+        if self.info.get("writer") or self._flushing or not is_read:
+            self.info["writer"] = True
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writer", None)
 
-engine = create_async_engine(DATABASE_URL, echo=True)
 
 AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+    engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
 )
 
 Base = declarative_base()
 
+async def dispose_engines():
+    """Zamyka połączenia obu pul - otwarte połączenia aiosqlite trzymają proces przy życiu."""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def dialect_insert(db: AsyncSession, table):
+    """
+    INSERT z obsługą ON CONFLICT dla dialektu bieżącej sesji.
+    Postgres i SQLite mają tę samą składnię on_conflict_do_nothing/do_update.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
@@ -0,0 +1,114 @@
+import os
+import asyncio
+import itertools
+from collections import OrderedDict
+import orjson
+
+# Ile różnych meczów może czekać w kolejce jednego klienta, zanim uznamy go za zbyt wolnego
+MAX_PENDING_PER_CLIENT = int(os.getenv("STREAM_MAX_PENDING", "256"))
+HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_INTERVAL", "15"))
+
+EVENT_CREATED = "created"
+EVENT_JOINED = "joined"
+EVENT_FULL = "full"
+EVENT_RESYNC = "resync"
+
+
+class Subscription:
+    """
+    Skrzynka jednego klienta. Zdarzenia są scalane per mecz (liczy się ostatni
+    stan slotów), więc wolny klient nie zjada pamięci: przy przepełnieniu
+    dostaje jedno zdarzenie `resync` i powinien pobrać listę od nowa.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._pending: OrderedDict[int, tuple[int, str, dict]] = OrderedDict()
+        self._overflowed = False
+        self._ready = asyncio.Event()
+
+    def push(self, seq: int, event: str, data: dict):
+        if self._overflowed:
+            return
+        match_id = data["match_id"]
+        self._pending.pop(match_id, None)
+        self._pending[match_id] = (seq, event, data)
+        if len(self._pending) > self.max_pending:
+            self._pending.clear()
+            self._overflowed = True
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> list[tuple[int, str, dict]] | None:
+        """Zwraca oczekujące zdarzenia albo None po `timeout` sekundach ciszy."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+
+        if self._overflowed:
+            self._overflowed = False
+            return [(0, EVENT_RESYNC, {})]
+
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class MatchEventBus:
+    """Pub/sub w procesie dla zmian meczów (create_match, join_match, matchmaking)."""
+
+    def __init__(self, max_pending: int = MAX_PENDING_PER_CLIENT):
+        self.max_pending = max_pending
+        self._subscribers: set[Subscription] = set()
+        self._seq = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self.max_pending)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
+
+    def publish(self, event: str, data: dict):
+        seq = next(self._seq)
+        for sub in self._subscribers:
+            sub.push(seq, event, data)
+
+    def publish_slots(self, match_id: int, current_players: int, slots_needed: int):
+        """`joined` albo `full` ze stanem slotów - ten sam kształt dla join_match i matchmakingu."""
+        self.publish(EVENT_FULL if current_players >= slots_needed else EVENT_JOINED, {
+            "match_id": match_id,
+            "current_players": current_players,
+            "slots_needed": slots_needed,
+            "slots_available": slots_needed - current_players,
+        })
+
+
+def format_sse(seq: int, event: str, data: dict) -> str:
+    # orjson zna datetime/date; reszta (np. Decimal) przez str, żeby jeden typ nie zerwał strumienia
+    lines = f"event: {event}\ndata: {orjson.dumps(data, default=str).decode()}\n\n"
+    return f"id: {seq}\n{lines}" if seq else lines
+
+
+async def sse_stream(bus: "MatchEventBus", heartbeat: float = HEARTBEAT_INTERVAL):
+    """Generator dla StreamingResponse: zdarzenia meczów + heartbeat (komentarz SSE)."""
+    sub = bus.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            batch = await sub.next_batch(heartbeat)
+            if batch is None:
+                yield ": ping\n\n"
+                continue
+            yield "".join(format_sse(seq, event, data) for seq, event, data in batch)
+    finally:
+        bus.unsubscribe(sub)
+
+
+match_events = MatchEventBus()
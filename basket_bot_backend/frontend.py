@@ -0,0 +1,151 @@
+"""
+Serwowanie zbudowanego frontendu (basket_bot_frontend/dist) z tego samego originu co API.
+
+- Warianty .br/.gz przygotowane przy buildzie (precompress.py), wybierane
+  według Accept-Encoding - bez kompresji w trakcie żądania.
+- Pliki z hashem w nazwie w assets/ (Vite: assets/index-3f2a9c1b.js) dostają
+  `immutable` na rok; index.html i reszta - `no-cache` + ETag (304).
+- Indeks plików budowany raz przy pierwszym żądaniu: ścieżki spoza dist
+  nigdy nie dotykają dysku, a stat() nie jest wołany per żądanie.
+- Gdy serwer ASGI oferuje rozszerzenie http.response.zerocopysend,
+  body idzie przez sendfile; w przeciwnym razie czytamy plik kawałkami.
+"""
+import os
+import re
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from .conditional import etag_matches
+
+FRONTEND_DIST = Path(os.getenv("FRONTEND_DIST", Path(__file__).resolve().parents[1] / "basket_bot_frontend" / "dist"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Hash treści od Vite: 8 znaków base64url przed rozszerzeniem (index-3f2a9c1b.js, logo-Bx_9aQ-c.svg).
+# Tylko w katalogu assets/ - pliki z public/ (tonconnect-manifest.json) kopiowane są bez hasha.
+HASHED_DIR = "/assets/"
+HASHED_NAME = re.compile(r"[-.][A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+VARIANT_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class Asset:
+    media_type: str
+    cache_control: str
+    variants: dict[str, tuple[Path, os.stat_result]]  # kodowanie ("identity", "br", "gzip") -> plik
+
+
+def build_index(directory: Path) -> dict[str, Asset]:
+    index = {}
+    for path in directory.rglob("*"):
+        if not path.is_file() or path.name.endswith(VARIANT_SUFFIXES):
+            continue
+        url = "/" + path.relative_to(directory).as_posix()
+        variants = {"identity": (path, path.stat())}
+        for encoding, suffix in ENCODINGS:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                variants[encoding] = (variant, variant.stat())
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if media_type in ("application/javascript", "image/svg+xml"):  # text/* dostaje charset od Starlette
+            media_type += "; charset=utf-8"
+        hashed = url.startswith(HASHED_DIR) and HASHED_NAME.search(path.name)
+        cache_control = IMMUTABLE if hashed else REVALIDATE
+        index[url] = Asset(media_type, cache_control, variants)
+    return index
+
+
+def accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            weight = float(q) if q else 1.0
+        except ValueError:
+            weight = 1.0
+        if name and weight > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class ZeroCopyFileResponse(FileResponse):
+    chunk_size = CHUNK_SIZE
+
+    async def __call__(self, scope, receive, send):
+        if self.send_header_only or "http.response.zerocopysend" not in scope.get("extensions", {}):
+            return await super().__call__(scope, receive, send)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            await send({"type": "http.response.zerocopysend", "file": file, "more_body": False})
+
+
+class FrontendFiles:
+    """Aplikacja ASGI montowana pod "/" po wszystkich trasach API."""
+
+    def __init__(self, directory: Path = FRONTEND_DIST, api_prefixes: tuple[str, ...] = ("/api/",)):
+        self.directory = directory
+        self.api_prefixes = api_prefixes
+        self._index: dict[str, Asset] | None = None
+
+    @property
+    def index(self) -> dict[str, Asset]:
+        if self._index is None:
+            self._index = build_index(self.directory)
+        return self._index
+
+    def resolve(self, path: str) -> Asset | None:
+        if path.endswith("/"):
+            path += "index.html"
+        asset = self.index.get(path)
+        if asset is None and "." not in path.rsplit("/", 1)[-1]:
+            # Trasa aplikacji SPA (/matches/12) - ładuje index.html, routing robi frontend
+            asset = self.index.get("/index.html")
+        return asset
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        if path.startswith(self.api_prefixes):
+            response = JSONResponse({"detail": "Not Found"}, status_code=404)
+        elif scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+        else:
+            response = self.file_response(scope)
+        await response(scope, receive, send)
+
+    def file_response(self, scope) -> Response:
+        asset = self.resolve(scope["path"])
+        if asset is None:
+            return PlainTextResponse("Not Found", status_code=404)
+
+        request = Request(scope)
+        encoding = "identity"
+        if len(asset.variants) > 1:
+            accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+            encoding = next((name for name, _ in ENCODINGS if name in asset.variants and name in accepted), "identity")
+
+        path, stat_result = asset.variants[encoding]
+        source = asset.variants["identity"][1]
+        headers = {
+            # Jeden ETag na wersję pliku i kodowanie (warianty mogą mieć ten sam rozmiar)
+            "ETag": f'"{source.st_mtime_ns:x}-{source.st_size:x}-{encoding}"',
+            "Cache-Control": asset.cache_control,
+        }
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        response = ZeroCopyFileResponse(
+            path, headers=headers, media_type=asset.media_type, stat_result=stat_result, method=scope["method"]
+        )
+        if etag_matches(request, response.headers["etag"]):
+            return NotModifiedResponse(response.headers)
+        return response
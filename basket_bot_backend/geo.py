@@ -0,0 +1,117 @@
+"""
+Indeks przestrzenny hal oparty na geohashu.
+
+Każda hala ma zapisany geohash (GEOHASH_PRECISION znaków) w zwykłej kolumnie
+z indeksem B-tree. Zapytanie "w promieniu R" zamienia się w kilka zakresów
+prefiksów (komórek siatki pokrywających okrąg): geocell >= 'u3qc' AND
+geocell < 'u3qc~'. Działa tak samo na Postgresie i SQLite, bez PostGIS.
+Kandydatów z komórek dokładnie filtrujemy odległością haversine.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~5 m - dokładność zapisu, zapytania używają krótszych prefiksów
+MAX_COVER_CELLS = 16
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # Geohash zaczyna od bitu długości geograficznej
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """(wysokość, szerokość) komórki w stopniach dla danej długości geohasha."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat: float, lng: float, radius_km: float) -> list[tuple[float, float, float, float]]:
+    """
+    (min_lat, min_lng, max_lat, max_lng) prostokąta opisanego na okręgu.
+    Prostokąt przecinający południk 180° dzielimy na dwa, po obu jego stronach.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    if dlng >= 180.0 or min_lat == -90.0 or max_lat == 90.0:
+        # Okrąg obejmuje biegun albo cały równoleżnik - wszystkie długości
+        return [(min_lat, -180.0, max_lat, 180.0)]
+
+    west, east = lng - dlng, lng + dlng
+    if west < -180.0:
+        return [(min_lat, west + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, east)]
+    if east > 180.0:
+        return [(min_lat, west, max_lat, 180.0), (min_lat, -180.0, max_lat, east - 360.0)]
+    return [(min_lat, west, max_lat, east)]
+
+
+def _cells_in_box(box: tuple[float, float, float, float], precision: int) -> set[str] | None:
+    min_lat, min_lng, max_lat, max_lng = box
+    height, width = cell_size(precision)
+    rows = math.floor((max_lat + 90) / height) - math.floor((min_lat + 90) / height) + 1
+    cols = math.floor((max_lng + 180) / width) - math.floor((min_lng + 180) / width) + 1
+    if rows * cols > MAX_COVER_CELLS:
+        return None
+
+    cells = set()
+    first_row = math.floor((min_lat + 90) / height)
+    first_col = math.floor((min_lng + 180) / width)
+    for r in range(rows):
+        for c in range(cols):
+            # Środek komórki - bez problemów z zaokrągleniem na krawędziach
+            cell_lat = min(90.0, -90 + (first_row + r + 0.5) * height)
+            cell_lng = min(180.0, -180 + (first_col + c + 0.5) * width)
+            cells.add(encode(cell_lat, cell_lng, precision))
+    return cells
+
+
+def covering_cells(lat: float, lng: float, radius_km: float) -> list[str]:
+    """
+    Najdłuższe prefiksy geohasha, których komórki (najwyżej MAX_COVER_CELLS)
+    pokrywają okrąg. Dłuższy prefiks = mniej kandydatów spoza promienia.
+    """
+    boxes = bounding_boxes(lat, lng, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cells = set()
+        for box in boxes:
+            box_cells = _cells_in_box(box, precision)
+            if box_cells is None:
+                break
+            cells |= box_cells
+        else:
+            if len(cells) <= MAX_COVER_CELLS:
+                return sorted(cells)
+    return sorted(BASE32)  # Promień rzędu kontynentu - cały świat
@@ -0,0 +1,262 @@
+"""
+Nagłówek Idempotency-Key dla POST /api/matches i POST /api/matches/{id}/join.
+
+Mini-aplikacja na słabym zasięgu ponawia żądania - bez klucza każde ponowienie
+zakłada kolejny mecz albo jeszcze raz dolicza gracza. Z kluczem:
+
+- pierwsze żądanie wykonuje się normalnie, a jego odpowiedź zostaje zapamiętana
+  (cache w pamięci procesu + tabela idempotency_keys dla innych workerów),
+- powtórka z tym samym kluczem i tym samym body dostaje zapisaną odpowiedź
+  (nagłówek Idempotent-Replayed: true), bez dotykania meczów,
+- równoległe duplikaty w jednym procesie czekają na wynik pierwszego,
+  w innym procesie dostają 409 - klient ponawia, gdy wynik jest już zapisany,
+- ten sam klucz z innym żądaniem (ścieżka, body) to błąd 422.
+
+Klucz rezerwuje wiersz w bazie przed wykonaniem żądania; wyjątek zwalnia
+rezerwację, więc ponowienie po błędzie 5xx wykona żądanie jeszcze raz.
+Rezerwacja porzucona przez zabity proces wygasa po IDEMPOTENCY_LOCK_SECONDS.
+Zapisane odpowiedzi żyją IDEMPOTENCY_TTL sekund.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import functools
+from datetime import datetime, timedelta
+import orjson
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from .cache import TTLCache, MISSING
+from .database import AsyncSessionLocal, dialect_insert
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+KEY_MAX_LENGTH = 255
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+# 0 = wygasłe wiersze zostają w tabeli, dopóki ktoś nie użyje klucza ponownie
+IDEMPOTENCY_CLEANUP_INTERVAL = float(os.getenv("IDEMPOTENCY_CLEANUP_INTERVAL", "3600"))
+
+# Klucz -> (fingerprint, body odpowiedzi)
+completed = TTLCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL)
+_in_flight: dict[str, tuple[str, asyncio.Future]] = {}
+counters = {"executed": 0, "replayed": 0, "collapsed": 0, "in_progress": 0, "mismatched": 0}
+
+
+class KeyBusy(Exception):
+    """Klucz jest zarezerwowany przez żądanie w innym procesie."""
+
+
+class KeyMismatch(Exception):
+    """Klucz użyty wcześniej z innym żądaniem."""
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def error_response(message: str, status_code: int) -> ORJSONResponse:
+    return ORJSONResponse({"status": "error", "message": message}, status_code=status_code)
+
+
+def mismatch_response() -> ORJSONResponse:
+    return error_response(f"{HEADER} użyty z innym żądaniem", 422)
+
+
+def replay(body) -> ORJSONResponse:
+    return ORJSONResponse(body, headers={"Idempotent-Replayed": "true"})
+
+
+async def claim(db: AsyncSession, key: str, request_fingerprint: str):
+    """
+    Rezerwuje klucz w bazie i commituje rezerwację.
+    Zwraca None (klucz nasz - wykonaj żądanie) albo zapisane body odpowiedzi.
+    """
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    inserted = await db.execute(
+        dialect_insert(db, table)
+        .values(idempotency_key=key, fingerprint=request_fingerprint, created_at=now)
+        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+        .returning(table.c.idempotency_key)
+    )
+    if inserted.first() is not None:
+        await db.commit()
+        return None
+
+    row = (await db.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.response, IdempotencyKey.created_at)
+        .where(IdempotencyKey.idempotency_key == key)
+    )).first()
+    expired = row is not None and row.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL)
+    if row is not None and not expired:
+        if row.fingerprint != request_fingerprint:
+            await db.rollback()
+            raise KeyMismatch()
+        if row.response is not None:
+            await db.rollback()
+            return orjson.loads(row.response)
+        if row.created_at >= now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+            await db.rollback()
+            raise KeyBusy()
+
+    # Wpis wygasły albo porzucona rezerwacja - przejmujemy go, o ile nikt nas nie uprzedził
+    condition = [IdempotencyKey.idempotency_key == key]
+    if row is not None:
+        condition.append(IdempotencyKey.created_at == row.created_at)
+    taken = await db.execute(
+        update(IdempotencyKey)
+        .where(*condition)
+        .values(fingerprint=request_fingerprint, response=None, created_at=now)
+        .returning(IdempotencyKey.idempotency_key)
+        .execution_options(synchronize_session=False)
+    )
+    if taken.first() is None:
+        await db.rollback()
+        raise KeyBusy()
+    await db.commit()
+    return None
+
+
+async def store(db: AsyncSession, key: str, body):
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.idempotency_key == key)
+        .values(response=orjson.dumps(body).decode())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def release(db: AsyncSession, key: str):
+    await db.rollback()
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.idempotency_key == key, IdempotencyKey.response.is_(None))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def _execute(handler, args, kwargs, db: AsyncSession, key: str, request_fingerprint: str):
+    """Zwraca (odpowiedź, body do przekazania czekającym albo None, gdy mają spróbować sami)."""
+    try:
+        body = await claim(db, key, request_fingerprint)
+    except KeyMismatch:
+        counters["mismatched"] += 1
+        return mismatch_response(), None
+    except KeyBusy:
+        counters["in_progress"] += 1
+        return error_response(f"Żądanie z tym {HEADER} jest w trakcie przetwarzania, ponów za chwilę", 409), None
+    if body is not None:
+        completed.set(key, (request_fingerprint, body))
+        counters["replayed"] += 1
+        return replay(body), body
+
+    try:
+        result = await handler(*args, **kwargs)
+    except BaseException:
+        try:
+            await asyncio.shield(release(db, key))
+        except Exception:
+            logger.exception("Nie udało się zwolnić klucza idempotencji %r", key)
+        raise
+    body = jsonable_encoder(result)
+    # Błąd zapisu zostawia rezerwację - ponowienia dostaną 409 do wygaśnięcia blokady
+    await store(db, key, body)
+    completed.set(key, (request_fingerprint, body))
+    counters["executed"] += 1
+    return result, body
+
+
+def idempotent(handler):
+    """
+    Dekorator endpointu z parametrami `request` i `db`.
+    Bez nagłówka Idempotency-Key endpoint działa jak dotąd.
+    """
+
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        request: Request = kwargs["request"]
+        db: AsyncSession = kwargs["db"]
+        key = request.headers.get(HEADER)
+        if key is None:
+            return await handler(*args, **kwargs)
+        if not key or len(key) > KEY_MAX_LENGTH:
+            return error_response(f"{HEADER} musi mieć od 1 do {KEY_MAX_LENGTH} znaków", 400)
+
+        # Body zostaje w Request - handler przeczyta je jeszcze raz bez sięgania do gniazda
+        request_fingerprint = fingerprint(request.method, request.url.path, await request.body())
+
+        while True:
+            cached = completed.get(key)
+            if cached is not MISSING:
+                cached_fingerprint, body = cached
+                if cached_fingerprint != request_fingerprint:
+                    counters["mismatched"] += 1
+                    return mismatch_response()
+                counters["replayed"] += 1
+                return replay(body)
+
+            pending = _in_flight.get(key)
+            if pending is None:
+                break
+            pending_fingerprint, future = pending
+            if pending_fingerprint != request_fingerprint:
+                counters["mismatched"] += 1
+                return mismatch_response()
+            body = await asyncio.shield(future)
+            if body is not None:
+                counters["collapsed"] += 1
+                return replay(body)
+            # Pierwsze żądanie nie dało wyniku - kolejne z czekających próbuje samo
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[key] = (request_fingerprint, future)
+        body = None
+        try:
+            response, body = await _execute(handler, args, kwargs, db, key, request_fingerprint)
+            return response
+        finally:
+            del _in_flight[key]
+            future.set_result(body)
+
+    return wrapper
+
+
+def stats() -> dict:
+    return {**counters, "in_flight": len(_in_flight), "cached": completed.stats()["size"]}
+
+
+async def purge_expired(session_factory=AsyncSessionLocal) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_TTL)
+    async with session_factory() as db:
+        result = await db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.created_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount
+
+
+async def idempotency_cleanup_loop(interval: float = IDEMPOTENCY_CLEANUP_INTERVAL):
+    """Okresowe usuwanie wygasłych kluczy (gdy IDEMPOTENCY_CLEANUP_INTERVAL > 0)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await purge_expired()
+            if removed:
+                logger.info("Usunięto %d wygasłych kluczy idempotencji", removed)
+        except Exception:
+            logger.exception("Czyszczenie kluczy idempotencji nie powiodło się")
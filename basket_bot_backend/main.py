@@ -1,47 +1,100 @@
 import os
 import asyncio
 import json
-import requests
-from pydantic import BaseModel
-from fastapi import FastAPI, Depends, Request
+import base64
+import logging
+from datetime import date, datetime, timedelta
+from fastapi import FastAPI, Depends, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, delete, and_, or_, literal, union_all
 from contextlib import asynccontextmanager
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes# Importy lokalne
-from telegram import Update
-from .database import engine, Base, get_db
-from .models import User, Match, Profile
-from .auth import create_access_token, verify_token, get_current_user
+from typing import Literal
+# Importy lokalne
+from .database import get_db, dialect_insert, get_pool_stats, dispose_engines
+from .migrations import DB_AUTO_MIGRATE, run_migrations
+from .models import (
+    User, Match, MatchParticipant, Profile, Court, MatchmakingQueue, MatchArchive, MatchParticipantArchive, PlayerStats,
+)
+from .auth import (
+    create_access_token, create_refresh_token, redeem_refresh_token, get_current_user, get_current_account,
+    ACCESS_TOKEN_EXPIRE_MINUTES, token_cache,
+)
+from .telegram_client import get_telegram_client, close_telegram_client
+from .telegram_updates import bot_updates, TELEGRAM_POLLING
+from .notifications import notifier, enqueue_match_event, EVENT_FULL
+from .events import match_events, sse_stream
+from . import events, geo, schedule, ton_proof
+from .cache import profile_cache, invalidate_profile, MISSING
+from .schemas import (
+    ProfileUpdate, PROFILE_FIELDS, responses, ErrorResponse,
+    UserUpdateResponse, TelegramUserOut, AuthMeResponse, LoginRequest, LoginResponse, ChallengeResponse, RefreshRequest, AccountOut,
+    ProfileResponse, ProfileSavedResponse, MatchListResponse, MatchCreatedResponse, MatchHistoryResponse,
+    JoinResponse, ImportResponse, CourtCreate, CourtResponse, CourtListResponse,
+    NearbyMatchOut, NearbyMatchesResponse, AvailabilityResponse, TimeSlot,
+    TeamPlayer, TeamsResponse, QueueResponse, PlayerStatsResponse, LeaderboardEntry, LeaderboardResponse,
+)
+from .frontend import FrontendFiles, FRONTEND_DIST
+from .conditional import make_etag, etag_matches, not_modified, set_etag
+from .metrics import MetricsMiddleware, render_metrics
+from .matchmaking import assign_teams, matchmaking_loop, MATCHMAKING_INTERVAL
+from .archive import archive_loop, ARCHIVE_INTERVAL
+from .idempotency import idempotent, idempotency_cleanup_loop, IDEMPOTENCY_CLEANUP_INTERVAL
+from .stats import record_match_created, record_joins, sync_city
+from .bulk_import import import_players, ndjson_rows, array_rows, invalidate_imported, ImportTooLarge
+
+logger = logging.getLogger(__name__)
 
 # --- KONFIGURACJA BOTA ---
 TOKEN = os.getenv("BOT_TOKEN") or os.getenv("TELEGRAM_BOT_TOKEN")
 WEBAPP_URL = os.getenv("WEBAPP_URL", "https://hca-production.up.railway.app")
 
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [[InlineKeyboardButton("🏀 GRAJ W KOSZA", web_app=WebAppInfo(url=WEBAPP_URL))]]
-    await update.message.reply_text(
+async def start_command(update: dict):
+    message = update["message"]
+    logger.info("User %s sent /start command", message["from"]["id"])
+    keyboard = {"inline_keyboard": [[{"text": "🏀 GRAJ W KOSZA", "web_app": {"url": WEBAPP_URL}}]]}
+    await get_telegram_client().send_message(
+        message["chat"]["id"],
         "Siemano! Gotowy na mecz? Kliknij poniżej (Cloud ☁️):",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=keyboard,
     )
 
-    
+
+bot_updates.add_command("start", start_command)
+
+
 # --- LIFESPAN ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Start Bazy
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    
+    # Schemat zakłada krok `python -m basket_bot_backend.migrations` przed startem;
+    # lokalnie (SQLite) migrujemy od razu, bez refleksji schematu
+    if DB_AUTO_MIGRATE:
+        await run_migrations()
+
+    await notifier.start()
+    await bot_updates.start()
+    matchmaking_task = asyncio.create_task(matchmaking_loop()) if MATCHMAKING_INTERVAL > 0 else None
+    archive_task = asyncio.create_task(archive_loop()) if ARCHIVE_INTERVAL > 0 else None
+    idempotency_task = (
+        asyncio.create_task(idempotency_cleanup_loop()) if IDEMPOTENCY_CLEANUP_INTERVAL > 0 else None
+    )
+    # Lokalnie bez publicznego webhooka: update'y z getUpdates
+    polling_task = asyncio.create_task(bot_updates.poll()) if TELEGRAM_POLLING else None
+
     yield
     
-    # Stop Bota
-#     if bot_app:
-#         await bot_app.updater.stop()
-#         await bot_app.stop()
-#         await bot_app.shutdown()
+    for task in (matchmaking_task, archive_task, idempotency_task, polling_task):
+        if task:
+            task.cancel()
+    await bot_updates.stop()
+    await notifier.stop()
+    await close_telegram_client()
+    ton_proof.shutdown_executor()
+    await dispose_engines()
 
-app = FastAPI(lifespan=lifespan)
+# orjson zamiast json.dumps dla wszystkich odpowiedzi JSON
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -50,17 +103,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # --- ENDPOINTY ---
 
-@app.post("/api/profile")
+@app.post("/api/profile", response_model=responses(UserUpdateResponse, ErrorResponse))
 async def update_profile(request: Request, db: AsyncSession = Depends(get_db)):
     # 1. Odczytujemy dane
     try:
         data = await request.json()
-        print(f"DEBUG: {data}")
+        # Same nazwy pól - body zawiera telefon i portfel
+        logger.debug("/api/profile: pola %s", sorted(data))
     except Exception as e:
-        print(f"Błąd JSON: {e}")
+        logger.debug("/api/profile: błąd JSON: %s", e)
         return {"status": "error", "message": "Błąd JSON"}
     
     # 2. Wyciągamy ID
@@ -81,6 +136,8 @@ async def update_profile(request: Request, db: AsyncSession = Depends(get_db)):
         user = User(telegram_id=tg_id)
         db.add(user)
     
+    old_wallet = user.wallet_address
+
     # 4. Aktualizacja pól
     user.name = str(data.get("name") or user.name or "")
     user.age = str(data.get("age") or user.age or "")
@@ -90,7 +147,23 @@ async def update_profile(request: Request, db: AsyncSession = Depends(get_db)):
     
     await db.commit()
     await db.refresh(user)
-    return {"status": "success", "user": user}
+    invalidate_profile(tg_id, old_wallet, user.wallet_address)
+    return UserUpdateResponse(user=user)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Liczniki cache profili i tokenów (hits/misses/evictions) - do doboru *_CACHE_SIZE/TTL."""
+    return {"profile_cache": profile_cache.stats(), "token_cache": token_cache.stats()}
+
+@app.get("/api/db/stats")
+async def get_db_stats():
+    """Stan puli połączeń: pobrania, czas czekania, zajęte/wolne połączenia."""
+    return {"pool": get_pool_stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """Metryki w formacie Prometheusa: latencje tras, statusy, zapytania SQL per żądanie, pula, cache."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/matches")
 async def get_matches():
@@ -99,26 +172,64 @@ async def get_matches():
         {"id": 2, "venue": "OSiR Wola", "date": "Jutro, 20:00", "price": "20 PLN", "slots": "10/10", "status": "full"},
     ]
 
-@app.get("/api/profile/{telegram_id}")
-async def get_user_profile(telegram_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/api/profile/{telegram_id:int}", response_model=responses(TelegramUserOut, ErrorResponse))
+async def get_user_profile(
+    telegram_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
+    # W cache para (etag, odpowiedź) - 304 bez zapytania i bez serializacji
+    cached = profile_cache.get(("tg", telegram_id))
+    if cached is not MISSING:
+        etag, body = cached
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        return body
+
     result = await db.execute(select(User).where(User.telegram_id == telegram_id))
     user = result.scalar_one_or_none()
     
     if not user:
         return {"status": "not_found", "message": "Użytkownik nie znaleziony"}
     
-    return {
-        "telegram_id": user.telegram_id,
-        "name": user.name or "",
-        "age": user.age or "",
-        "height": user.height or "",
-        "number": user.number or "",
-        "wallet_address": user.wallet_address or ""
-    }
+    body = TelegramUserOut(
+        telegram_id=user.telegram_id,
+        name=user.name or "",
+        age=user.age or "",
+        height=user.height or "",
+        number=user.number or "",
+        wallet_address=user.wallet_address or ""
+    )
+    etag = make_etag("tg", body.telegram_id, body.wallet_address, body.name, body.age, body.height, body.number)
+    profile_cache.set(("tg", telegram_id), (etag, body))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return body
 
 # --- MATCH ENDPOINTS ---
 
-@app.post("/api/matches")
+async def resolve_user_wallet(db: AsyncSession, tg_id: int) -> str:
+    """
+    Zwraca wallet_address użytkownika o danym telegram_id.
+    Jeśli go nie ma, tworzy konto `tg_<id>` (jak /api/profile/telegram).
+    """
+    wallet = await db.scalar(
+        select(User.wallet_address).where(User.telegram_id == tg_id).limit(1)
+    )
+    if wallet is not None:  # "" to też istniejące konto (/api/profile bez portfela)
+        return wallet
+
+    wallet = f"tg_{tg_id}"
+    await db.execute(
+        dialect_insert(db, User)
+        .values(wallet_address=wallet, telegram_id=tg_id)
+        .on_conflict_do_nothing(index_elements=["wallet_address"])
+    )
+    return wallet
+
+
+@app.post("/api/matches", response_model=responses(MatchCreatedResponse, ErrorResponse))
+@idempotent
 async def create_match(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         data = await request.json()
@@ -127,54 +238,295 @@ async def create_match(request: Request, db: AsyncSession = Depends(get_db)):
     
     tg_id = data.get("telegram_id")
     venue = data.get("venue")
+    court_id = data.get("court_id")
     crowdfund_amount = data.get("crowdfund_amount", 0)
     slots_needed = data.get("slots_needed")
     
-    if not tg_id or not venue or not slots_needed:
-        return {"status": "error", "message": "Brak wymaganych pól: telegram_id, venue, slots_needed"}
+    if not tg_id or not (venue or court_id) or not slots_needed:
+        return {"status": "error", "message": "Brak wymaganych pól: telegram_id, venue lub court_id, slots_needed"}
     
     if slots_needed not in [8, 10]:
         return {"status": "error", "message": "slots_needed musi być 8 (4v4) lub 10 (5v5)"}
     
+    try:
+        tg_id = int(tg_id)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "telegram_id musi być liczbą"}
+
+    starts_at = ends_at = None
+    if data.get("starts_at"):
+        try:
+            starts_at = schedule.parse_datetime(data["starts_at"])
+            ends_at = (
+                schedule.parse_datetime(data["ends_at"]) if data.get("ends_at")
+                else starts_at + schedule.MATCH_DEFAULT_DURATION
+            )
+        except ValueError:
+            return {"status": "error", "message": "starts_at/ends_at muszą być w formacie ISO 8601"}
+        if not starts_at < ends_at <= starts_at + schedule.MATCH_MAX_DURATION:
+            return {"status": "error", "message": "Nieprawidłowy czas trwania meczu"}
+
+    if court_id is not None:
+        try:
+            court_id = int(court_id)
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "court_id musi być liczbą"}
+        if starts_at is not None:
+            # Blokada grafiku hali, potem sprawdzenie kolizji - do commitu nikt nie wciśnie się w ten termin
+            if not await schedule.lock_court_schedule(db, court_id):
+                await db.rollback()
+                return {"status": "error", "message": "Hala nie istnieje"}
+            conflict = await schedule.find_conflict(db, court_id, starts_at, ends_at)
+            if conflict is not None:
+                await db.rollback()
+                return {"status": "error", "message": f"Hala zajęta w tym terminie (mecz #{conflict})"}
+        court_name = await db.scalar(select(Court.name).where(Court.id == court_id))
+        if court_name is None:
+            await db.rollback()
+            return {"status": "error", "message": "Hala nie istnieje"}
+        venue = venue or court_name
+
+    organizer_wallet = await resolve_user_wallet(db, tg_id)
+
     new_match = Match(
         venue=venue,
+        court_id=court_id,
+        starts_at=starts_at,
+        ends_at=ends_at,
         crowdfund_amount=int(crowdfund_amount),
         slots_needed=int(slots_needed),
         current_players=1,
-        organizer_wallet=str(tg_id)
+        organizer_wallet=organizer_wallet
     )
     db.add(new_match)
+    await db.flush()
+
+    # Organizator zajmuje pierwsze miejsce (current_players=1)
+    db.add(MatchParticipant(match_id=new_match.match_id, user_wallet=organizer_wallet))
+    await record_match_created(db, organizer_wallet)
     await db.commit()
-    await db.refresh(new_match)
-    
-    return {
-        "status": "success",
-        "match_id": new_match.match_id,
-        "venue": new_match.venue,
-        "crowdfund_amount": new_match.crowdfund_amount,
-        "slots_needed": new_match.slots_needed,
-        "current_players": new_match.current_players
-    }
-
-@app.get("/api/matches-list")
-async def get_all_matches(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Match))
+
+    response = MatchCreatedResponse.model_validate(new_match)
+    match_events.publish(events.EVENT_CREATED, response.model_dump(mode="json", exclude={"status"}))
+    return response
+
+MATCHES_PAGE_SIZE = 50
+MATCHES_PAGE_MAX = 200
+
+
+def encode_match_cursor(created_at: datetime, match_id: int) -> str:
+    """Kursor keyset: ostatni (created_at, match_id) ze strony, base64url."""
+    raw = f"{created_at.isoformat()}|{match_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_match_cursor(cursor: str) -> tuple[datetime, int] | None:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, match_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(match_id)
+    except Exception:
+        return None
+
+
+@app.get("/api/matches-list", response_model=responses(MatchListResponse, ErrorResponse))
+async def get_all_matches(
+    request: Request,
+    response: Response,
+    limit: int = Query(MATCHES_PAGE_SIZE, ge=1, le=MATCHES_PAGE_MAX),
+    cursor: str | None = None,
+    open_only: bool = False,
+    slots_needed: int | None = None,
+    venue: str | None = None,
+    min_free_slots: int | None = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Lista meczów, od najnowszych, stronicowana kursorem (keyset).
+    Koszt zapytania zależy od `limit`, nie od rozmiaru tabeli -
+    kolejność (created_at, match_id) pokrywają indeksy z models.Match.
+    ETag strony to skrót (match_id, updated_at, current_players) jej meczów;
+    przy If-None-Match zgodnym z aktualną stroną wraca 304 bez body.
+    """
+    if slots_needed is not None and slots_needed not in [8, 10]:
+        return {"status": "error", "message": "slots_needed musi być 8 (4v4) lub 10 (5v5)"}
+
+    query = select(Match)
+
+    if cursor:
+        decoded = decode_match_cursor(cursor)
+        if decoded is None:
+            return {"status": "error", "message": "Nieprawidłowy kursor"}
+        last_created_at, last_match_id = decoded
+        query = query.where(
+            or_(
+                Match.created_at < last_created_at,
+                and_(Match.created_at == last_created_at, Match.match_id < last_match_id),
+            )
+        )
+
+    if open_only:
+        query = query.where(Match.current_players < Match.slots_needed)
+    if slots_needed is not None:
+        query = query.where(Match.slots_needed == slots_needed)
+    if venue:
+        query = query.where(Match.venue == venue)
+    if min_free_slots is not None:
+        query = query.where(Match.slots_needed - Match.current_players >= min_free_slots)
+
+    # limit + 1 - wiemy, czy istnieje następna strona, bez COUNT(*)
+    query = query.order_by(Match.created_at.desc(), Match.match_id.desc()).limit(limit + 1)
+    result = await db.execute(query)
     matches = result.scalars().all()
-    
-    return [
-        {
-            "match_id": m.match_id,
-            "venue": m.venue,
-            "crowdfund_amount": m.crowdfund_amount,
-            "slots_needed": m.slots_needed,
-            "current_players": m.current_players,
-            "slots_available": m.slots_needed - m.current_players,
-            "organizer_wallet": m.organizer_wallet
-        }
-        for m in matches
-    ]
 
-@app.post("/api/matches/{match_id}/join")
+    next_cursor = None
+    if len(matches) > limit:
+        matches = matches[:limit]
+        last = matches[-1]
+        next_cursor = encode_match_cursor(last.created_at, last.match_id)
+
+    etag = make_etag("matches", next_cursor, [(m.match_id, m.updated_at, m.current_players) for m in matches])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    # Obiekty ORM idą prosto do MatchOut (from_attributes) - bez słowników pole po polu
+    return MatchListResponse(matches=matches, next_cursor=next_cursor)
+
+
+@app.get("/api/matches/history", response_model=responses(MatchHistoryResponse, ErrorResponse))
+async def get_match_history(
+    limit: int = Query(MATCHES_PAGE_SIZE, ge=1, le=MATCHES_PAGE_MAX),
+    cursor: str | None = None,
+    telegram_id: int | None = None,
+    court_id: int | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Zarchiwizowane mecze (archive.py), od najnowszych, z tym samym kursorem co /api/matches-list.
+    `telegram_id` zawęża do meczów, w których gracz brał udział.
+    """
+    query = select(MatchArchive)
+
+    if cursor:
+        decoded = decode_match_cursor(cursor)
+        if decoded is None:
+            return {"status": "error", "message": "Nieprawidłowy kursor"}
+        last_created_at, last_match_id = decoded
+        query = query.where(
+            or_(
+                MatchArchive.created_at < last_created_at,
+                and_(MatchArchive.created_at == last_created_at, MatchArchive.match_id < last_match_id),
+            )
+        )
+
+    if telegram_id is not None:
+        wallet = await db.scalar(select(User.wallet_address).where(User.telegram_id == telegram_id))
+        if wallet is None:
+            return MatchHistoryResponse(matches=[])
+        query = query.where(
+            MatchArchive.match_id.in_(
+                select(MatchParticipantArchive.match_id).where(MatchParticipantArchive.user_wallet == wallet)
+            )
+        )
+    if court_id is not None:
+        query = query.where(MatchArchive.court_id == court_id)
+
+    query = query.order_by(MatchArchive.created_at.desc(), MatchArchive.match_id.desc()).limit(limit + 1)
+    matches = (await db.execute(query)).scalars().all()
+
+    next_cursor = None
+    if len(matches) > limit:
+        matches = matches[:limit]
+        next_cursor = encode_match_cursor(matches[-1].created_at, matches[-1].match_id)
+    return MatchHistoryResponse(matches=matches, next_cursor=next_cursor)
+
+
+NEARBY_RADIUS_KM = 5.0
+NEARBY_RADIUS_MAX_KM = 50.0
+NEARBY_LIMIT_MAX = 200
+
+
+@app.get("/api/matches/nearby", response_model=responses(NearbyMatchesResponse, ErrorResponse))
+async def get_nearby_matches(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(NEARBY_RADIUS_KM, gt=0, le=NEARBY_RADIUS_MAX_KM),
+    open_only: bool = True,
+    limit: int = Query(MATCHES_PAGE_SIZE, ge=1, le=NEARBY_LIMIT_MAX),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Mecze na halach w promieniu `radius` km od (lat, lng), od najbliższych.
+    Hale wybiera indeks geohash (kilka zakresów prefiksów, patrz geo.py),
+    więc koszt zależy od liczby hal i meczów w okolicy, nie od całej tabeli.
+    """
+    boxes = geo.bounding_boxes(lat, lng, radius)
+
+    # Osobny SELECT na każdą komórkę (UNION ALL) - każdy to jeden zakres po ix_courts_geocell.
+    # Jedno duże OR planista SQLite potrafi zamienić w skan całej tabeli.
+    # '~' jest za wszystkimi znakami base32 - zakres = "zaczyna się od prefiksu"
+    cell_ids = union_all(*[
+        select(Court.id).where(Court.geocell >= cell, Court.geocell < cell + "~")
+        for cell in geo.covering_cells(lat, lng, radius)
+    ])
+    result = await db.execute(
+        select(Court).where(
+            Court.id.in_(select(cell_ids.subquery())),
+            # Przy południku 180° dwa prostokąty, po obu stronach
+            or_(*[
+                and_(Court.lat.between(min_lat, max_lat), Court.lng.between(min_lng, max_lng))
+                for min_lat, min_lng, max_lat, max_lng in boxes
+            ]),
+        )
+    )
+    courts = {}
+    for court in result.scalars():
+        distance = geo.haversine_km(lat, lng, court.lat, court.lng)
+        if distance <= radius:
+            courts[court.id] = (distance, court)
+
+    found = []
+    if courts:
+        query = select(Match).where(Match.court_id.in_(list(courts)))
+        if open_only:
+            query = query.where(Match.current_players < Match.slots_needed)
+        for match in (await db.execute(query)).scalars():
+            distance, court = courts[match.court_id]
+            found.append((distance, match, court))
+
+    found.sort(key=lambda item: (item[0], -item[1].match_id))
+    return NearbyMatchesResponse(matches=[
+        NearbyMatchOut(
+            match_id=match.match_id,
+            venue=match.venue,
+            court_id=match.court_id,
+            starts_at=match.starts_at,
+            ends_at=match.ends_at,
+            crowdfund_amount=match.crowdfund_amount,
+            slots_needed=match.slots_needed,
+            current_players=match.current_players,
+            organizer_wallet=match.organizer_wallet,
+            distance_km=round(distance, 3),
+            court=court,
+        )
+        for distance, match, court in found[:limit]
+    ])
+
+@app.get("/api/matches/stream")
+async def stream_matches():
+    """
+    Server-Sent Events ze zmianami meczów (created, joined, full).
+    Po zdarzeniu `resync` klient powinien pobrać /api/matches-list od nowa.
+    """
+    return StreamingResponse(
+        sse_stream(match_events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/matches/{match_id}/join", response_model=responses(JoinResponse, ErrorResponse))
+@idempotent
 async def join_match(match_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     try:
         data = await request.json()
@@ -182,43 +534,226 @@ async def join_match(match_id: int, request: Request, db: AsyncSession = Depends
     except:
         return {"status": "error", "message": "Błąd JSON lub brak telegram_id"}
     
-    result = await db.execute(select(Match).where(Match.match_id == match_id))
-    match = result.scalar_one_or_none()
-    
-    if not match:
-        return {"status": "error", "message": "Mecz nie istnieje"}
-    
-    if match.current_players >= match.slots_needed:
+    try:
+        tg_id = int(tg_id)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "Błąd JSON lub brak telegram_id"}
+
+    # Warunkowy UPDATE - baza sama pilnuje limitu miejsc, bez read-modify-write.
+    # Na Postgresie blokuje tylko wiersz meczu, nie całą tabelę.
+    result = await db.execute(
+        update(Match)
+        .where(Match.match_id == match_id, Match.current_players < Match.slots_needed)
+        .values(current_players=Match.current_players + 1)
+        .returning(Match.current_players, Match.slots_needed)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+
+    if row is None:
+        await db.rollback()
+        exists = await db.scalar(select(Match.match_id).where(Match.match_id == match_id))
+        if exists is None:
+            return {"status": "error", "message": "Mecz nie istnieje"}
         return {"status": "error", "message": "Mecz pełny!"}
-    
-    match.current_players += 1
+
+    current_players, slots_needed = row
+    user_wallet = await resolve_user_wallet(db, tg_id)
+
+    # Unikalność (match_id, user_wallet) - powtórne dołączenie cofa inkrementację
+    inserted = await db.execute(
+        dialect_insert(db, MatchParticipant)
+        .values(match_id=match_id, user_wallet=user_wallet)
+        .on_conflict_do_nothing(index_elements=["match_id", "user_wallet"])
+        .returning(MatchParticipant.id)
+    )
+    if inserted.first() is None:
+        await db.rollback()
+        return {"status": "error", "message": "Już jesteś zapisany na ten mecz"}
+    await record_joins(db, [user_wallet])
+
+    if current_players >= slots_needed:
+        await assign_teams(db, match_id)
+        enqueue_match_event(
+            db, match_id, EVENT_FULL,
+            f"🏀 Mecz #{match_id} jest pełny ({current_players}/{slots_needed})! Składy są gotowe."
+        )
+
     await db.commit()
-    await db.refresh(match)
+
+    match_events.publish_slots(match_id, current_players, slots_needed)
+
+    if current_players >= slots_needed:
+        notifier.schedule(match_id)
     
-    return {
-        "status": "success",
-        "message": f"Dołączyłeś się do meczu! ({match.current_players}/{match.slots_needed})",
-        "current_players": match.current_players,
-        "slots_available": match.slots_needed - match.current_players
-    }
+    return JoinResponse(
+        message=f"Dołączyłeś się do meczu! ({current_players}/{slots_needed})",
+        current_players=current_players,
+        slots_available=slots_needed - current_players
+    )
+
+@app.get("/api/matches/{match_id}/teams", response_model=responses(TeamsResponse, ErrorResponse))
+async def get_match_teams(match_id: int, db: AsyncSession = Depends(get_db)):
+    """Składy meczu (team = None, dopóki mecz się nie zapełni)."""
+    result = await db.execute(
+        select(MatchParticipant.user_wallet, MatchParticipant.team, Profile.nickname, Profile.skill_level, Profile.preferred_position)
+        .outerjoin(Profile, Profile.user_id == MatchParticipant.user_wallet)
+        .where(MatchParticipant.match_id == match_id)
+        .order_by(MatchParticipant.team, MatchParticipant.id)
+    )
+    players = [TeamPlayer(**row._mapping) for row in result]
+    if not players:
+        return {"status": "error", "message": "Mecz nie istnieje"}
+    return TeamsResponse(match_id=match_id, players=players)
+
+# --- STATYSTYKI ---
+
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MAX = 100
+
+
+@app.get("/api/players/{telegram_id:int}/stats", response_model=responses(PlayerStatsResponse, ErrorResponse))
+async def get_player_stats(telegram_id: int, db: AsyncSession = Depends(get_db)):
+    row = (await db.execute(
+        select(User.wallet_address, PlayerStats.matches_played, PlayerStats.matches_organized)
+        .outerjoin(PlayerStats, PlayerStats.user_wallet == User.wallet_address)
+        .where(User.telegram_id == telegram_id)
+        .limit(1)
+    )).first()
+    if row is None:
+        return {"status": "not_found", "message": "Użytkownik nie znaleziony"}
+    return PlayerStatsResponse(
+        telegram_id=telegram_id, matches_played=row.matches_played or 0, matches_organized=row.matches_organized or 0
+    )
+
+
+@app.get("/api/leaderboard", response_model=responses(LeaderboardResponse, ErrorResponse))
+async def get_leaderboard(
+    city: str,
+    by: Literal["played", "organized"] = "played",
+    limit: int = Query(LEADERBOARD_SIZE, ge=1, le=LEADERBOARD_MAX),
+    db: AsyncSession = Depends(get_db),
+):
+    """Top graczy miasta - zakres indeksu (city, licznik) z player_stats czytany od końca, bez sortowania."""
+    counter = PlayerStats.matches_played if by == "played" else PlayerStats.matches_organized
+    result = await db.execute(
+        select(PlayerStats.user_wallet, PlayerStats.matches_played, PlayerStats.matches_organized, Profile.nickname)
+        .outerjoin(Profile, Profile.user_id == PlayerStats.user_wallet)
+        .where(PlayerStats.city == city, counter > 0)
+        .order_by(counter.desc(), PlayerStats.user_wallet.desc())
+        .limit(limit)
+    )
+    players = [LeaderboardEntry(rank=rank, **row._mapping) for rank, row in enumerate(result, 1)]
+    return LeaderboardResponse(city=city, by=by, players=players)
+
+# --- MATCHMAKING ---
+
+@app.post("/api/matchmaking/queue", response_model=responses(QueueResponse, ErrorResponse))
+async def join_matchmaking_queue(request: Request, db: AsyncSession = Depends(get_db)):
+    """Gracz czeka na dowolny otwarty mecz; dopisze go najbliższy przebieg matchmakingu."""
+    try:
+        data = await request.json()
+        tg_id = int(data.get("telegram_id"))
+    except Exception:
+        return {"status": "error", "message": "Błąd JSON lub brak telegram_id"}
+
+    slots_needed = data.get("slots_needed")
+    if slots_needed is not None and slots_needed not in [8, 10]:
+        return {"status": "error", "message": "slots_needed musi być 8 (4v4) lub 10 (5v5)"}
+
+    wallet = await resolve_user_wallet(db, tg_id)
+    stmt = dialect_insert(db, MatchmakingQueue).values(user_wallet=wallet, slots_needed=slots_needed)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_wallet"], set_={"slots_needed": stmt.excluded.slots_needed}
+    ))
+    await db.commit()
+    return QueueResponse(message="Czekasz na mecz")
+
+@app.delete("/api/matchmaking/queue/{telegram_id:int}", response_model=responses(QueueResponse, ErrorResponse))
+async def leave_matchmaking_queue(telegram_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        delete(MatchmakingQueue).where(
+            MatchmakingQueue.user_wallet.in_(select(User.wallet_address).where(User.telegram_id == telegram_id))
+        )
+    )
+    await db.commit()
+    if not result.rowcount:
+        return {"status": "error", "message": "Nie czekasz na mecz"}
+    return QueueResponse(message="Usunięto z kolejki")
+
+# --- COURTS ---
+
+@app.get("/api/courts", response_model=CourtListResponse)
+async def get_courts(db: AsyncSession = Depends(get_db)):
+    """Lista hal (do wyboru przy tworzeniu meczu)."""
+    result = await db.execute(select(Court).order_by(Court.name, Court.id))
+    return CourtListResponse(courts=result.scalars().all())
+
+@app.post("/api/courts", response_model=responses(CourtResponse, ErrorResponse))
+async def create_court(
+    court_data: CourtCreate, wallet_address: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    """
+    Dodaje halę z mapy (lat/lng); geohash liczony przy zapisie.
+    Requires valid JWT token
+    """
+    court = Court(**court_data.model_dump(), geocell=geo.encode(court_data.lat, court_data.lng))
+    db.add(court)
+    await db.commit()
+    return CourtResponse(court=court)
+
+@app.get("/api/courts/{court_id}/availability", response_model=responses(AvailabilityResponse, ErrorResponse))
+async def get_court_availability(
+    court_id: int,
+    day: date = Query(..., alias="date"),
+    duration: int = Query(int(schedule.MATCH_DEFAULT_DURATION.total_seconds() // 60), ge=15, le=int(schedule.MATCH_MAX_DURATION.total_seconds() // 60)),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Zajęte terminy hali w danym dniu (UTC) i wolne okna w godzinach otwarcia,
+    w których zmieści się mecz trwający `duration` minut.
+    """
+    court = await db.get(Court, court_id)
+    if court is None:
+        return {"status": "error", "message": "Hala nie istnieje"}
+
+    opens_at, closes_at = schedule.opening_hours(day)
+    booked = await schedule.bookings_between(db, court_id, opens_at, closes_at)
+    free = schedule.free_windows(
+        [(m.starts_at, m.ends_at) for m in booked], opens_at, closes_at, timedelta(minutes=duration)
+    )
+    return AvailabilityResponse(
+        court_id=court_id,
+        date=day,
+        booked=[TimeSlot(starts_at=m.starts_at, ends_at=m.ends_at, match_id=m.match_id) for m in booked],
+        free=[TimeSlot(starts_at=start, ends_at=end) for start, end in free],
+    )
 
 # --- AUTH ENDPOINTS ---
 
-class LoginRequest(BaseModel):
-    wallet_address: str
-    message: str
-    signature: str
+@app.post("/api/auth/challenge", response_model=ChallengeResponse)
+async def auth_challenge():
+    """Payload do ton_proof (TON Connect) - podpisany przez portfel wraca w /api/auth/login."""
+    payload, expires_at = ton_proof.new_challenge()
+    return ChallengeResponse(payload=payload, expires_at=expires_at)
 
-@app.post("/api/auth/login")
+@app.post("/api/auth/login", response_model=responses(LoginResponse, ErrorResponse))
 async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     """
     TON Wallet authentication endpoint
-    Verifies wallet signature and returns JWT token
+    Verifies the ton_proof signature and returns JWT token
     """
+    proof = request.proof
+    try:
+        # Konto zakładamy pod adresem surowym: raw i obie postacie user-friendly to ten sam portfel
+        wallet_address = await ton_proof.verify_proof(
+            request.wallet_address, proof.timestamp, proof.domain.value, proof.domain.length_bytes,
+            proof.payload, proof.signature, proof.state_init,
+        )
+    except ton_proof.ProofError as e:
+        return {"status": "error", "message": str(e)}
+
     try:
-        # Verify the signature (simplified - implement full verification in production)
-        wallet_address = request.wallet_address
-        
         # Check if user exists or create new one
         result = await db.execute(select(User).where(User.wallet_address == wallet_address))
         user = result.scalar_one_or_none()
@@ -234,95 +769,97 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
             await db.commit()
             await db.refresh(user)
         
-        # Generate JWT token
-        access_token = create_access_token(wallet_address=wallet_address)
-        
-        return {
-            "status": "success",
-            "access_token": access_token,
-            "token_type": "bearer",
-            "wallet_address": wallet_address
-        }
+        return issue_tokens(wallet_address)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-@app.get("/api/auth/me")
-async def get_auth_profile(wallet_address: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+def issue_tokens(wallet_address: str) -> LoginResponse:
+    return LoginResponse(
+        access_token=create_access_token(wallet_address=wallet_address),
+        refresh_token=create_refresh_token(wallet_address),
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        wallet_address=wallet_address,
+    )
+
+@app.post("/api/auth/refresh", response_model=responses(LoginResponse, ErrorResponse))
+async def refresh_tokens(request: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Nowa para tokenów za refresh token - bez ponownego podpisu portfelem.
+    Refresh token jest jednorazowy: każda wymiana zwraca nowy, a stary przestaje działać.
+    Invalid or expired refresh token -> 401 (client goes back to wallet login)
+    """
+    wallet_address = await redeem_refresh_token(db, request.refresh_token)
+    exists = await db.scalar(select(User.wallet_address).where(User.wallet_address == wallet_address))
+    if exists is None:
+        await db.rollback()
+        return {"status": "error", "message": "User not found"}
+    # Zużyty jti zapisany przed wydaniem nowej pary - ten sam token drugi raz dostanie 401
+    await db.commit()
+    return issue_tokens(wallet_address)
+
+@app.get("/api/auth/me", response_model=responses(AuthMeResponse, ErrorResponse))
+async def get_auth_profile(account: AccountOut | None = Depends(get_current_account)):
     """
     Get current user profile
     Requires valid JWT token
     """
-    try:
-        result = await db.execute(select(User).where(User.wallet_address == wallet_address))
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            return {"status": "error", "message": "User not found"}
-        
-        return {
-            "status": "success",
-            "user": {
-                "wallet_address": user.wallet_address,
-                "username": user.username or "",
-                "telegram_id": user.telegram_id or ""
-            }
-        }
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    if account is None:
+        return {"status": "error", "message": "User not found"}
+    return AuthMeResponse(user={
+        "wallet_address": account.wallet_address,
+        "username": account.username or "",
+        "telegram_id": account.telegram_id or ""
+    })
 
 
                     
 # ===== PROFILE ENDPOINTS =====
 
-class ProfileUpdate(BaseModel):
-    nickname: str | None = None
-    age: int | None = None
-    city: str | None = None
-    skill_level: str | None = None  # beginner, intermediate, advanced
-    preferred_position: str | None = None  # G, F, C
-    bio: str | None = None
-    phone: str | None = None
+async def upsert_profile(db: AsyncSession, wallet_address: str, fields: dict, update_fields) -> Profile | None:
+    """
+    Tworzy lub aktualizuje profil jednym zapytaniem:
+    INSERT ... SELECT FROM users ... ON CONFLICT (user_id) DO UPDATE ... RETURNING.
+    `update_fields` - pola nadpisywane przy istniejącym profilu.
+    Zwraca None, jeśli użytkownik o danym wallet_address nie istnieje.
+    """
+    columns = {"user_id": User.wallet_address}
+    for name, value in fields.items():
+        columns[name] = literal(value, type_=getattr(Profile, name).type).label(name)
+
+    stmt = dialect_insert(db, Profile).from_select(
+        list(columns),
+        select(*columns.values()).where(User.wallet_address == wallet_address),
+    )
+    updates = {name: stmt.excluded[name] for name in update_fields}
+    updates["updated_at"] = datetime.utcnow()
+    stmt = stmt.on_conflict_do_update(index_elements=["user_id"], set_=updates).returning(Profile)
+
+    profile = await db.scalar(stmt, execution_options={"populate_existing": True})
+    if profile is not None and "city" in update_fields:
+        await sync_city(db, [wallet_address])
+    return profile
 
 
-@app.get("/api/profile/me")
-async def get_profile(wallet_address: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+@app.get("/api/profile/me", response_model=responses(ProfileResponse, ErrorResponse))
+async def get_profile(
+    request: Request, response: Response, account: AccountOut | None = Depends(get_current_account)
+):
     """
     Get current user's profile
     Requires valid JWT token
     """
-    try:
-        # Get user with profile
-        result = await db.execute(select(User).where(User.wallet_address == wallet_address))
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            return {"status": "error", "message": "User not found"}
-        
-        profile = user.profile
-        
-        if not profile:
-            return {"status": "success", "profile": None}
-        
-        return {
-            "status": "success",
-            "profile": {
-                "id": profile.id,
-                "nickname": profile.nickname,
-                "age": profile.age,
-                "city": profile.city,
-                "skill_level": profile.skill_level,
-                "preferred_position": profile.preferred_position,
-                "bio": profile.bio,
-                "phone": profile.phone,
-                "created_at": profile.created_at.isoformat(),
-                "updated_at": profile.updated_at.isoformat()
-            }
-        }
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    if account is None:
+        return {"status": "error", "message": "User not found"}
 
+    profile = account.profile
+    etag = make_etag("profile", account.wallet_address, profile and (profile.id, profile.updated_at))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return ProfileResponse(profile=profile)
 
-@app.post("/api/profile/me")
+
+@app.post("/api/profile/me", response_model=responses(ProfileSavedResponse, ErrorResponse))
 async def update_profile_me(
 profile_data: ProfileUpdate, wallet_address: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """
@@ -330,72 +867,27 @@ profile_data: ProfileUpdate, wallet_address: str = Depends(get_current_user), db
     Requires valid JWT token
     """
     try:
-        # Get user
-        result = await db.execute(select(User).where(User.wallet_address == wallet_address))
-        user = result.scalar_one_or_none()
+        fields = profile_data.model_dump(include=set(PROFILE_FIELDS))
+        profile = await upsert_profile(
+            db, wallet_address, fields,
+            [name for name, value in fields.items() if value is not None]
+        )
         
-        if not user:
+        if not profile:
+            await db.rollback()
             return {"status": "error", "message": "User not found"}
         
-        # Check if profile exists
-        if user.profile:
-            # Update existing profile
-            profile = user.profile
-            if profile_data.nickname is not None:
-                profile.nickname = profile_data.nickname 
-            if profile_data.age is not None:
-                profile.age = profile_data.age
-            if profile_data.city is not None:
-                profile.city = profile_data.city
-            if profile_data.skill_level is not None:
-                profile.skill_level = profile_data.skill_level
-            if profile_data.preferred_position is not None:
-                profile.preferred_position = profile_data.preferred_position
-            if profile_data.bio is not None:
-                profile.bio = profile_data.bio
-            if profile_data.phone is not None:
-                profile.phone = profile_data.phone
-        else:
-            # Create new profile
-            profile = Profile(
-                user_id=user.wallet_address,
-                nickname=profile_data.nickname ,
-                age=profile_data.age,
-                city=profile_data.city,
-                skill_level=profile_data.skill_level,
-                preferred_position=profile_data.preferred_position,
-                bio=profile_data.bio,
-                phone=profile_data.phone
-            )
-            db.add(profile)
-        
         await db.commit()
-        await db.refresh(profile)
-                
+        invalidate_profile(None, wallet_address)
         
-        return {
-            "status": "success",
-            "message": "Profile saved successfully",
-            "profile": {
-                "id": profile.id,
-                "nickname": profile.nickname,
-                "age": profile.age,
-                "city": profile.city,
-                "skill_level": profile.skill_level,
-                "preferred_position": profile.preferred_position,
-                "bio": profile.bio,
-                "phone": profile.phone,
-                "created_at": profile.created_at.isoformat(),
-                "updated_at": profile.updated_at.isoformat()
-            }
-        }
+        return ProfileSavedResponse(message="Profile saved successfully", profile=profile)
     except Exception as e:
         await db.rollback()
         return {"status": "error", "message": str(e)}
 
 
 # --- SIMPLIFIED PROFILE ENDPOINT (za telegram_id bez JWT) ---
-@app.post("/api/profile/telegram")
+@app.post("/api/profile/telegram", response_model=responses(ProfileSavedResponse, ErrorResponse))
 async def save_profile_telegram(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Zapisz profil użytkownika przy użyciu telegram_id (bez JWT)
@@ -414,78 +906,64 @@ async def save_profile_telegram(request: Request, db: AsyncSession = Depends(get
     except:
         return {"status": "error", "message": "telegram_id musi być liczbą"}
     
-    # Szukaj użytkownika
-    result = await db.execute(select(User).where(User.telegram_id == tg_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        # Utwórz nowego użytkownika bez wallet_address
-        user = User(telegram_id=tg_id, wallet_address=f"tg_{tg_id}")
-        db.add(user)
-        await db.flush()
+    # Konto użytkownika (tworzy tg_<id>, jeśli go nie ma), potem upsert profilu
+    wallet_address = await resolve_user_wallet(db, tg_id)
+
+    fields = {name: data.get(name) for name in PROFILE_FIELDS}
+    profile = await upsert_profile(
+        db, wallet_address, fields,
+        [name for name, value in fields.items() if value]
+    )
     
-    # Szukaj profilu
-    profile_result = await db.execute(select(Profile).where(Profile.user_id == user.wallet_address))
-    profile = profile_result.scalar_one_or_none()
+    await db.commit()
+    invalidate_profile(tg_id, wallet_address)
     
-    if not profile:
-        # Utwórz nowy profil
-        profile = Profile(
-            user_id=user.wallet_address,
-            nickname=data.get("nickname"),
-            age=data.get("age"),
-            city=data.get("city"),
-            skill_level=data.get("skill_level"),
-            preferred_position=data.get("preferred_position"),
-            bio=data.get("bio"),
-            phone=data.get("phone")
-        )
-        db.add(profile)
+    return ProfileSavedResponse(message="Profil zapisany!", profile=profile)
+
+@app.post("/api/players/import", response_model=responses(ImportResponse, ErrorResponse))
+async def import_players_bulk(
+    request: Request, wallet_address: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    """
+    Zbiorczy import graczy i profili (np. cała liga).
+    Body: tablica JSON albo strumień NDJSON (Content-Type: application/x-ndjson).
+    Wszystko w jednej transakcji; błędne wiersze są pomijane i zwracane w `errors`.
+    Requires valid JWT token
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        rows = ndjson_rows(request.stream())
     else:
-        # Aktualizuj istniejący profil
-        if data.get("nickname"):
-            profile.nickname = data.get("nickname")
-        if data.get("age"):
-            profile.age = data.get("age")
-        if data.get("city"):
-            profile.city = data.get("city")
-        if data.get("skill_level"):
-            profile.skill_level = data.get("skill_level")
-        if data.get("preferred_position"):
-            profile.preferred_position = data.get("preferred_position")
-        if data.get("bio"):
-            profile.bio = data.get("bio")
-        if data.get("phone"):
-            profile.phone = data.get("phone")
-    
+        try:
+            data = await request.json()
+        except Exception:
+            return {"status": "error", "message": "Błąd JSON"}
+        if not isinstance(data, list):
+            return {"status": "error", "message": "Oczekiwano tablicy JSON"}
+        rows = array_rows(data)
+
+    try:
+        report = await import_players(db, rows)
+    except ImportTooLarge as e:
+        await db.rollback()
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        await db.rollback()
+        return {"status": "error", "message": str(e)}
+
     await db.commit()
-    await db.refresh(profile)
-    
-    return {
-        "status": "success",
-        "message": "Profil zapisany!",
-        "profile": {
-            "id": profile.id,
-            "nickname": profile.nickname,
-            "age": profile.age,
-            "city": profile.city,
-            "skill_level": profile.skill_level,
-            "preferred_position": profile.preferred_position,
-            "bio": profile.bio,
-            "phone": profile.phone
-        }
-        }
-
-        # --- TELEGRAM WEBHOOK HANDLER        
+    invalidate_imported(report.pop("touched"))
+    return ImportResponse(**report)
+
+# --- TELEGRAM WEBHOOK HANDLER
 @app.post("/telegram")
-        async def handle_telegram_update(update: dict):
-        if update.get("message") and update["message"].get("text") == "/start":
-            user_id = update["message"]["from"]["id"]
-            print(f"User {user_id} sent /start command")
-            bot_token = os.getenv("BOT_TOKEN")
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            requests.post(url, json={"chat_id": user_id, "text": "Siema! Bot działa! 🎉"})
-
-            return {"ok": True}
-        return {"ok": True}                           
-                        
+async def handle_telegram_update(update: dict):
+    # Obsługa w workerach (telegram_updates.py) - Telegram dostaje odpowiedź od razu
+    if not bot_updates.submit(update):
+        # Kolejka pełna: 503, Telegram ponowi webhook później
+        return ORJSONResponse({"ok": False}, status_code=503)
+    return {"ok": True}
+
+# --- FRONTEND (musi być na końcu - "/" łapie wszystko, czego nie obsłużyły trasy API) ---
+if FRONTEND_DIST.is_dir():
+    app.mount("/", FrontendFiles(FRONTEND_DIST), name="frontend")
@@ -0,0 +1,311 @@
+"""
+Matchmaking: wyrównane składy i dopisywanie czekających graczy do meczów.
+
+- balance_teams() dzieli pełny mecz na dwie drużyny o możliwie równej sumie
+  umiejętności i podobnym rozkładzie pozycji (G/F/C). Dla 4v4/5v5 sprawdza
+  wszystkie podziały (najwyżej 126), dla większych składów - draft "wężykiem".
+- run_matchmaking() to zadanie wsadowe: graczy z matchmaking_queue dopisuje
+  do otwartych meczów paczkami po MATCHMAKING_CHUNK meczów, każda paczka
+  w osobnej, krótkiej transakcji. Czas przebiegu ogranicza MATCHMAKING_MAX_SECONDS.
+
+    python -m basket_bot_backend.matchmaking        # jeden przebieg (np. z crona)
+"""
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from itertools import combinations
+from sqlalchemy import select, update, delete, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal, dialect_insert
+from .models import Match, MatchParticipant, MatchmakingQueue, Profile
+from .notifications import enqueue_match_event, EVENT_FULL
+from .stats import record_joins
+
+logger = logging.getLogger(__name__)
+
+MATCHMAKING_CHUNK = int(os.getenv("MATCHMAKING_CHUNK", "500"))
+MATCHMAKING_MAX_SECONDS = float(os.getenv("MATCHMAKING_MAX_SECONDS", "30"))
+MATCHMAKING_MAX_QUEUE = int(os.getenv("MATCHMAKING_MAX_QUEUE", "50000"))
+# 0 = zadanie uruchamiane tylko z zewnątrz (CLI / cron)
+MATCHMAKING_INTERVAL = float(os.getenv("MATCHMAKING_INTERVAL", "0"))
+
+SKILL_RATING = {"beginner": 1.0, "intermediate": 2.0, "advanced": 3.0}
+DEFAULT_SKILL = SKILL_RATING["intermediate"]
+POSITIONS = ("G", "F", "C")
+# Ile "punktów umiejętności" kosztuje jeden gracz danej pozycji więcej po jednej stronie
+POSITION_WEIGHT = 0.5
+EXHAUSTIVE_MAX_PLAYERS = 12
+
+
+@dataclass
+class Player:
+    wallet: str
+    skill: float = DEFAULT_SKILL
+    position: str | None = None
+
+
+def player_from_profile(wallet: str, skill_level: str | None, position: str | None) -> Player:
+    return Player(
+        wallet=wallet,
+        skill=SKILL_RATING.get((skill_level or "").lower(), DEFAULT_SKILL),
+        position=(position or "").upper() or None,
+    )
+
+
+def _imbalance(team_a: list[Player], team_b: list[Player]) -> float:
+    cost = abs(sum(p.skill for p in team_a) - sum(p.skill for p in team_b))
+    for position in POSITIONS:
+        count_a = sum(1 for p in team_a if p.position == position)
+        count_b = sum(1 for p in team_b if p.position == position)
+        cost += POSITION_WEIGHT * abs(count_a - count_b)
+    return cost
+
+
+def balance_teams(players: list[Player]) -> dict[str, int]:
+    """wallet -> drużyna (1 albo 2). Deterministyczne dla tej samej listy graczy."""
+    players = sorted(players, key=lambda p: p.wallet)
+    if len(players) < 2:
+        return {p.wallet: 1 for p in players}
+
+    if len(players) > EXHAUSTIVE_MAX_PLAYERS:
+        # Draft wężykiem: 1-2-2-1-1-2-... po graczach od najlepszego
+        ranked = sorted(players, key=lambda p: (-p.skill, p.wallet))
+        return {p.wallet: 1 if i % 4 in (0, 3) else 2 for i, p in enumerate(ranked)}
+
+    size = len(players) // 2
+    first, rest = players[0], players[1:]
+    best_cost, best_team = None, None
+    # Pierwszy gracz zawsze w drużynie 1 - każdy podział liczony raz
+    for others in combinations(range(len(rest)), size - 1):
+        chosen = set(others)
+        team_a = [first] + [rest[i] for i in others]
+        team_b = [p for i, p in enumerate(rest) if i not in chosen]
+        cost = _imbalance(team_a, team_b)
+        if best_cost is None or cost < best_cost:
+            best_cost, best_team = cost, team_a
+    team_one = {p.wallet for p in best_team}
+    return {p.wallet: 1 if p.wallet in team_one else 2 for p in players}
+
+
+async def load_players(db: AsyncSession, match_ids: list[int]) -> dict[int, list[Player]]:
+    """Uczestnicy meczów z poziomem i pozycją z profilu - jedno zapytanie."""
+    result = await db.execute(
+        select(MatchParticipant.match_id, MatchParticipant.user_wallet, Profile.skill_level, Profile.preferred_position)
+        .outerjoin(Profile, Profile.user_id == MatchParticipant.user_wallet)
+        .where(MatchParticipant.match_id.in_(match_ids))
+    )
+    players: dict[int, list[Player]] = {match_id: [] for match_id in match_ids}
+    for match_id, wallet, skill_level, position in result:
+        players[match_id].append(player_from_profile(wallet, skill_level, position))
+    return players
+
+
+async def save_teams(db: AsyncSession, teams: dict[int, dict[str, int]]):
+    rows = [
+        {"b_match_id": match_id, "b_wallet": wallet, "b_team": team}
+        for match_id, assignment in teams.items()
+        for wallet, team in assignment.items()
+    ]
+    if not rows:
+        return
+    table = MatchParticipant.__table__
+    await db.execute(
+        update(table)
+        .where(table.c.match_id == bindparam("b_match_id"), table.c.user_wallet == bindparam("b_wallet"))
+        .values(team=bindparam("b_team")),
+        rows,
+    )
+
+
+async def assign_teams(db: AsyncSession, match_id: int) -> dict[str, int]:
+    """Dzieli uczestników pełnego meczu na drużyny (w bieżącej transakcji)."""
+    players = (await load_players(db, [match_id]))[match_id]
+    teams = balance_teams(players)
+    await save_teams(db, {match_id: teams})
+    return teams
+
+
+class WaitingPool:
+    """Czekający gracze pogrupowani (preferowana liczba miejsc, poziom), FIFO w grupie."""
+
+    def __init__(self, players: list[tuple[Player, int | None]]):
+        self._groups: dict[tuple[int | None, float], list[Player]] = {}
+        for player, slots_needed in players:
+            self._groups.setdefault((slots_needed, player.skill), []).append(player)
+        for group in self._groups.values():
+            group.reverse()  # pop() z końca = najdłużej czekający
+
+    def __bool__(self):
+        return any(self._groups.values())
+
+    def take(self, slots_needed: int, target_skill: float, exclude: set[str]) -> Player | None:
+        """Najdłużej czekający gracz pasujący do meczu, o poziomie najbliższym średniej meczu."""
+        candidates = [
+            key for key, group in self._groups.items()
+            if group and key[0] in (None, slots_needed)
+        ]
+        candidates.sort(key=lambda key: (abs(key[1] - target_skill), key[0] is None))
+        for key in candidates:
+            group = self._groups[key]
+            for i in range(len(group) - 1, -1, -1):
+                if group[i].wallet not in exclude:
+                    return group.pop(i)
+        return None
+
+
+@dataclass
+class MatchmakingReport:
+    assigned_players: int = 0
+    filled_matches: list[int] = field(default_factory=list)
+    matches_scanned: int = 0
+    timed_out: bool = False
+
+
+async def _load_queue(db: AsyncSession) -> WaitingPool:
+    result = await db.execute(
+        select(MatchmakingQueue.user_wallet, MatchmakingQueue.slots_needed, Profile.skill_level, Profile.preferred_position)
+        .outerjoin(Profile, Profile.user_id == MatchmakingQueue.user_wallet)
+        .order_by(MatchmakingQueue.created_at, MatchmakingQueue.user_wallet)
+        .limit(MATCHMAKING_MAX_QUEUE)
+    )
+    return WaitingPool([
+        (player_from_profile(wallet, skill_level, position), slots_needed)
+        for wallet, slots_needed, skill_level, position in result
+    ])
+
+
+async def _fill_chunk(
+    db: AsyncSession, match_ids: list[int], pool: WaitingPool, report: MatchmakingReport
+) -> list[tuple[int, int, int]]:
+    """Dopisuje graczy do meczów paczki; zwraca (match_id, current_players, slots_needed) zmienionych meczów."""
+    # Warunkowy UPDATE blokuje wiersze paczki (Postgres: wiersze, SQLite: zapis)
+    # i zwraca aktualny stan - równoległe join_match czekają do naszego commitu
+    table = Match.__table__
+    locked = await db.execute(
+        update(table)
+        .where(table.c.match_id.in_(match_ids), table.c.current_players < table.c.slots_needed)
+        .values(current_players=table.c.current_players, updated_at=table.c.updated_at)
+        .returning(table.c.match_id, table.c.current_players, table.c.slots_needed)
+    )
+    open_matches = sorted(locked.all())
+    if not open_matches:
+        return []
+
+    players = await load_players(db, [match_id for match_id, _, _ in open_matches])
+    slots = {match_id: slots_needed for match_id, _, slots_needed in open_matches}
+    new_participants = []
+    counts = []
+    filled = {}
+    for match_id, current_players, slots_needed in open_matches:
+        present = players[match_id]
+        wallets = {p.wallet for p in present}
+        added = 0
+        while current_players + added < slots_needed:
+            target = sum(p.skill for p in present) / len(present) if present else DEFAULT_SKILL
+            player = pool.take(slots_needed, target, wallets)
+            if player is None:
+                break
+            present.append(player)
+            wallets.add(player.wallet)
+            new_participants.append({"match_id": match_id, "user_wallet": player.wallet})
+            added += 1
+        if added:
+            counts.append({"b_match_id": match_id, "b_count": current_players + added})
+            if current_players + added >= slots_needed:
+                filled[match_id] = (current_players + added, slots_needed)
+
+    if not new_participants:
+        return []
+
+    await db.execute(dialect_insert(db, MatchParticipant.__table__).on_conflict_do_nothing(), new_participants)
+    await record_joins(db, [row["user_wallet"] for row in new_participants])
+    await db.execute(
+        update(table).where(table.c.match_id == bindparam("b_match_id")).values(current_players=bindparam("b_count")),
+        counts,
+    )
+    await db.execute(
+        delete(MatchmakingQueue).where(MatchmakingQueue.user_wallet.in_([row["user_wallet"] for row in new_participants]))
+    )
+    await save_teams(db, {match_id: balance_teams(players[match_id]) for match_id in filled})
+    for match_id, (current_players, slots_needed) in filled.items():
+        enqueue_match_event(
+            db, match_id, EVENT_FULL,
+            f"🏀 Mecz #{match_id} jest pełny ({current_players}/{slots_needed})! Składy są gotowe."
+        )
+
+    report.assigned_players += len(new_participants)
+    report.filled_matches.extend(filled)
+    return [(row["b_match_id"], row["b_count"], slots[row["b_match_id"]]) for row in counts]
+
+
+async def run_matchmaking(session_factory=AsyncSessionLocal, max_seconds: float = MATCHMAKING_MAX_SECONDS) -> MatchmakingReport:
+    """
+    Jeden przebieg: otwarte mecze od najstarszych, paczkami (keyset po match_id),
+    dopóki są czekający gracze i nie minął limit czasu.
+    """
+    from .events import match_events
+    from .notifications import notifier
+
+    report = MatchmakingReport()
+    deadline = time.monotonic() + max_seconds
+    async with session_factory() as db:
+        pool = await _load_queue(db)
+        last_id = 0
+        while pool:
+            if time.monotonic() > deadline:
+                report.timed_out = True
+                break
+            match_ids = list(await db.scalars(
+                select(Match.match_id)
+                .where(Match.match_id > last_id, Match.current_players < Match.slots_needed)
+                .order_by(Match.match_id)
+                .limit(MATCHMAKING_CHUNK)
+            ))
+            if not match_ids:
+                break
+            last_id = match_ids[-1]
+            report.matches_scanned += len(match_ids)
+
+            changed = await _fill_chunk(db, match_ids, pool, report)
+            await db.commit()
+
+            # Po commicie, jak w join_match: częściowo dopełnione mecze to `joined`, pełne - `full`
+            for match_id, current_players, slots_needed in changed:
+                match_events.publish_slots(match_id, current_players, slots_needed)
+                if current_players >= slots_needed:
+                    notifier.schedule(match_id)
+
+    logger.info(
+        "Matchmaking: %d graczy, %d pełnych meczów, %d meczów sprawdzonych%s",
+        report.assigned_players, len(report.filled_matches), report.matches_scanned,
+        " (limit czasu)" if report.timed_out else "",
+    )
+    return report
+
+
+async def matchmaking_loop(interval: float = MATCHMAKING_INTERVAL):
+    """Okresowe przebiegi w procesie aplikacji (gdy MATCHMAKING_INTERVAL > 0)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_matchmaking()
+        except Exception:
+            logger.exception("Matchmaking nie powiódł się")
+
+
+async def main():
+    from .database import dispose_engines
+
+    report = await run_matchmaking()
+    print(
+        f"assigned {report.assigned_players} players, filled {len(report.filled_matches)} matches, "
+        f"scanned {report.matches_scanned}{' (timed out)' if report.timed_out else ''}"
+    )
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+"""
+Metryki aplikacji w formacie tekstowym Prometheusa (GET /metrics).
+
+Bez zależności od prometheus_client: liczniki, gauge i histogramy trzymane
+w pamięci procesu. Przy kilku workerach uvicorna każdy ma własne liczniki -
+Prometheus i tak sumuje je po instancjach.
+"""
+import time
+import bisect
+import contextvars
+from .database import query_observers, get_pool_stats
+from .cache import profile_cache
+from .auth import token_cache
+from .telegram_updates import bot_updates
+from . import idempotency, ton_proof
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+QUERY_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: tuple = (), value: float = 0):
+        self._values[labels] = value
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [liczniki kubełków..., suma, liczba]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def samples(self):
+        for labels, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, labels, f'le="{bound}"'), cumulative
+            yield f"{self.name}_bucket", _format_labels(self.labelnames, labels, 'le="+Inf"'), state[-1]
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), state[-2]
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), state[-1]
+
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served")
+db_statements_per_request = Histogram(
+    "db_statements_per_request", "SQL statements issued per HTTP request", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_time_per_request = Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request", ("method", "route"),
+    buckets=QUERY_TIME_BUCKETS,
+)
+db_statements_total = Counter("db_statements_total", "SQL statements executed")
+db_statement_duration = Histogram(
+    "db_statement_duration_seconds", "SQL statement latency", buckets=QUERY_TIME_BUCKETS
+)
+
+REGISTRY = [
+    http_requests_total,
+    http_request_duration,
+    http_requests_in_flight,
+    db_statements_per_request,
+    db_time_per_request,
+    db_statements_total,
+    db_statement_duration,
+]
+
+
+# [liczba zapytań, czas zapytań] bieżącego żądania
+_request_queries: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_queries", default=None)
+
+
+def _observe_query(elapsed: float):
+    db_statements_total.inc()
+    db_statement_duration.observe((), elapsed)
+    stats = _request_queries.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+query_observers.append(_observe_query)
+
+
+class MetricsMiddleware:
+    """Czyste ASGI (bez BaseHTTPMiddleware) - nie buforuje odpowiedzi, działa ze SSE."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+        stats = [0, 0.0]
+        token = _request_queries.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _request_queries.reset(token)
+
+            # Szablon trasy (/api/matches/{match_id}/join), nie surowa ścieżka - ograniczona liczba serii
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_requests_total.inc((method, route_path, str(status_code)))
+            http_request_duration.observe((method, route_path), elapsed)
+            db_statements_per_request.observe((method, route_path), stats[0])
+            db_time_per_request.observe((method, route_path), stats[1])
+
+
+def _collect_runtime_gauges() -> list[str]:
+    lines = []
+    gauges = [(f"db_pool_{key}", value) for key, value in get_pool_stats().items()]
+    gauges += [(f"profile_cache_{key}", value) for key, value in profile_cache.stats().items()]
+    gauges += [(f"token_cache_{key}", value) for key, value in token_cache.stats().items()]
+    gauges += [(f"telegram_updates_{key}", value) for key, value in bot_updates.stats().items()]
+    gauges += [(f"idempotency_{key}", value) for key, value in idempotency.stats().items()]
+    gauges += [(f"ton_proof_{key}", value) for key, value in ton_proof.stats().items()]
+    for name, value in gauges:
+        if isinstance(value, (int, float)):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    lines.extend(_collect_runtime_gauges())
+    return "\n".join(lines) + "\n"
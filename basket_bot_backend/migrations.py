@@ -0,0 +1,257 @@
+"""
+Wersjonowane migracje schematu.
+
+Uruchamiane jako osobny krok przed startem aplikacji:
+    python -m basket_bot_backend.migrations            # zastosuj brakujące
+    python -m basket_bot_backend.migrations --status   # pokaż stan
+
+Nowa zmiana schematu = nowa funkcja dopisana na końcu MIGRATIONS.
+Już wydanych migracji nie edytujemy. Baseline tworzy tabele z bieżących
+modeli, więc każda migracja musi być idempotentna (checkfirst / inspect).
+"""
+import os
+import sys
+import asyncio
+import logging
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, MetaData, Table, inspect, select, exists, func, text
+from sqlalchemy.schema import CreateTable
+from .database import engine, DATABASE_URL, env_bool, dispose_engines
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Lokalnie (SQLite) wygodniej migrować przy starcie; na produkcji robi to krok release
+DB_AUTO_MIGRATE = env_bool("DB_AUTO_MIGRATE", DATABASE_URL.startswith("sqlite"))
+
+schema_meta = MetaData()
+schema_version = Table(
+    "schema_version",
+    schema_meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+
+def _create_tables(conn, *tables):
+    for table in tables:
+        # Baseline bierze bieżące modele - tabele, do których prowadzą nowe FK, muszą powstać wcześniej
+        for fk in table.foreign_keys:
+            if fk.column.table is not table:
+                _create_tables(conn, fk.column.table)
+        table.create(conn, checkfirst=True)
+
+
+def _create_indexes(conn, table):
+    # Indeksy na kolumnach z późniejszych migracji powstaną razem z tymi kolumnami
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    for index in table.indexes:
+        if all(column.name in existing for column in index.columns):
+            index.create(conn, checkfirst=True)
+
+
+def m0001_baseline(conn):
+    # Bazy sprzed migracji mają już te tabele (create_all) - checkfirst je pomija
+    _create_tables(
+        conn,
+        models.User.__table__,
+        models.Match.__table__,
+        models.MatchParticipant.__table__,
+        models.Profile.__table__,
+    )
+
+
+def m0002_match_list_indexes(conn):
+    _create_indexes(conn, models.Match.__table__)
+
+
+def m0003_unique_participant(conn):
+    existing = {uc["name"] for uc in inspect(conn).get_unique_constraints("match_participants")}
+    if "uq_match_participants_match_user" in existing:
+        return
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE match_participants "
+            "ADD CONSTRAINT uq_match_participants_match_user UNIQUE (match_id, user_wallet)"
+        ))
+    else:
+        # SQLite nie ma ADD CONSTRAINT - unikalny indeks działa tak samo dla ON CONFLICT
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_match_participants_match_user "
+            "ON match_participants (match_id, user_wallet)"
+        ))
+
+
+def m0004_notification_outbox(conn):
+    _create_tables(conn, models.NotificationOutbox.__table__)
+
+
+def m0005_courts(conn):
+    _create_tables(conn, models.Court.__table__)
+    columns = {c["name"] for c in inspect(conn).get_columns("matches")}
+    if "court_id" not in columns:
+        # SQLite pozwala dodać kolumnę z REFERENCES, o ile domyślnie jest NULL
+        conn.execute(text("ALTER TABLE matches ADD COLUMN court_id INTEGER REFERENCES courts (id)"))
+    _create_indexes(conn, models.Match.__table__)
+
+
+def m0006_match_schedule(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("matches")}
+    for name in ("starts_at", "ends_at"):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE matches ADD COLUMN {name} {DateTime().compile(dialect=conn.dialect)}"))
+    columns = {c["name"] for c in inspect(conn).get_columns("courts")}
+    if "schedule_version" not in columns:
+        conn.execute(text("ALTER TABLE courts ADD COLUMN schedule_version INTEGER NOT NULL DEFAULT 0"))
+    _create_indexes(conn, models.Match.__table__)
+
+    if conn.dialect.name == "postgresql":
+        # Ograniczenie EXCLUDE jako druga linia obrony (pierwsza to blokada hali w schedule.py).
+        # Wymaga btree_gist - bez uprawnień do rozszerzeń zostaje samo sprawdzenie w aplikacji.
+        existing = conn.scalar(text("SELECT 1 FROM pg_constraint WHERE conname = 'ex_matches_court_time'"))
+        if existing:
+            return
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+                conn.execute(text(
+                    "ALTER TABLE matches ADD CONSTRAINT ex_matches_court_time "
+                    "EXCLUDE USING gist (court_id WITH =, tsrange(starts_at, ends_at) WITH &&) "
+                    "WHERE (court_id IS NOT NULL AND starts_at IS NOT NULL)"
+                ))
+        except Exception as e:
+            logger.warning("Pomijam ex_matches_court_time: %s", e)
+
+
+def m0007_matchmaking(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("match_participants")}
+    if "team" not in columns:
+        conn.execute(text("ALTER TABLE match_participants ADD COLUMN team INTEGER"))
+    _create_tables(conn, models.MatchmakingQueue.__table__)
+
+
+def m0008_match_archive(conn):
+    _create_tables(conn, models.MatchArchive.__table__, models.MatchParticipantArchive.__table__)
+
+
+def m0009_player_stats(conn):
+    from .stats import counts_query, STATS_COLUMNS
+
+    table = models.PlayerStats.__table__
+    _create_tables(conn, table)
+    if not conn.scalar(select(exists().select_from(table))):
+        # Liczniki z dotychczasowych meczów - jedno INSERT ... SELECT po stronie bazy
+        conn.execute(table.insert().from_select(STATS_COLUMNS, counts_query()))
+
+
+def m0010_idempotency_keys(conn):
+    _create_tables(conn, models.IdempotencyKey.__table__)
+
+
+def _rebuild_with_autoincrement(conn, table, archive):
+    """SQLite: AUTOINCREMENT da się dodać tylko przebudową tabeli (FK nie są włączone)."""
+    sql = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name})
+    if "AUTOINCREMENT" not in sql.upper():
+        columns = [c["name"] for c in inspect(conn).get_columns(table.name)]
+        meta = MetaData()
+        for fk in table.foreign_keys:  # REFERENCES kompiluje się tylko ze znanymi tabelami docelowymi
+            fk.column.table.to_metadata(meta)
+        rebuilt = table.to_metadata(meta, name=f"{table.name}_rebuilt")
+        conn.execute(CreateTable(rebuilt))  # bez indeksów - ich nazwy są jeszcze zajęte
+        column_list = ", ".join(columns)
+        conn.execute(text(f"INSERT INTO {rebuilt.name} ({column_list}) SELECT {column_list} FROM {table.name}"))
+        conn.execute(text(f"DROP TABLE {table.name}"))
+        conn.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {table.name}"))
+        _create_indexes(conn, table)
+
+    # Numeracja musi ominąć też id, które już są w archiwum
+    top = conn.scalar(select(func.max(archive.primary_key.columns[0])))
+    if top is not None:
+        conn.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+        ), {"name": table.name})
+        conn.execute(
+            text("UPDATE sqlite_sequence SET seq = max(seq, :top) WHERE name = :name"),
+            {"name": table.name, "top": top},
+        )
+
+
+def m0011_sqlite_autoincrement(conn):
+    # Postgres bierze id z sekwencji, które nigdy się nie cofają
+    if conn.dialect.name != "sqlite":
+        return
+    _rebuild_with_autoincrement(conn, models.Match.__table__, models.MatchArchive.__table__)
+    _rebuild_with_autoincrement(conn, models.MatchParticipant.__table__, models.MatchParticipantArchive.__table__)
+
+
+def m0012_used_refresh_tokens(conn):
+    _create_tables(conn, models.UsedRefreshToken.__table__)
+
+
+MIGRATIONS = [
+    (1, "baseline", m0001_baseline),
+    (2, "match list indexes", m0002_match_list_indexes),
+    (3, "unique match participant", m0003_unique_participant),
+    (4, "notification outbox", m0004_notification_outbox),
+    (5, "courts and match court_id", m0005_courts),
+    (6, "match schedule", m0006_match_schedule),
+    (7, "teams and matchmaking queue", m0007_matchmaking),
+    (8, "match archive", m0008_match_archive),
+    (9, "player stats", m0009_player_stats),
+    (10, "idempotency keys", m0010_idempotency_keys),
+    (11, "sqlite autoincrement for matches", m0011_sqlite_autoincrement),
+    (12, "used refresh tokens", m0012_used_refresh_tokens),
+]
+
+
+def _applied_versions(conn) -> set[int]:
+    schema_version.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def _upgrade(conn) -> list[int]:
+    if conn.dialect.name == "postgresql":
+        # Dwa równoległe deploye nie wykonają tej samej migracji dwa razy
+        conn.execute(text("SELECT pg_advisory_xact_lock(727274)"))
+
+    applied = _applied_versions(conn)
+    done = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info("Migracja %04d: %s", version, name)
+        migrate(conn)
+        conn.execute(schema_version.insert().values(version=version, name=name))
+        done.append(version)
+    return done
+
+
+async def run_migrations(bind=engine) -> list[int]:
+    """Stosuje brakujące migracje w jednej transakcji; zwraca ich numery."""
+    async with bind.begin() as conn:
+        return await conn.run_sync(_upgrade)
+
+
+async def pending_migrations(bind=engine) -> list[tuple[int, str]]:
+    async with bind.begin() as conn:
+        applied = await conn.run_sync(_applied_versions)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+async def main(argv: list[str]):
+    if "--status" in argv:
+        pending = await pending_migrations()
+        for version, name in pending:
+            print(f"pending {version:04d} {name}")
+        print(f"{len(MIGRATIONS) - len(pending)} applied, {len(pending)} pending")
+    else:
+        done = await run_migrations()
+        print(f"Applied {len(done)} migration(s): {done}" if done else "Schema up to date")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    asyncio.run(main(sys.argv[1:]))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -31,9 +31,13 @@ class Match(Base):
     match_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     organizer_wallet = Column(String, ForeignKey("users.wallet_address"), nullable=False)
     venue = Column(String, nullable=False)  # Nazwa miejsca
+    court_id = Column(Integer, ForeignKey("courts.id"), nullable=True)  # Hala z mapy (opcjonalnie)
     crowdfund_amount = Column(Integer, default=0)  # Kwota zrzutki (PLN)
     slots_needed = Column(Integer, nullable=False)  # 8 (4v4) lub 10 (5v5)
     current_players = Column(Integer, default=1)  # Liczba obecnych graczy
+    # Termin meczu (UTC); na hali przedziały [starts_at, ends_at) nie mogą się nakładać
+    starts_at = Column(DateTime, nullable=True)
+    ends_at = Column(DateTime, nullable=True)
 
     # Timestamp'y
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -41,8 +45,52 @@ class Match(Base):
 
     # Relationship
     organizer = relationship("User", back_populates="matches_created")
+    court = relationship("Court", back_populates="matches")
     participants = relationship("MatchParticipant", back_populates="match", cascade="all, delete-orphan")
 
+    # Indeksy pod paginację keyset (created_at, match_id) w /api/matches-list
+    __table_args__ = (
+        Index("ix_matches_created_match", "created_at", "match_id"),
+        Index("ix_matches_slots_created_match", "slots_needed", "created_at", "match_id"),
+        Index("ix_matches_venue_created_match", "venue", "created_at", "match_id"),
+        # Mecze na halach znalezionych przez /api/matches/nearby
+        Index("ix_matches_court_created_match", "court_id", "created_at", "match_id"),
+        # Grafik hali: kolizje i wolne terminy (schedule.py)
+        Index("ix_matches_court_starts", "court_id", "starts_at"),
+        # Częściowy indeks tylko dla otwartych meczów (Postgres i SQLite)
+        Index(
+            "ix_matches_open_created_match",
+            "created_at",
+            "match_id",
+            postgresql_where=current_players < slots_needed,
+            sqlite_where=current_players < slots_needed,
+        ),
+        # Bez AUTOINCREMENT SQLite użyłby ponownie najwyższego id po przeniesieniu meczu do archiwum
+        {"sqlite_autoincrement": True},
+    )
+
+
+class Court(Base):
+    __tablename__ = "courts"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    name = Column(String, nullable=False)
+    location = Column(String, nullable=True)  # Dzielnica / miasto
+    address = Column(String, nullable=True)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    # Geohash (geo.GEOHASH_PRECISION znaków) - zapytania o promień to zakresy prefiksów po tym indeksie
+    geocell = Column(String, nullable=False, index=True)
+    surface_type = Column(String, nullable=True)  # parkiet, tartan, asfalt
+    hoops = Column(Integer, nullable=True)
+    price_per_hour = Column(Integer, nullable=True)  # PLN
+    image = Column(String, nullable=True)
+    schedule_version = Column(Integer, default=0, nullable=False)  # Zmienia się przy każdej rezerwacji
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    matches = relationship("Match", back_populates="court")
+
 
 class MatchParticipant(Base):
     __tablename__ = "match_participants"
@@ -51,6 +99,8 @@ class MatchParticipant(Base):
     match_id = Column(Integer, ForeignKey("matches.match_id"), nullable=False, index=True)
     user_wallet = Column(String, ForeignKey("users.wallet_address"), nullable=False, index=True)
 
+    team = Column(Integer, nullable=True)  # 1 albo 2 - przydzielane, gdy mecz się zapełni
+
     # Timestamp
     joined_at = Column(DateTime, default=datetime.utcnow)
 
@@ -58,6 +108,12 @@ class MatchParticipant(Base):
     match = relationship("Match", back_populates="participants")
     user = relationship("User", back_populates="matches_joined")
 
+    # Jeden gracz może dołączyć do danego meczu tylko raz
+    __table_args__ = (
+        UniqueConstraint("match_id", "user_wallet", name="uq_match_participants_match_user"),
+        {"sqlite_autoincrement": True},  # id trafiają do match_participants_archive
+    )
+
 
 class Profile(Base):
     __tablename__ = "profiles"
@@ -79,3 +135,99 @@ class Profile(Base):
     
     # Relationship
     user = relationship("User", back_populates="profile")
+
+
+class MatchArchive(Base):
+    """Zakończone i porzucone mecze przeniesione z `matches` przez archive.py."""
+    __tablename__ = "matches_archive"
+
+    match_id = Column(Integer, primary_key=True, autoincrement=False)
+    organizer_wallet = Column(String, nullable=False, index=True)
+    venue = Column(String, nullable=False)
+    court_id = Column(Integer, nullable=True)
+    crowdfund_amount = Column(Integer, default=0)
+    slots_needed = Column(Integer, nullable=False)
+    current_players = Column(Integer, default=1)
+    starts_at = Column(DateTime, nullable=True)
+    ends_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    # Historia stronicowana jak /api/matches-list: (created_at, match_id) malejąco
+    __table_args__ = (
+        Index("ix_matches_archive_created_match", "created_at", "match_id"),
+        Index("ix_matches_archive_court_created_match", "court_id", "created_at", "match_id"),
+    )
+
+
+class MatchParticipantArchive(Base):
+    __tablename__ = "match_participants_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    match_id = Column(Integer, nullable=False, index=True)
+    user_wallet = Column(String, nullable=False)
+    team = Column(Integer, nullable=True)
+    joined_at = Column(DateTime)
+
+    # Historia meczów gracza
+    __table_args__ = (
+        Index("ix_match_participants_archive_user_match", "user_wallet", "match_id"),
+    )
+
+
+class PlayerStats(Base):
+    """Liczniki gracza aktualizowane w transakcjach tworzenia meczu i dołączania (stats.py)."""
+    __tablename__ = "player_stats"
+
+    user_wallet = Column(String, ForeignKey("users.wallet_address"), primary_key=True)
+    # Kopia Profile.city - ranking miasta czytany prosto z indeksu, bez złączenia i sortowania
+    city = Column(String, nullable=True)
+    matches_played = Column(Integer, default=0, nullable=False)
+    matches_organized = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_player_stats_city_played", "city", "matches_played", "user_wallet"),
+        Index("ix_player_stats_city_organized", "city", "matches_organized", "user_wallet"),
+    )
+
+
+class MatchmakingQueue(Base):
+    """Gracze czekający, aż matchmaking dopisze ich do otwartego meczu."""
+    __tablename__ = "matchmaking_queue"
+
+    user_wallet = Column(String, ForeignKey("users.wallet_address"), primary_key=True)
+    slots_needed = Column(Integer, nullable=True)  # 8, 10 albo dowolny (NULL)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class NotificationOutbox(Base):
+    """Powiadomienia o meczu czekające na wysyłkę (przeżywają restart)."""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    match_id = Column(Integer, ForeignKey("matches.match_id"), nullable=False, index=True)
+    event = Column(String, nullable=False)  # full, changed, cancelled
+    text = Column(String, nullable=False)  # Treść wiadomości do uczestników
+    attempts = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IdempotencyKey(Base):
+    """Odpowiedzi zapamiętane pod nagłówkiem Idempotency-Key (idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+
+    idempotency_key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # sha256 metody, ścieżki i body
+    response = Column(String, nullable=True)  # JSON odpowiedzi; NULL = żądanie w trakcie
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class UsedRefreshToken(Base):
+    """Wykorzystane refresh tokeny (jti) - każdy da się wymienić tylko raz (auth.py)."""
+    __tablename__ = "used_refresh_tokens"
+
+    jti = Column(String, primary_key=True)
+    wallet_address = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # potem token i tak jest nieważny
@@ -0,0 +1,162 @@
+import os
+import asyncio
+import logging
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal
+from .models import User, MatchParticipant, NotificationOutbox
+from .telegram_client import get_telegram_client, TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "4"))
+# Zdarzenia jednego meczu z tego okna idą jedną wiadomością
+NOTIFY_BATCH_WINDOW = float(os.getenv("NOTIFY_BATCH_WINDOW", "1.0"))
+# Minimalny odstęp między kolejnymi powiadomieniami dla tego samego meczu
+NOTIFY_MATCH_INTERVAL = float(os.getenv("NOTIFY_MATCH_INTERVAL", "5.0"))
+MAX_ATTEMPTS = 5
+# Górny limit odstępu ponowień po nieoczekiwanym błędzie (np. baza niedostępna)
+NOTIFY_MAX_BACKOFF = float(os.getenv("NOTIFY_MAX_BACKOFF", "300"))
+
+EVENT_FULL = "full"
+EVENT_CHANGED = "changed"
+EVENT_CANCELLED = "cancelled"
+
+
+def enqueue_match_event(db: AsyncSession, match_id: int, event: str, text: str):
+    """
+    Dodaje powiadomienie do outboxa w bieżącej transakcji.
+    Po commicie wywołaj notifier.schedule(match_id).
+    """
+    db.add(NotificationOutbox(match_id=match_id, event=event, text=text))
+
+
+class NotificationQueue:
+    """
+    Kolejka powiadomień w procesie: mecze czekające na wysyłkę trafiają do
+    asyncio.Queue, a pula workerów rozsyła zebrane zdarzenia uczestnikom.
+    Źródłem prawdy jest tabela notification_outbox - wpis znika dopiero po wysyłce.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        workers: int = NOTIFY_WORKERS,
+        batch_window: float = NOTIFY_BATCH_WINDOW,
+        match_interval: float = NOTIFY_MATCH_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_window = batch_window
+        self.match_interval = match_interval
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._scheduled: set[int] = set()
+        self._next_allowed: dict[int, float] = {}
+        self._failures: dict[int, int] = {}  # kolejne nieoczekiwane błędy meczu
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+        # Dokończ wysyłki przerwane restartem
+        async with self.session_factory() as db:
+            result = await db.execute(select(NotificationOutbox.match_id).distinct())
+            for match_id in result.scalars():
+                self.schedule(match_id)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def schedule(self, match_id: int):
+        if match_id in self._scheduled:
+            return  # Zdarzenie dołączy do już zaplanowanej paczki
+        self._scheduled.add(match_id)
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        delay = max(self.batch_window, self._next_allowed.get(match_id, 0.0) - now)
+        loop.call_later(delay, self._queue.put_nowait, match_id)
+
+    async def _worker(self):
+        while True:
+            match_id = await self._queue.get()
+            self._scheduled.discard(match_id)
+            retry = False
+            interval = self.match_interval
+            try:
+                retry = await self._flush_match(match_id)
+                self._failures.pop(match_id, None)
+            except Exception:
+                logger.exception("Wysyłka powiadomień dla meczu %s nie powiodła się", match_id)
+                # Wpisy zostają w outboxie - bez ponowienia czekałyby do restartu
+                # (a archive.py nie przeniesie meczu z niewysłanymi powiadomieniami)
+                failures = self._failures[match_id] = self._failures.get(match_id, 0) + 1
+                interval = min(NOTIFY_MAX_BACKOFF, self.match_interval * 2 ** failures)
+                retry = True
+            finally:
+                now = asyncio.get_running_loop().time()
+                self._next_allowed = {m: t for m, t in self._next_allowed.items() if t > now}
+                self._next_allowed[match_id] = now + interval
+                self._queue.task_done()
+            if retry:
+                self.schedule(match_id)
+
+    async def _flush_match(self, match_id: int) -> bool:
+        """Wysyła zebrane zdarzenia meczu; zwraca True, jeśli trzeba ponowić."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(NotificationOutbox)
+                .where(NotificationOutbox.match_id == match_id)
+                .order_by(NotificationOutbox.id)
+            )
+            events = result.scalars().all()
+            if not events:
+                return False
+
+            result = await db.execute(
+                select(User.telegram_id)
+                .join(MatchParticipant, MatchParticipant.user_wallet == User.wallet_address)
+                .where(MatchParticipant.match_id == match_id, User.telegram_id.is_not(None))
+                .distinct()
+            )
+            chat_ids = result.scalars().all()
+
+            text = "\n".join(e.text for e in events)
+            client = get_telegram_client()
+            results = await asyncio.gather(
+                *[client.send_message(chat_id, text) for chat_id in chat_ids],
+                return_exceptions=True,
+            )
+
+            failed = [r for r in results if isinstance(r, Exception)]
+            for error in failed:
+                if not isinstance(error, TelegramAPIError):
+                    raise error
+                logger.warning("Powiadomienie meczu %s: %s", match_id, error)
+
+            ids = [e.id for e in events]
+            if failed and len(failed) == len(results):
+                # Nic nie doszło - spróbuj ponownie później, do MAX_ATTEMPTS razy
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_(ids))
+                    .values(attempts=NotificationOutbox.attempts + 1)
+                )
+                await db.execute(
+                    delete(NotificationOutbox).where(
+                        NotificationOutbox.id.in_(ids), NotificationOutbox.attempts >= MAX_ATTEMPTS
+                    )
+                )
+                await db.commit()
+                return True
+
+            await db.execute(delete(NotificationOutbox).where(NotificationOutbox.id.in_(ids)))
+            await db.commit()
+            return False
+
+
+notifier = NotificationQueue()
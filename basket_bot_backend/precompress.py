@@ -0,0 +1,67 @@
+"""
+Kompresja zbudowanego frontendu przy buildzie (nie przy każdym żądaniu).
+
+    python -m basket_bot_backend.precompress [basket_bot_frontend/dist]
+
+Obok każdego pliku tekstowego zapisuje wariant .br (brotli, jeśli pakiet
+jest zainstalowany) i .gz - frontend.py wybiera je według Accept-Encoding.
+Wariant, który nie zmniejsza pliku przynajmniej o MIN_SAVING, jest pomijany.
+Pliki są aktualizowane tylko, gdy oryginał jest nowszy.
+"""
+import os
+import sys
+import gzip
+from pathlib import Path
+
+COMPRESSIBLE = {".html", ".js", ".mjs", ".css", ".svg", ".json", ".txt", ".xml", ".map", ".wasm", ".ico", ".webmanifest"}
+MIN_SIZE = 512
+MIN_SAVING = 0.1
+
+
+def _compressors():
+    compressors = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        print("brotli not installed - writing only .gz", file=sys.stderr)
+    else:
+        compressors.insert(0, (".br", lambda data: brotli.compress(data, quality=11)))
+    return compressors
+
+
+def precompress(directory: Path) -> tuple[int, int]:
+    """Zwraca (liczba zapisanych wariantów, liczba pominiętych plików)."""
+    compressors = _compressors()
+    written = skipped = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in COMPRESSIBLE:
+            continue
+        stat = path.stat()
+        if stat.st_size < MIN_SIZE:
+            skipped += 1
+            continue
+        data = None
+        for suffix, compress in compressors:
+            target = path.with_name(path.name + suffix)
+            if target.exists() and target.stat().st_mtime >= stat.st_mtime:
+                continue
+            data = data if data is not None else path.read_bytes()
+            compressed = compress(data)
+            if len(compressed) > len(data) * (1 - MIN_SAVING):
+                target.unlink(missing_ok=True)
+                continue
+            target.write_bytes(compressed)
+            # Ten sam mtime co oryginał - ETag wariantu zmienia się razem z plikiem
+            os.utime(target, (stat.st_atime, stat.st_mtime))
+            written += 1
+    return written, skipped
+
+
+if __name__ == "__main__":
+    from .frontend import FRONTEND_DIST
+
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else FRONTEND_DIST
+    if not target.is_dir():
+        sys.exit(f"{target}: no such directory")
+    written, skipped = precompress(target)
+    print(f"{target}: wrote {written} compressed variant(s), {skipped} file(s) too small")
@@ -0,0 +1,94 @@
+"""
+Terminy meczów na halach: kolizje rezerwacji i wolne okna w danym dniu.
+
+Mecz na hali ma przedział [starts_at, ends_at). Długość meczu jest ograniczona
+(MATCH_MAX_DURATION), więc wszystkie mecze nachodzące na [start, end) mają
+starts_at w [start - MATCH_MAX_DURATION, end) - to jeden zakres po indeksie
+(court_id, starts_at), niezależnie od tego, ile miesięcy rezerwacji ma hala.
+
+Sprawdzenie i zapis idą w jednej transakcji po zablokowaniu wiersza hali
+(UPDATE courts SET schedule_version = ...), więc dwie równoległe rezerwacje
+tej samej hali nie przejdą obie. Na Postgresie dodatkowo pilnuje tego
+ograniczenie EXCLUDE (migracja 0006), jeśli jest dostępne btree_gist.
+"""
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Court, Match
+
+MATCH_DEFAULT_DURATION = timedelta(minutes=int(os.getenv("MATCH_DEFAULT_DURATION_MINUTES", "90")))
+MATCH_MAX_DURATION = timedelta(minutes=int(os.getenv("MATCH_MAX_DURATION_MINUTES", "240")))
+COURT_OPEN_HOUR = int(os.getenv("COURT_OPEN_HOUR", "6"))
+COURT_CLOSE_HOUR = int(os.getenv("COURT_CLOSE_HOUR", "23"))
+
+
+def parse_datetime(value) -> datetime:
+    """ISO 8601 -> naiwny UTC (tak jak created_at w bazie)."""
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def overlapping(court_id: int, starts_at: datetime, ends_at: datetime):
+    """Warunek: mecze na hali nachodzące na [starts_at, ends_at)."""
+    return (
+        Match.court_id == court_id,
+        # Dolna granica z MATCH_MAX_DURATION zamienia "starts_at < end" w ograniczony zakres indeksu
+        Match.starts_at >= starts_at - MATCH_MAX_DURATION,
+        Match.starts_at < ends_at,
+        Match.ends_at > starts_at,
+    )
+
+
+async def lock_court_schedule(db: AsyncSession, court_id: int) -> bool:
+    """
+    Blokuje grafik hali do końca transakcji (Postgres: blokada wiersza,
+    SQLite: blokada zapisu). Zwraca False, jeśli hala nie istnieje.
+    """
+    result = await db.execute(
+        update(Court)
+        .where(Court.id == court_id)
+        .values(schedule_version=Court.schedule_version + 1)
+        .returning(Court.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first() is not None
+
+
+async def find_conflict(db: AsyncSession, court_id: int, starts_at: datetime, ends_at: datetime) -> int | None:
+    """match_id pierwszego meczu kolidującego z [starts_at, ends_at) albo None."""
+    return await db.scalar(
+        select(Match.match_id).where(*overlapping(court_id, starts_at, ends_at)).limit(1)
+    )
+
+
+async def bookings_between(db: AsyncSession, court_id: int, starts_at: datetime, ends_at: datetime) -> list[Match]:
+    result = await db.execute(
+        select(Match)
+        .where(*overlapping(court_id, starts_at, ends_at))
+        .order_by(Match.starts_at, Match.match_id)
+    )
+    return list(result.scalars())
+
+
+def free_windows(
+    booked: list[tuple[datetime, datetime]], window_start: datetime, window_end: datetime, min_length: timedelta
+) -> list[tuple[datetime, datetime]]:
+    """Luki między posortowanymi rezerwacjami w [window_start, window_end), nie krótsze niż min_length."""
+    free = []
+    cursor = window_start
+    for starts_at, ends_at in booked:
+        if starts_at - cursor >= min_length:
+            free.append((cursor, min(starts_at, window_end)))
+        cursor = max(cursor, ends_at)
+        if cursor >= window_end:
+            break
+    if window_end - cursor >= min_length:
+        free.append((cursor, window_end))
+    return free
+
+
+def opening_hours(day: date) -> tuple[datetime, datetime]:
+    return datetime.combine(day, time(COURT_OPEN_HOUR)), datetime.combine(day, time(0)) + timedelta(hours=COURT_CLOSE_HOUR)
@@ -0,0 +1,307 @@
+from datetime import date, datetime
+from typing import Annotated, Literal, Union
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+
+
+class ProfileUpdate(BaseModel):
+    nickname: str | None = None
+    age: int | None = None
+    city: str | None = None
+    skill_level: str | None = None  # beginner, intermediate, advanced
+    preferred_position: str | None = None  # G, F, C
+    bio: str | None = None
+    phone: str | None = None
+
+
+PROFILE_FIELDS = ("nickname", "age", "city", "skill_level", "preferred_position", "bio", "phone")
+
+
+class PlayerImport(BaseModel):
+    """Jeden wiersz importu zbiorczego: konto gracza + opcjonalny profil."""
+    telegram_id: int
+    wallet_address: str | None = None  # Domyślnie istniejące konto gracza albo tg_<id>
+    name: str | None = None
+    age: str | None = None
+    height: str | None = None
+    number: str | None = None
+    profile: ProfileUpdate | None = None
+
+
+class TonProofDomain(BaseModel):
+    length_bytes: int = Field(alias="lengthBytes")
+    value: str
+
+
+class TonProof(BaseModel):
+    """Pole `proof` z TON Connect (connectItems.tonProof) + walletStateInit konta."""
+    timestamp: int
+    domain: TonProofDomain
+    payload: str
+    signature: str  # base64
+    state_init: str  # base64 BOC
+
+
+class LoginRequest(BaseModel):
+    wallet_address: str
+    proof: TonProof
+
+
+# --- MODELE ODPOWIEDZI ---
+# Endpointy zwracają obiekty ORM, a te modele je walidują (from_attributes)
+# i serializują w Rust (pydantic-core), bez jsonable_encoder.
+
+class ORMModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+def responses(*models) -> type:
+    """Unia modeli odpowiedzi rozróżniana polem `status`."""
+    return Annotated[Union[models], Field(discriminator="status")]
+
+
+class ErrorResponse(BaseModel):
+    status: Literal["error", "not_found"] = "error"
+    message: str
+
+
+class UserOut(ORMModel):
+    wallet_address: str
+    username: str | None = None
+    telegram_id: int | None = None
+    name: str | None = None
+    age: str | None = None
+    height: str | None = None
+    number: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
+class UserUpdateResponse(BaseModel):
+    status: Literal["success"] = "success"
+    user: UserOut
+
+
+class TelegramUserOut(BaseModel):
+    """Publiczny profil z /api/profile/{telegram_id} (puste pola jako "")."""
+    status: Literal["success"] = "success"
+    telegram_id: int
+    name: str = ""
+    age: str = ""
+    height: str = ""
+    number: str = ""
+    wallet_address: str = ""
+
+
+class AuthUser(BaseModel):
+    wallet_address: str
+    username: str = ""
+    telegram_id: int | str = ""
+
+
+class AuthMeResponse(BaseModel):
+    status: Literal["success"] = "success"
+    user: AuthUser
+
+
+class ChallengeResponse(BaseModel):
+    status: Literal["success"] = "success"
+    payload: str
+    expires_at: int  # unix time
+
+
+class LoginResponse(BaseModel):
+    status: Literal["success"] = "success"
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int  # sekundy ważności access_token
+    wallet_address: str
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class ProfileOut(ORMModel):
+    id: int
+    nickname: str | None = None
+    age: int | None = None
+    city: str | None = None
+    skill_level: str | None = None
+    preferred_position: str | None = None
+    bio: str | None = None
+    phone: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
+class AccountOut(UserOut):
+    """Konto z profilem - wynik zależności get_current_account (auth.py)."""
+    profile: ProfileOut | None = None
+
+
+class ProfileResponse(BaseModel):
+    status: Literal["success"] = "success"
+    profile: ProfileOut | None
+
+
+class ProfileSavedResponse(BaseModel):
+    status: Literal["success"] = "success"
+    message: str
+    profile: ProfileOut
+
+
+class MatchOut(ORMModel):
+    match_id: int
+    venue: str
+    court_id: int | None = None
+    starts_at: datetime | None = None
+    ends_at: datetime | None = None
+    crowdfund_amount: int
+    slots_needed: int
+    current_players: int
+    organizer_wallet: str
+
+    @computed_field
+    @property
+    def slots_available(self) -> int:
+        return self.slots_needed - self.current_players
+
+
+class MatchListResponse(BaseModel):
+    status: Literal["success"] = "success"
+    matches: list[MatchOut]
+    next_cursor: str | None = None
+
+
+class ArchivedMatchOut(MatchOut):
+    archived_at: datetime
+
+
+class MatchHistoryResponse(BaseModel):
+    status: Literal["success"] = "success"
+    matches: list[ArchivedMatchOut]
+    next_cursor: str | None = None
+
+
+class CourtCreate(BaseModel):
+    name: str = Field(min_length=1)
+    location: str | None = None
+    address: str | None = None
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+    surface_type: str | None = None
+    hoops: int | None = None
+    price_per_hour: int | None = None
+    image: str | None = None
+
+
+class CourtOut(ORMModel):
+    id: int
+    name: str
+    location: str | None = None
+    address: str | None = None
+    lat: float
+    lng: float
+    surface_type: str | None = None
+    hoops: int | None = None
+    price_per_hour: int | None = None
+    image: str | None = None
+
+
+class CourtResponse(BaseModel):
+    status: Literal["success"] = "success"
+    court: CourtOut
+
+
+class CourtListResponse(BaseModel):
+    status: Literal["success"] = "success"
+    courts: list[CourtOut]
+
+
+class TimeSlot(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+    match_id: int | None = None
+
+
+class AvailabilityResponse(BaseModel):
+    status: Literal["success"] = "success"
+    court_id: int
+    date: date
+    booked: list[TimeSlot]
+    free: list[TimeSlot]
+
+
+class NearbyMatchOut(MatchOut):
+    distance_km: float
+    court: CourtOut
+
+
+class NearbyMatchesResponse(BaseModel):
+    status: Literal["success"] = "success"
+    matches: list[NearbyMatchOut]
+
+
+class TeamPlayer(BaseModel):
+    user_wallet: str
+    team: int | None = None
+    nickname: str | None = None
+    skill_level: str | None = None
+    preferred_position: str | None = None
+
+
+class TeamsResponse(BaseModel):
+    status: Literal["success"] = "success"
+    match_id: int
+    players: list[TeamPlayer]
+
+
+class PlayerStatsResponse(BaseModel):
+    status: Literal["success"] = "success"
+    telegram_id: int
+    matches_played: int = 0
+    matches_organized: int = 0
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_wallet: str
+    nickname: str | None = None
+    matches_played: int
+    matches_organized: int
+
+
+class LeaderboardResponse(BaseModel):
+    status: Literal["success"] = "success"
+    city: str
+    by: Literal["played", "organized"]
+    players: list[LeaderboardEntry]
+
+
+class QueueResponse(BaseModel):
+    status: Literal["success"] = "success"
+    message: str
+
+
+class MatchCreatedResponse(MatchOut):
+    status: Literal["success"] = "success"
+
+
+class JoinResponse(BaseModel):
+    status: Literal["success"] = "success"
+    message: str
+    current_players: int
+    slots_available: int
+
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: list[dict]
+
+
+class ImportResponse(BaseModel):
+    status: Literal["success"] = "success"
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
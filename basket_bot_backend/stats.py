@@ -0,0 +1,121 @@
+"""
+Statystyki graczy (player_stats): rozegrane i zorganizowane mecze.
+
+Liczniki rosną w tej samej transakcji co zapis meczu - create_match, join_match
+i matchmaking wołają record_*(). Ranking miasta czyta gotowe wiersze z indeksu
+(city, matches_played), bez COUNT(*) po match_participants przy każdym żądaniu.
+Miasto jest kopią Profile.city, odświeżaną przy zapisie profilu (sync_city).
+
+Gdy liczniki się rozjadą (ręczne poprawki w bazie, błąd), przebuduj je
+jednym strumieniowym przebiegiem po meczach - gorących i zarchiwizowanych:
+
+    python -m basket_bot_backend.stats
+"""
+import os
+import asyncio
+import logging
+from sqlalchemy import select, update, delete, union_all, func, literal_column, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal, read_engine, dialect_insert
+from .models import Match, MatchParticipant, MatchArchive, MatchParticipantArchive, PlayerStats, Profile
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH = int(os.getenv("STATS_REBUILD_BATCH", "1000"))
+STATS_COLUMNS = ["user_wallet", "city", "matches_played", "matches_organized"]
+
+
+async def _bump(db: AsyncSession, wallets: list[str], played: int, organized: int):
+    if not wallets:
+        return
+    table = PlayerStats.__table__
+    stmt = dialect_insert(db, table).values(
+        user_wallet=bindparam("b_wallet"),
+        city=select(Profile.city).where(Profile.user_id == bindparam("b_wallet")).scalar_subquery(),
+        matches_played=played,
+        matches_organized=organized,
+    )
+    counters = {"matches_played": played, "matches_organized": organized}
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_wallet"],
+        set_={name: table.c[name] + amount for name, amount in counters.items() if amount},
+    )
+    await db.execute(stmt, [{"b_wallet": wallet} for wallet in wallets])
+
+
+async def record_match_created(db: AsyncSession, organizer_wallet: str):
+    """Organizator od razu gra w swoim meczu."""
+    await _bump(db, [organizer_wallet], played=1, organized=1)
+
+
+async def record_joins(db: AsyncSession, wallets: list[str]):
+    await _bump(db, wallets, played=1, organized=0)
+
+
+async def sync_city(db: AsyncSession, wallets: list[str]):
+    """Przepisuje Profile.city do player_stats po zmianie profilu."""
+    if not wallets:
+        return
+    await db.execute(
+        update(PlayerStats)
+        .where(PlayerStats.user_wallet.in_(wallets))
+        .values(city=select(Profile.city).where(Profile.user_id == PlayerStats.user_wallet).scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def counts_query():
+    """(user_wallet, city, rozegrane, zorganizowane) policzone od zera, posortowane po portfelu."""
+    one, zero = literal_column("1"), literal_column("0")
+    rows = union_all(
+        select(MatchParticipant.user_wallet.label("wallet"), one.label("played"), zero.label("organized")),
+        select(MatchParticipantArchive.user_wallet, one, zero),
+        select(Match.organizer_wallet, zero, one),
+        select(MatchArchive.organizer_wallet, zero, one),
+    ).subquery()
+    totals = (
+        select(rows.c.wallet, func.sum(rows.c.played).label("played"), func.sum(rows.c.organized).label("organized"))
+        .group_by(rows.c.wallet)
+        .subquery()
+    )
+    return (
+        select(totals.c.wallet, Profile.city, totals.c.played, totals.c.organized)
+        .outerjoin(Profile, Profile.user_id == totals.c.wallet)
+        .order_by(totals.c.wallet)
+    )
+
+
+async def rebuild_stats(session_factory=AsyncSessionLocal, batch_size: int = REBUILD_BATCH) -> int:
+    """
+    Przelicza player_stats w jednej transakcji; zwraca liczbę graczy.
+    Wynik czytamy strumieniowo osobnym połączeniem i zapisujemy paczkami.
+    """
+    table = PlayerStats.__table__
+    written = 0
+    async with session_factory() as db:
+        if db.bind.dialect.name == "postgresql":
+            # Równoległy join czeka na koniec przebudowy i dolicza się do świeżych liczników;
+            # na SQLite tę samą rolę pełni blokada zapisu wzięta przez DELETE
+            await db.execute(text("LOCK TABLE player_stats IN EXCLUSIVE MODE"))
+        await db.execute(delete(PlayerStats).execution_options(synchronize_session=False))
+
+        async with read_engine.connect() as conn:
+            result = await conn.stream(counts_query())
+            async for partition in result.partitions(batch_size):
+                await db.execute(table.insert(), [dict(zip(STATS_COLUMNS, row)) for row in partition])
+                written += len(partition)
+        await db.commit()
+    return written
+
+
+async def main():
+    from .database import dispose_engines
+
+    players = await rebuild_stats()
+    print(f"rebuilt stats for {players} player(s)")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    asyncio.run(main())
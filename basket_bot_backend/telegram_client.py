@@ -0,0 +1,164 @@
+import os
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# Limity Telegrama: ~30 wiadomości/s globalnie, ~1 wiadomość/s do jednego czatu
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+PER_CHAT_INTERVAL = float(os.getenv("TELEGRAM_PER_CHAT_INTERVAL", "1.0"))
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+MAX_TRACKED_CHATS = 10_000
+
+
+class TelegramAPIError(Exception):
+    def __init__(self, method: str, error_code: int | None, description: str):
+        super().__init__(f"{method}: {error_code} {description}")
+        self.method = method
+        self.error_code = error_code
+        self.description = description
+
+
+class TokenBucket:
+    """
+    Token bucket z rezerwacją: każde acquire() bierze token od razu
+    (saldo może zejść poniżej zera) i śpi tyle, ile trzeba na jego odnowienie.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._updated = None
+
+    async def acquire(self):
+        now = asyncio.get_running_loop().time()
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class TelegramClient:
+    """
+    Asynchroniczny klient Bot API na jednej puli połączeń keep-alive.
+    Pilnuje limitów globalnych i per czat, ponawia 429 (retry_after), błędy 5xx
+    i nieudane połączenia - nigdy żądania, które mogło już dotrzeć do Telegrama.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = TELEGRAM_API_URL,
+        transport: "httpx.AsyncBaseTransport | None" = None,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+        timeout: float = 10.0,
+    ):
+        import httpx  # Leniwie - nie spowalnia startu aplikacji
+
+        self.token = token
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate)
+        self._chat_next_slot: dict[int, float] = {}
+        self._http = httpx.AsyncClient(
+            base_url=f"{base_url.rstrip('/')}/bot{token}/",
+            transport=transport,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        )
+
+    async def close(self):
+        await self._http.aclose()
+
+    async def _wait_for_chat(self, chat_id: int):
+        loop_time = asyncio.get_running_loop().time()
+        slot = max(loop_time, self._chat_next_slot.get(chat_id, 0.0))
+        self._chat_next_slot[chat_id] = slot + self.per_chat_interval
+
+        if len(self._chat_next_slot) > MAX_TRACKED_CHATS:
+            # Czaty bez zaplanowanych wiadomości nie potrzebują już wpisu
+            self._chat_next_slot = {
+                cid: t for cid, t in self._chat_next_slot.items() if t > loop_time
+            }
+
+        if slot > loop_time:
+            await asyncio.sleep(slot - loop_time)
+
+    async def call(self, method: str, payload: dict, chat_id: int | None = None, timeout: float | None = None) -> dict:
+        """Wywołuje metodę Bot API i zwraca pole `result` odpowiedzi."""
+        if chat_id is not None:
+            await self._wait_for_chat(chat_id)
+
+        import httpx
+
+        attempt = 0
+        while True:
+            await self._global.acquire()
+            try:
+                # Long polling (getUpdates) potrzebuje dłuższego limitu niż domyślny
+                options = {"timeout": timeout} if timeout is not None else {}
+                response = await self._http.post(method, json=payload, **options)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # Żądanie nie wyszło - ponowienie nie zdubluje wiadomości
+                if attempt >= self.max_retries:
+                    raise TelegramAPIError(method, None, str(e)) from e
+                await asyncio.sleep(BACKOFF_BASE * 2 ** attempt)
+                attempt += 1
+                continue
+            except httpx.TransportError as e:
+                # Timeout odczytu / zerwane połączenie: Telegram mógł już wysłać wiadomość
+                raise TelegramAPIError(method, None, str(e)) from e
+
+            try:
+                data = response.json()
+            except ValueError:
+                # Np. strona błędu z proxy - o ponowieniu decyduje sam status HTTP
+                data = {"ok": False, "error_code": response.status_code, "description": response.text[:200]}
+
+            if data.get("ok"):
+                return data.get("result")
+
+            error_code = data.get("error_code", response.status_code)
+            retryable = error_code == 429 or error_code >= 500
+            if not retryable or attempt >= self.max_retries:
+                raise TelegramAPIError(method, error_code, data.get("description", ""))
+
+            retry_after = (data.get("parameters") or {}).get("retry_after")
+            delay = retry_after if retry_after is not None else BACKOFF_BASE * 2 ** attempt
+            logger.warning("Telegram %s: %s, ponawiam za %ss", method, error_code, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> dict:
+        return await self.call("sendMessage", {"chat_id": chat_id, "text": text, **kwargs}, chat_id=chat_id)
+
+
+_client: TelegramClient | None = None
+
+
+def get_telegram_client() -> TelegramClient:
+    """Współdzielony klient (jedna pula połączeń na proces)."""
+    global _client
+    if _client is None:
+        token = os.getenv("BOT_TOKEN") or os.getenv("TELEGRAM_BOT_TOKEN") or ""
+        _client = TelegramClient(token)
+    return _client
+
+
+async def close_telegram_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
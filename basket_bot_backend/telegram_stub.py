@@ -0,0 +1,62 @@
+"""
+Lokalny stub Telegram Bot API do testów offline.
+
+    python -m basket_bot_backend.telegram_stub   # nasłuchuje na :8081
+    TELEGRAM_API_URL=http://127.0.0.1:8081 uvicorn basket_bot_backend.main:app
+
+W testach można go podpiąć bez sieci:
+    TelegramClient(token, base_url="http://stub", transport=httpx.ASGITransport(app=stub.app))
+"""
+import os
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class TelegramStub:
+    def __init__(self, fail_with_429: int = 0, retry_after: int = 0):
+        # Pierwsze `fail_with_429` wywołań zwraca 429 - do testów ponawiania
+        self.fail_with_429 = fail_with_429
+        self.retry_after = retry_after
+        self.calls: list[tuple[str, dict]] = []
+        self.errors: list[tuple[int, str, int | None]] = []
+        self.app = FastAPI()
+        self.app.post("/bot{token}/{method}")(self.handle)
+
+    def fail(self, error_code: int, description: str = "", retry_after: int | None = None):
+        """Kolejne wywołanie (dowolnej metody) dostanie ten błąd zamiast wyniku."""
+        self.errors.append((error_code, description, retry_after))
+
+    async def handle(self, token: str, method: str, request: Request):
+        payload = await request.json()
+        if self.fail_with_429 > 0:
+            self.fail_with_429 -= 1
+            self.errors.insert(0, (429, "Too Many Requests: retry later", self.retry_after))
+        if self.errors:
+            error_code, description, retry_after = self.errors.pop(0)
+            body = {"ok": False, "error_code": error_code, "description": description}
+            if retry_after is not None:
+                body["parameters"] = {"retry_after": retry_after}
+            # Jak prawdziwe Bot API: status HTTP równy error_code
+            return JSONResponse(body, status_code=error_code)
+
+        self.calls.append((method, payload))
+        if method == "sendMessage":
+            return {
+                "ok": True,
+                "result": {
+                    "message_id": len(self.calls),
+                    "chat": {"id": payload.get("chat_id")},
+                    "text": payload.get("text"),
+                },
+            }
+        return {"ok": True, "result": True}
+
+
+stub = TelegramStub()
+app = stub.app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("TELEGRAM_STUB_PORT", "8081")))
@@ -0,0 +1,182 @@
+"""
+Przyjmowanie update'ów od Telegrama: webhook tylko wrzuca update do kolejki
+i od razu odpowiada 200, a obsługą zajmuje się pula workerów.
+
+Telegram ponawia webhook, który odpowiada zbyt wolno lub błędem - ten sam
+update_id może więc przyjść kilka razy. Okno ostatnich update_id odsiewa
+powtórki (per proces; przy kilku workerach uvicorna ponowienie może trafić
+do innego procesu, ale Telegram ponawia dopiero po nieudanej odpowiedzi,
+a ta wychodzi teraz natychmiast).
+
+Lokalnie, bez publicznego adresu, update'y można pobierać long pollingiem
+(TELEGRAM_POLLING=true) - trafiają do tej samej kolejki i tych samych handlerów.
+"""
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable
+from .database import env_bool
+from .telegram_client import get_telegram_client, TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "4"))
+UPDATE_QUEUE_SIZE = int(os.getenv("TELEGRAM_UPDATE_QUEUE_SIZE", "1000"))
+DEDUPE_WINDOW = int(os.getenv("TELEGRAM_DEDUPE_WINDOW", "10000"))
+TELEGRAM_POLLING = env_bool("TELEGRAM_POLLING", False)
+POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "30"))
+POLL_RETRY_DELAY = 5.0
+DRAIN_TIMEOUT = 5.0
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class RecentIds:
+    """Ostatnie `size` identyfikatorów - najstarszy wypada, gdy przychodzi nowy."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._order: deque[int] = deque()
+        self._seen: set[int] = set()
+
+    def add(self, item: int) -> bool:
+        """Zwraca False, jeśli identyfikator już był w oknie."""
+        if item in self._seen:
+            return False
+        self._seen.add(item)
+        self._order.append(item)
+        if len(self._order) > self.size:
+            self._seen.discard(self._order.popleft())
+        return True
+
+
+def command_name(update: dict) -> str | None:
+    """'/start@HoopBot abc' -> 'start'; None, jeśli wiadomość nie jest komendą."""
+    text = (update.get("message") or {}).get("text") or ""
+    if not text.startswith("/"):
+        return None
+    return text[1:].split(maxsplit=1)[0].split("@", 1)[0].lower() or None
+
+
+class UpdateQueue:
+    """
+    Ograniczona asyncio.Queue update'ów + pula workerów wołających handlery komend.
+    Pełna kolejka odrzuca webhook (503) - Telegram ponowi go później, więc
+    update nie ginie, a proces nie rośnie w pamięci bez końca.
+    """
+
+    def __init__(
+        self,
+        workers: int = UPDATE_WORKERS,
+        max_size: int = UPDATE_QUEUE_SIZE,
+        dedupe_window: int = DEDUPE_WINDOW,
+    ):
+        self.workers = workers
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_size)
+        self._recent = RecentIds(dedupe_window)
+        self._commands: dict[str, Handler] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.received = self.duplicates = self.rejected = self.handled = self.failed = 0
+
+    def add_command(self, name: str, handler: Handler):
+        self._commands[name.lower()] = handler
+
+    async def start(self):
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self, drain_timeout: float = DRAIN_TIMEOUT):
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Porzucam %d nieobsłużonych update'ów", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(self, update: dict) -> bool:
+        """Webhook: wrzuca update bez czekania; False = brak miejsca w kolejce."""
+        if self._queue.full():
+            self.rejected += 1
+            return False
+        if self._is_duplicate(update):
+            return True  # Już przyjęty - potwierdzamy, żeby Telegram przestał ponawiać
+        self._queue.put_nowait(update)
+        return True
+
+    async def put(self, update: dict):
+        """Polling: czeka na miejsce w kolejce - kolejne getUpdates dopiero po zwolnieniu."""
+        if not self._is_duplicate(update):
+            await self._queue.put(update)
+
+    def _is_duplicate(self, update: dict) -> bool:
+        self.received += 1
+        update_id = update.get("update_id")
+        if isinstance(update_id, int) and not self._recent.add(update_id):
+            self.duplicates += 1
+            return True
+        return False
+
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dispatch(update)
+                self.handled += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Obsługa update'u %s nie powiodła się", update.get("update_id"))
+            finally:
+                self._queue.task_done()
+
+    async def dispatch(self, update: dict):
+        name = command_name(update)
+        handler = self._commands.get(name) if name else None
+        if handler is None:
+            logger.debug("Pomijam update %s (brak handlera)", update.get("update_id"))
+            return
+        await handler(update)
+
+    async def poll(self, client=None, timeout: int = POLL_TIMEOUT):
+        """Long polling getUpdates do czasu anulowania zadania."""
+        client = client or get_telegram_client()
+        webhook_deleted = False
+        offset = None
+        while True:
+            payload = {"timeout": timeout, "allowed_updates": ["message"]}
+            if offset is not None:
+                payload["offset"] = offset
+            method = "getUpdates"
+            try:
+                if not webhook_deleted:
+                    # getUpdates nie działa przy ustawionym webhooku; błąd przy starcie
+                    # ponawiamy jak getUpdates, zamiast po cichu kończyć polling
+                    method = "deleteWebhook"
+                    await client.call(method, {"drop_pending_updates": False})
+                    webhook_deleted = True
+                    method = "getUpdates"
+                updates = await client.call(method, payload, timeout=timeout + 10)
+            except TelegramAPIError as e:
+                logger.warning("%s: %s, ponawiam za %ss", method, e, POLL_RETRY_DELAY)
+                await asyncio.sleep(POLL_RETRY_DELAY)
+                continue
+            for update in updates or []:
+                # offset potwierdza wszystko poniżej - Telegram nie wyśle tych update'ów ponownie
+                offset = update["update_id"] + 1
+                await self.put(update)
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "handled": self.handled,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+        }
+
+
+bot_updates = UpdateQueue()
@@ -0,0 +1,50 @@
+"""
+Wspólne fixtury: aplikacja na pliku SQLite w katalogu tymczasowym, sterowana
+w procesie przez httpx.ASGITransport (jak benchmarks/load.py).
+TEST_DATABASE_URL (np. postgresql+asyncpg://...) uruchamia testy na innej bazie -
+tabele są czyszczone przed każdym testem.
+
+CI uruchamia `pytest tests/` z katalogu basket_bot_backend - katalog nadrzędny
+trafia na sys.path, żeby działały importy pakietu.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+_tmp = tempfile.mkdtemp(prefix="hoop-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite+aiosqlite:///{Path(_tmp) / 'test.db'}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+import pytest_asyncio
+
+from basket_bot_backend.main import app
+from basket_bot_backend.database import Base, engine, dispose_engines
+from basket_bot_backend.migrations import run_migrations
+from basket_bot_backend.cache import profile_cache
+from basket_bot_backend.auth import token_cache
+from basket_bot_backend import idempotency
+
+
+@pytest_asyncio.fixture
+async def clean_db():
+    """Schemat po migracjach i puste tabele; połączenia zamykane po teście (każdy test ma własną pętlę)."""
+    await run_migrations()
+    async with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
+    profile_cache.clear()
+    token_cache.clear()
+    idempotency.completed.clear()
+    yield
+    await dispose_engines()
+
+
+@pytest_asyncio.fixture
+async def client(clean_db):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
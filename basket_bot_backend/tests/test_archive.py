@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from basket_bot_backend.archive import run_archive
+from basket_bot_backend.database import AsyncSessionLocal
+from basket_bot_backend.migrations import run_migrations
+from basket_bot_backend.models import Match, MatchArchive, MatchParticipantArchive
+
+
+async def create_match(client, telegram_id=1):
+    response = await client.post("/api/matches", json={"telegram_id": telegram_id, "venue": "Hala", "slots_needed": 10})
+    assert response.json()["status"] == "success"
+    return response.json()["match_id"]
+
+
+async def finish_all_matches():
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Match).values(ends_at=datetime.utcnow() - timedelta(days=2)))
+        await db.commit()
+
+
+async def archived_ids():
+    async with AsyncSessionLocal() as db:
+        return sorted(await db.scalars(select(MatchArchive.match_id)))
+
+
+@pytest.mark.asyncio
+async def test_match_ids_are_not_reused_after_archiving(client):
+    first = await create_match(client)
+    await finish_all_matches()
+    assert (await run_archive()).matches == 1
+
+    second = await create_match(client)
+    assert second > first
+    await finish_all_matches()
+    assert (await run_archive()).matches == 1
+
+    assert await archived_ids() == [first, second]
+
+
+@pytest.mark.asyncio
+async def test_archive_skips_ids_already_in_archive(client):
+    match_id = await create_match(client)
+    await finish_all_matches()
+    async with AsyncSessionLocal() as db:
+        # Stan po ponownym użyciu id na starej bazie SQLite
+        db.add(MatchArchive(match_id=match_id, organizer_wallet="tg_9", venue="Stara hala", slots_needed=8))
+        await db.commit()
+
+    report = await run_archive()
+
+    assert report.matches == 1
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(MatchArchive.venue)) == "Stara hala"
+        assert await db.scalar(select(Match.match_id)) is None
+
+
+@pytest.mark.asyncio
+async def test_migration_adds_autoincrement_to_legacy_sqlite_tables(tmp_path):
+    legacy = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    try:
+        await run_migrations(legacy)
+        async with legacy.begin() as conn:
+            # Schemat sprzed 0011: tabele bez AUTOINCREMENT i archiwum z wyższym id
+            await conn.execute(text("DELETE FROM schema_version WHERE version = 11"))
+            await conn.execute(text("DROP TABLE matches"))
+            await conn.execute(text(
+                "CREATE TABLE matches (match_id INTEGER PRIMARY KEY, organizer_wallet VARCHAR NOT NULL, "
+                "venue VARCHAR NOT NULL, court_id INTEGER, crowdfund_amount INTEGER, slots_needed INTEGER NOT NULL, "
+                "current_players INTEGER, starts_at DATETIME, ends_at DATETIME, created_at DATETIME, updated_at DATETIME)"
+            ))
+            await conn.execute(text("INSERT INTO matches (match_id, organizer_wallet, venue, slots_needed) VALUES (3, 'a', 'Hala', 8)"))
+            await conn.execute(MatchArchive.__table__.insert().values(match_id=7, organizer_wallet="a", venue="Hala", slots_needed=8))
+            await conn.execute(MatchParticipantArchive.__table__.insert().values(id=5, match_id=7, user_wallet="a"))
+
+        assert await run_migrations(legacy) == [11]
+
+        async with legacy.begin() as conn:
+            schema = await conn.scalar(text("SELECT sql FROM sqlite_master WHERE name = 'matches'"))
+            assert "AUTOINCREMENT" in schema
+            assert await conn.scalar(text("SELECT venue FROM matches WHERE match_id = 3")) == "Hala"
+            await conn.execute(text("INSERT INTO matches (organizer_wallet, venue, slots_needed) VALUES ('b', 'Hala', 8)"))
+            assert await conn.scalar(text("SELECT max(match_id) FROM matches")) == 8
+            await conn.execute(text("INSERT INTO match_participants (match_id, user_wallet) VALUES (8, 'b')"))
+            assert await conn.scalar(text("SELECT max(id) FROM match_participants")) == 6
+            indexes = await conn.scalars(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'matches'"))
+            assert "ix_matches_open_created_match" in set(indexes)
+    finally:
+        await legacy.dispose()
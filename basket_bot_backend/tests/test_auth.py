@@ -0,0 +1,65 @@
+import time
+import base64
+
+import pytest
+from sqlalchemy import select
+
+from basket_bot_backend import ton_proof
+from basket_bot_backend.auth import create_refresh_token
+from basket_bot_backend.benchmarks.ton_verify import register_fixture_code, make_wallet
+from basket_bot_backend.database import AsyncSessionLocal
+from basket_bot_backend.models import User
+
+DOMAIN = next(iter(ton_proof.TON_PROOF_DOMAINS))
+
+
+def friendly(raw: str, bounceable: bool) -> str:
+    workchain, account_hash = ton_proof.parse_address(raw)
+    body = bytes([0x11 if bounceable else 0x51, workchain & 0xFF]) + account_hash
+    return base64.urlsafe_b64encode(body + ton_proof.crc16(body).to_bytes(2, "big")).decode()
+
+
+async def login(client, private_key, state_init: bytes, address: str) -> dict:
+    payload = (await client.post("/api/auth/challenge")).json()["payload"]
+    workchain, account_hash = ton_proof.parse_address(address)
+    job = ton_proof.ProofJob(workchain, account_hash, DOMAIN.encode(), int(time.time()), payload.encode(), b"", state_init)
+    response = await client.post("/api/auth/login", json={
+        "wallet_address": address,
+        "proof": {
+            "timestamp": job.timestamp,
+            "domain": {"lengthBytes": len(DOMAIN.encode()), "value": DOMAIN},
+            "payload": payload,
+            "signature": base64.b64encode(private_key.sign(ton_proof.proof_digest(job))).decode(),
+            "state_init": base64.b64encode(state_init).decode(),
+        },
+    })
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_login_normalizes_wallet_address(client, monkeypatch):
+    monkeypatch.setattr(ton_proof, "WALLET_PUBKEY_OFFSETS", dict(ton_proof.WALLET_PUBKEY_OFFSETS))
+    register_fixture_code()
+    private_key, state_init, raw = make_wallet()
+
+    for address in (raw, friendly(raw, bounceable=True), friendly(raw, bounceable=False)):
+        body = await login(client, private_key, state_init, address)
+        assert body.get("wallet_address") == raw, body
+
+    async with AsyncSessionLocal() as db:
+        assert list(await db.scalars(select(User.wallet_address))) == [raw]
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_single_use(client):
+    await client.post("/api/profile", json={"telegram_id": 7, "wallet_address": "0:" + "ab" * 32})
+    first = create_refresh_token("0:" + "ab" * 32)
+
+    response = await client.post("/api/auth/refresh", json={"refresh_token": first})
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    assert second != first
+
+    # Powtórka zużytego tokenu (np. wyciekł) - odrzucona, nowy token działa
+    assert (await client.post("/api/auth/refresh", json={"refresh_token": first})).status_code == 401
+    assert (await client.post("/api/auth/refresh", json={"refresh_token": second})).status_code == 200
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import select
+
+from basket_bot_backend.auth import create_access_token
+from basket_bot_backend.database import AsyncSessionLocal
+from basket_bot_backend.models import User
+
+
+async def import_rows(client, rows):
+    headers = {"Authorization": f"Bearer {create_access_token('admin')}"}
+    response = await client.post("/api/players/import", json=rows, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+async def accounts():
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User.wallet_address, User.telegram_id, User.name))
+        return {wallet: (tg_id, name) for wallet, tg_id, name in result}
+
+
+@pytest.mark.asyncio
+async def test_import_reuses_account_without_wallet(client):
+    await client.post("/api/profile", json={"telegram_id": 42, "name": "Ala"})
+
+    report = await import_rows(client, [{"telegram_id": 42, "number": "7"}])
+
+    assert report["imported"] == 1
+    assert await accounts() == {"": (42, "Ala")}
+
+
+@pytest.mark.asyncio
+async def test_import_does_not_take_over_other_accounts(client):
+    await import_rows(client, [
+        {"telegram_id": 1, "wallet_address": "EQ-one", "name": "Ala"},
+        {"telegram_id": 2, "wallet_address": "EQ-two", "name": "Ola"},
+    ])
+
+    report = await import_rows(client, [
+        # telegram_id 1 ma już konto - podany portfel jest pomijany
+        {"telegram_id": 1, "wallet_address": "EQ-other", "name": "Ala K."},
+        # portfel gracza 2 nie zostaje przepięty na gracza 3
+        {"telegram_id": 3, "wallet_address": "EQ-two", "name": "Ewa"},
+    ])
+
+    assert report["imported"] == 2
+    assert await accounts() == {
+        "EQ-one": (1, "Ala K."),
+        "EQ-two": (2, "Ola"),
+        "tg_3": (3, "Ewa"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_import_counts_each_player_once(client):
+    report = await import_rows(client, [
+        {"telegram_id": 5, "name": "Jan"},
+        {"telegram_id": 5, "name": "Jan K."},
+        {"telegram_id": 6},
+    ])
+
+    assert report["imported"] == 2
+    assert await accounts() == {"tg_5": (5, "Jan K."), "tg_6": (6, None)}
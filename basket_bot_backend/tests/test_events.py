@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from basket_bot_backend.events import match_events, format_sse, EVENT_CREATED
+
+
+def parse_sse(chunk: str) -> tuple[str, dict]:
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if ": " in line)
+    return fields["event"], json.loads(fields["data"])
+
+
+@pytest.mark.asyncio
+async def test_created_event_with_schedule_reaches_subscriber(client):
+    sub = match_events.subscribe()
+    try:
+        response = await client.post("/api/matches", json={
+            "telegram_id": 1, "venue": "Hala", "slots_needed": 10, "starts_at": "2030-05-01T18:00:00",
+        })
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+
+        batch = await sub.next_batch(timeout=1)
+        assert batch is not None
+        event, data = parse_sse(format_sse(*batch[0]))
+    finally:
+        match_events.unsubscribe(sub)
+
+    assert event == EVENT_CREATED
+    assert data["match_id"] == response.json()["match_id"]
+    assert data["starts_at"] == "2030-05-01T18:00:00"
+    assert data["ends_at"] == "2030-05-01T19:30:00"
+
+
+def test_format_sse_does_not_break_on_non_json_types():
+    chunk = format_sse(1, EVENT_CREATED, {"match_id": 1, "at": datetime(2030, 1, 1), "amount": Decimal("1.5")})
+    event, data = parse_sse(chunk)
+    assert data == {"match_id": 1, "at": "2030-01-01T00:00:00", "amount": "1.5"}
@@ -0,0 +1,32 @@
+import pytest
+
+from basket_bot_backend.frontend import build_index, IMMUTABLE, REVALIDATE
+
+
+@pytest.fixture
+def dist(tmp_path):
+    for name in (
+        "index.html",
+        "tonconnect-manifest.json",
+        "favicon-dark_mode.png",
+        "assets/index-3f2a9c1b.js",
+        "assets/logo-Bx_9aQ-c.svg",
+        "assets/favicon-dark_mode.png",
+    ):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    return tmp_path
+
+
+def test_only_hashed_vite_assets_are_immutable(dist):
+    index = build_index(dist)
+
+    assert index["/assets/index-3f2a9c1b.js"].cache_control == IMMUTABLE
+    assert index["/assets/logo-Bx_9aQ-c.svg"].cache_control == IMMUTABLE
+
+    # Pliki z public/ zmieniają treść pod tą samą nazwą
+    assert index["/tonconnect-manifest.json"].cache_control == REVALIDATE
+    assert index["/favicon-dark_mode.png"].cache_control == REVALIDATE
+    assert index["/assets/favicon-dark_mode.png"].cache_control == REVALIDATE
+    assert index["/index.html"].cache_control == REVALIDATE
@@ -0,0 +1,35 @@
+import pytest
+
+from basket_bot_backend import geo
+from basket_bot_backend.auth import create_access_token
+
+
+def test_bounding_boxes_split_at_antimeridian():
+    west, east = geo.bounding_boxes(0.0, -179.99, 10)
+    assert west[1] > 179.9 and west[3] == 180.0
+    assert east[1] == -180.0 and east[3] > -179.99
+
+
+def test_bounding_boxes_cover_all_longitudes_around_pole():
+    assert geo.bounding_boxes(89.99, 10.0, 5) == [(89.99 - 5 / geo.KM_PER_DEGREE_LAT, -180.0, 90.0, 180.0)]
+
+
+def test_covering_cells_include_both_sides_of_antimeridian():
+    cells = geo.covering_cells(0.0, -179.99, 10)
+    assert any(geo.encode(0.0, 179.99).startswith(cell) for cell in cells)
+    assert any(geo.encode(0.0, -179.99).startswith(cell) for cell in cells)
+
+
+@pytest.mark.asyncio
+async def test_nearby_matches_across_antimeridian(client):
+    headers = {"Authorization": f"Bearer {create_access_token('tg_1')}"}
+    response = await client.post("/api/courts", json={"name": "Taveuni", "lat": 0.0, "lng": 179.99}, headers=headers)
+    court_id = response.json()["court"]["id"]
+    response = await client.post("/api/matches", json={
+        "telegram_id": 1, "venue": "Taveuni", "court_id": court_id, "slots_needed": 10,
+    })
+    match_id = response.json()["match_id"]
+
+    response = await client.get("/api/matches/nearby", params={"lat": 0.0, "lng": -179.99, "radius": 10})
+
+    assert [m["match_id"] for m in response.json()["matches"]] == [match_id]
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, func
+
+from basket_bot_backend.database import AsyncSessionLocal
+from basket_bot_backend.models import Match, MatchParticipant
+
+PLAYERS = 30
+
+
+@pytest.mark.asyncio
+async def test_concurrent_joins_never_overfill_match(client):
+    # Na SQLite zapisy szereguje jeden writer; TEST_DATABASE_URL=postgresql+asyncpg://...
+    # (job backend-postgres w CI) sprawdza warunkowy UPDATE na równoległych transakcjach
+    response = await client.post("/api/matches", json={"telegram_id": 1, "venue": "Hala", "slots_needed": 8})
+    match_id = response.json()["match_id"]
+
+    # Każdy gracz próbuje dwa razy - powtórne dołączenie też nie może zająć miejsca
+    joins = [
+        client.post(f"/api/matches/{match_id}/join", json={"telegram_id": 100 + i % PLAYERS})
+        for i in range(PLAYERS * 2)
+    ]
+    results = [response.json() for response in await asyncio.gather(*joins)]
+
+    async with AsyncSessionLocal() as db:
+        match = await db.get(Match, match_id)
+        participants = await db.scalar(
+            select(func.count()).select_from(MatchParticipant).where(MatchParticipant.match_id == match_id)
+        )
+        joined = set(await db.scalars(
+            select(MatchParticipant.user_wallet).where(MatchParticipant.match_id == match_id)
+        ))
+
+    successes = [r for r in results if r["status"] == "success"]
+    assert match.current_players == match.slots_needed == 8
+    assert participants == match.current_players
+    assert len(joined) == participants
+    # Organizator zajął pierwsze miejsce
+    assert len(successes) == match.slots_needed - 1
+    assert {r["message"] for r in results if r["status"] != "success"} <= {"Mecz pełny!", "Już jesteś zapisany na ten mecz"}
@@ -0,0 +1,28 @@
+import pytest
+
+from basket_bot_backend.events import match_events, EVENT_JOINED, EVENT_FULL
+from basket_bot_backend.matchmaking import run_matchmaking
+
+
+@pytest.mark.asyncio
+async def test_matchmaking_publishes_same_events_as_join(client):
+    full_match = (await client.post("/api/matches", json={"telegram_id": 1, "venue": "A", "slots_needed": 8})).json()["match_id"]
+    partial_match = (await client.post("/api/matches", json={"telegram_id": 2, "venue": "B", "slots_needed": 8})).json()["match_id"]
+    for tg_id in range(100, 110):
+        await client.post("/api/matchmaking/queue", json={"telegram_id": tg_id})
+
+    sub = match_events.subscribe()
+    try:
+        report = await run_matchmaking()
+        batch = await sub.next_batch(timeout=1)
+    finally:
+        match_events.unsubscribe(sub)
+
+    assert report.assigned_players == 10
+    events = {data["match_id"]: (event, data) for _, event, data in batch}
+    assert events[full_match] == (EVENT_FULL, {
+        "match_id": full_match, "current_players": 8, "slots_needed": 8, "slots_available": 0,
+    })
+    assert events[partial_match] == (EVENT_JOINED, {
+        "match_id": partial_match, "current_players": 4, "slots_needed": 8, "slots_available": 4,
+    })
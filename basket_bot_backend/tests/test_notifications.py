@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, delete, func
+
+from basket_bot_backend.database import AsyncSessionLocal
+from basket_bot_backend.models import MatchParticipant, NotificationOutbox
+from basket_bot_backend.notifications import NotificationQueue, enqueue_match_event, EVENT_CHANGED
+
+
+async def outbox_size() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(NotificationOutbox))
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_reschedules_match(client):
+    response = await client.post("/api/matches", json={"telegram_id": 1, "venue": "Hala", "slots_needed": 10})
+    match_id = response.json()["match_id"]
+    async with AsyncSessionLocal() as db:
+        # Bez uczestników nie ma do kogo pisać - wysyłka tylko czyści outbox
+        await db.execute(delete(MatchParticipant))
+        enqueue_match_event(db, match_id, EVENT_CHANGED, "Zmiana godziny")
+        await db.commit()
+
+    calls = 0
+
+    def flaky_sessions():
+        nonlocal calls
+        calls += 1
+        if calls == 2:  # pierwsza sesja to start(), druga - pierwsza wysyłka
+            raise RuntimeError("baza chwilowo niedostępna")
+        return AsyncSessionLocal()
+
+    queue = NotificationQueue(flaky_sessions, workers=1, batch_window=0, match_interval=0.01)
+    await queue.start()
+    try:
+        for _ in range(100):
+            if await outbox_size() == 0:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await queue.stop()
+
+    assert calls >= 3
+    assert await outbox_size() == 0
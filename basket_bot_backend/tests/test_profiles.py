@@ -0,0 +1,34 @@
+import logging
+
+import pytest
+from sqlalchemy import select, func
+
+from basket_bot_backend.database import AsyncSessionLocal
+from basket_bot_backend.models import User
+
+
+@pytest.mark.asyncio
+async def test_account_without_wallet_is_reused_by_telegram_profile(client):
+    # /api/profile bez wallet_address zakłada konto z wallet_address == ""
+    response = await client.post("/api/profile", json={"telegram_id": 42, "name": "Ala"})
+    assert response.json()["user"]["wallet_address"] == ""
+
+    response = await client.post("/api/profile/telegram", json={"telegram_id": 42, "nickname": "ala"})
+    assert response.json()["status"] == "success"
+
+    async with AsyncSessionLocal() as db:
+        accounts = await db.scalar(select(func.count()).select_from(User).where(User.telegram_id == 42))
+    assert accounts == 1
+
+    response = await client.get("/api/profile/42")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Ala"
+
+
+@pytest.mark.asyncio
+async def test_profile_body_is_not_logged(client, capsys, caplog):
+    caplog.set_level(logging.DEBUG, logger="basket_bot_backend.main")
+    await client.post("/api/profile", json={"telegram_id": 42, "name": "Ala", "wallet_address": "0:secret-wallet"})
+
+    assert "secret-wallet" not in capsys.readouterr().out
+    assert "secret-wallet" not in caplog.text
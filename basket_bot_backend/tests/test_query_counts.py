@@ -0,0 +1,72 @@
+"""
+Liczba zapytań SQL na żądanie dla endpointów profilu (przepisanych pod jedno
+zapytanie / jeden upsert). Liczymy przez database.query_observers - to samo
+źródło co metryka zapytań per żądanie w metrics.py. W trybie SQLite z osobnym
+writerem transakcja zapisu zaczyna się od BEGIN IMMEDIATE, które też się liczy;
+na innych bazach (TEST_DATABASE_URL) BEGIN wysyła sterownik poza kursorem.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from basket_bot_backend import database
+from basket_bot_backend.auth import create_access_token
+from basket_bot_backend.cache import profile_cache
+
+BEGIN = 1 if database.sqlite_tuned(database.DATABASE_URL) else 0
+
+
+@contextmanager
+def count_queries():
+    counter = {"queries": 0}
+
+    def observe(elapsed):
+        counter["queries"] += 1
+
+    database.query_observers.append(observe)
+    try:
+        yield counter
+    finally:
+        database.query_observers.remove(observe)
+
+
+async def queries(client, method, url, **kwargs) -> int:
+    with count_queries() as counter:
+        response = await client.request(method, url, **kwargs)
+    assert response.status_code == 200
+    assert response.json().get("status") != "error", response.json()
+    return counter["queries"]
+
+
+@pytest.mark.asyncio
+async def test_profile_telegram_query_counts(client):
+    # (BEGIN,) SELECT konta, INSERT tg_<id>, upsert profilu
+    assert await queries(client, "POST", "/api/profile/telegram", json={"telegram_id": 7, "nickname": "ala"}) == BEGIN + 3
+    # (BEGIN,) SELECT konta, upsert profilu
+    assert await queries(client, "POST", "/api/profile/telegram", json={"telegram_id": 7, "bio": "PG"}) == BEGIN + 2
+    # + przepisanie miasta do player_stats
+    assert await queries(client, "POST", "/api/profile/telegram", json={"telegram_id": 7, "city": "Gdańsk"}) == BEGIN + 3
+
+
+@pytest.mark.asyncio
+async def test_profile_me_query_counts(client):
+    await client.post("/api/profile/telegram", json={"telegram_id": 7, "nickname": "ala"})
+    headers = {"Authorization": f"Bearer {create_access_token('tg_7')}"}
+
+    # (BEGIN,) upsert profilu (INSERT ... SELECT FROM users ... RETURNING)
+    assert await queries(client, "POST", "/api/profile/me", json={"preferred_position": "PG"}, headers=headers) == BEGIN + 1
+
+    profile_cache.clear()
+    # Konto z profilem jednym SELECT-em (joinedload), potem z cache
+    assert await queries(client, "GET", "/api/profile/me", headers=headers) == 1
+    assert await queries(client, "GET", "/api/profile/me", headers=headers) == 0
+
+
+@pytest.mark.asyncio
+async def test_profile_by_telegram_id_query_counts(client):
+    # (BEGIN,) SELECT konta, INSERT, odświeżenie po commicie
+    assert await queries(client, "POST", "/api/profile", json={"telegram_id": 7, "name": "Ala"}) == BEGIN + 3
+
+    profile_cache.clear()
+    assert await queries(client, "GET", "/api/profile/7") == 1
+    assert await queries(client, "GET", "/api/profile/7") == 0
@@ -0,0 +1,90 @@
+import httpx
+import pytest
+
+from basket_bot_backend import telegram_client
+from basket_bot_backend.telegram_client import TelegramClient, TelegramAPIError
+from basket_bot_backend.telegram_stub import TelegramStub
+
+
+class FlakyNetwork(httpx.AsyncBaseTransport):
+    """Przed stubem: kolejne żądania dostają najpierw podane wyjątki / odpowiedzi sieci."""
+
+    def __init__(self, stub: TelegramStub, *outcomes):
+        self.inner = httpx.ASGITransport(app=stub.app)
+        self.outcomes = list(outcomes)
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        if self.outcomes:
+            outcome = self.outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(telegram_client, "BACKOFF_BASE", 0)
+    return TelegramStub()
+
+
+def make_client(network: FlakyNetwork) -> TelegramClient:
+    return TelegramClient("token", base_url="http://stub", transport=network, global_rate=1000, per_chat_interval=0)
+
+
+@pytest.mark.asyncio
+async def test_send_message_reaches_stub(stub):
+    client = make_client(FlakyNetwork(stub))
+    try:
+        result = await client.send_message(1, "Mecz pełny")
+    finally:
+        await client.close()
+    assert result["chat"] == {"id": 1}
+    assert stub.calls == [("sendMessage", {"chat_id": 1, "text": "Mecz pełny"})]
+
+
+@pytest.mark.asyncio
+async def test_read_timeout_is_not_retried(stub):
+    network = FlakyNetwork(stub, httpx.ReadTimeout("timed out"))
+    client = make_client(network)
+    try:
+        with pytest.raises(TelegramAPIError):
+            await client.send_message(1, "Mecz pełny")
+    finally:
+        await client.close()
+    assert network.requests == 1
+    assert stub.calls == []
+
+
+@pytest.mark.asyncio
+async def test_connect_errors_and_server_errors_are_retried(stub):
+    stub.fail(429, "Too Many Requests: retry later", retry_after=0)
+    network = FlakyNetwork(
+        stub,
+        httpx.ConnectError("refused"),
+        httpx.Response(502, text="<html>Bad Gateway</html>"),  # strona błędu z proxy, nie JSON
+    )
+    client = make_client(network)
+    try:
+        result = await client.send_message(1, "Mecz pełny")
+    finally:
+        await client.close()
+    assert result["message_id"] == 1
+    assert network.requests == 4  # MAX_RETRIES = 3
+    assert len(stub.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(stub):
+    stub.fail(403, "Forbidden: bot was blocked by the user")
+    network = FlakyNetwork(stub)
+    client = make_client(network)
+    try:
+        with pytest.raises(TelegramAPIError) as error:
+            await client.send_message(1, "Mecz pełny")
+    finally:
+        await client.close()
+    assert error.value.error_code == 403
+    assert network.requests == 1
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from basket_bot_backend import telegram_updates
+from basket_bot_backend.telegram_client import TelegramAPIError
+from basket_bot_backend.telegram_updates import UpdateQueue
+
+
+class FlakyBotAPI:
+    """deleteWebhook zawodzi przy pierwszej próbie, getUpdates oddaje jeden update."""
+
+    def __init__(self):
+        self.calls = []
+        self.updates = [[{"update_id": 10, "message": {"text": "/start"}}]]
+
+    async def call(self, method, payload, chat_id=None, timeout=None):
+        self.calls.append(method)
+        if method == "deleteWebhook" and self.calls.count(method) == 1:
+            raise TelegramAPIError(method, None, "ConnectError")
+        if method == "getUpdates" and not self.updates:
+            await asyncio.Event().wait()  # long polling bez nowych update'ów
+        return self.updates.pop(0) if method == "getUpdates" else True
+
+
+@pytest.mark.asyncio
+async def test_polling_survives_failed_delete_webhook(monkeypatch):
+    monkeypatch.setattr(telegram_updates, "POLL_RETRY_DELAY", 0)
+    api = FlakyBotAPI()
+    queue = UpdateQueue(workers=0)
+
+    task = asyncio.create_task(queue.poll(api))
+    try:
+        for _ in range(100):
+            if queue.stats()["queued"]:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert api.calls[:3] == ["deleteWebhook", "deleteWebhook", "getUpdates"]
+    assert queue.stats()["queued"] == 1
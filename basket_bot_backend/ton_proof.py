@@ -0,0 +1,382 @@
+"""
+Logowanie portfelem TON: weryfikacja ton_proof z TON Connect.
+
+1. POST /api/auth/challenge zwraca payload - losowy nonce z terminem ważności,
+   podpisany HMAC-iem (SECRET_KEY), więc sprawdzi go każdy worker bez stanu.
+2. Portfel podpisuje ed25519 wiadomość "ton-proof-item-v2/" z adresem, domeną
+   aplikacji, czasem i payloadem; klient wysyła podpis i state_init portfela.
+3. Backend sprawdza, że hash state_init to hash z adresu (state_init należy do
+   portfela), czyta z niego klucz publiczny i weryfikuje podpis.
+
+Parsowanie BOC i ed25519 to czysty CPU - idą do ograniczonej puli wątków albo
+procesów (TON_VERIFY_EXECUTOR), żeby fala logowań nie blokowała pętli zdarzeń.
+Klucz publiczny portfela trafia do cache - przy kolejnym logowaniu zostaje
+samo ed25519. Zużyty payload jest pamiętany do końca ważności (per proces),
+więc przechwyconego dowodu nie da się użyć drugi raz.
+
+    python -m basket_bot_backend.benchmarks.ton_verify
+"""
+import os
+import hmac
+import time
+import base64
+import asyncio
+import hashlib
+import secrets
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlparse
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from .auth import SECRET_KEY
+from .cache import TTLCache, MISSING
+
+TON_PROOF_TTL = int(os.getenv("TON_PROOF_TTL", "300"))
+_webapp_host = urlparse(os.getenv("WEBAPP_URL", "https://hca-production.up.railway.app")).netloc
+TON_PROOF_DOMAINS = {d.strip() for d in os.getenv("TON_PROOF_DOMAINS", _webapp_host).split(",") if d.strip()}
+TON_VERIFY_EXECUTOR = os.getenv("TON_VERIFY_EXECUTOR", "thread")  # thread | process
+TON_VERIFY_WORKERS = int(os.getenv("TON_VERIFY_WORKERS", str(os.cpu_count() or 1)))
+# Weryfikacje czekające na pulę; ponad limit logowanie od razu dostaje błąd
+TON_VERIFY_MAX_PENDING = int(os.getenv("TON_VERIFY_MAX_PENDING", "256"))
+TON_PUBKEY_CACHE_SIZE = int(os.getenv("TON_PUBKEY_CACHE_SIZE", "10000"))
+TON_PUBKEY_CACHE_TTL = float(os.getenv("TON_PUBKEY_CACHE_TTL", "3600"))
+CLOCK_SKEW = 60
+
+PROOF_PREFIX = b"ton-proof-item-v2/"
+CONNECT_PREFIX = b"\xff\xffton-connect"
+BOC_MAGIC = bytes.fromhex("b5ee9c72")
+NONCE_BYTES = 16
+MAC_BYTES = 16
+
+# Hash kodu kontraktu portfela -> pozycja (w bitach) klucza publicznego w danych
+WALLET_PUBKEY_OFFSETS = {
+    # v3R1, v3R2: seqno:uint32 subwallet_id:uint32 public_key:bits256
+    bytes.fromhex("b61041a58a7980b946e8fb9e198e3c904d24799ffa36574ea4251c41a566f581"): 64,
+    bytes.fromhex("84dafa449f98a6987789ba232358072bc0f76dc4524002a5d0918b9a75d2d599"): 64,
+    # v4R2: jak v3 + słownik pluginów
+    bytes.fromhex("feb5ff6820e2ff0d9483e7e0d62c817d846789fb4ae580c878866d959dabd5c0"): 64,
+    # v5R1 (W5): is_signature_allowed:bit seqno:uint32 wallet_id:uint32 public_key:bits256
+    bytes.fromhex("20834b7b72b112147e1b2fb457b84e74d1a30f04f737d4f62a668e9552d2b72f"): 65,
+}
+
+
+class ProofError(ValueError):
+    """Dowód odrzucony - treść trafia do odpowiedzi logowania."""
+
+
+# --- ADRESY ---
+
+def crc16(data: bytes) -> int:
+    """CRC-16/XMODEM z adresów user-friendly."""
+    crc = 0
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        crc &= 0xFFFF
+    return crc
+
+
+def parse_address(address: str) -> tuple[int, bytes]:
+    """'0:<hex>' albo postać user-friendly (base64/base64url) -> (workchain, hash)."""
+    try:
+        if ":" in address:
+            workchain, _, account = address.partition(":")
+            workchain, account_hash = int(workchain), bytes.fromhex(account)
+        else:
+            raw = base64.urlsafe_b64decode(address.replace("+", "-").replace("/", "_") + "=" * (-len(address) % 4))
+            if len(raw) != 36 or crc16(raw[:34]).to_bytes(2, "big") != raw[34:]:
+                raise ValueError
+            workchain, account_hash = int.from_bytes(raw[1:2], "big", signed=True), raw[2:34]
+    except ValueError:
+        raise ProofError("Nieprawidłowy adres portfela") from None
+    if len(account_hash) != 32:
+        raise ProofError("Nieprawidłowy adres portfela")
+    return workchain, account_hash
+
+
+def raw_address(workchain: int, account_hash: bytes) -> str:
+    """Postać '0:<hex>' - jeden klucz konta niezależnie od tego, jak portfel podał adres."""
+    return f"{workchain}:{account_hash.hex()}"
+
+
+# --- KOMÓRKI (BOC) ---
+
+@dataclass
+class Cell:
+    descriptor: bytes  # d1, d2 - razem z danymi wchodzą do hasha
+    data: bytes  # z bitem zakończenia, jak w BOC
+    bit_length: int
+    refs: list["Cell"]
+    depth: int = 0
+    hash: bytes = b""
+
+
+class BitReader:
+    def __init__(self, cell: Cell):
+        self._value = int.from_bytes(cell.data, "big")
+        self._total = len(cell.data) * 8
+        self._length = cell.bit_length
+        self.pos = 0
+
+    def read(self, bits: int) -> int:
+        if self.pos + bits > self._length:
+            raise ProofError("Nieprawidłowy state_init")
+        self.pos += bits
+        return (self._value >> (self._total - self.pos)) & ((1 << bits) - 1)
+
+
+def parse_boc(raw: bytes) -> Cell:
+    """Korzeń jednokorzeniowego BOC ze zwykłych komórek, z policzonymi hashami."""
+    if raw[:4] != BOC_MAGIC or len(raw) < 6:
+        raise ProofError("Nieprawidłowy state_init")
+    flags, offset_size = raw[4], raw[5]
+    size = flags & 7
+    pos = 6
+
+    def read_int(length: int) -> int:
+        nonlocal pos
+        if pos + length > len(raw):
+            raise ProofError("Nieprawidłowy state_init")
+        value = int.from_bytes(raw[pos:pos + length], "big")
+        pos += length
+        return value
+
+    cell_count, root_count = read_int(size), read_int(size)
+    read_int(size)  # absent
+    read_int(offset_size)  # łączny rozmiar komórek
+    if root_count != 1:
+        raise ProofError("Nieprawidłowy state_init")
+    root_index = read_int(size)
+    if flags & 0x80:
+        pos += cell_count * offset_size  # indeks offsetów komórek
+
+    cells, ref_indexes = [], []
+    for index in range(cell_count):
+        d1, d2 = read_int(1), read_int(1)
+        # Tylko zwykłe komórki poziomu 0 bez zapisanych hashy - takie są w state_init portfeli
+        if d1 & 0xF8 or (d1 & 7) > 4:
+            raise ProofError("Nieobsługiwany state_init")
+        data_length = (d2 + 1) // 2
+        data = raw[pos:pos + data_length]
+        pos += data_length
+        if len(data) != data_length:
+            raise ProofError("Nieprawidłowy state_init")
+        bit_length = data_length * 8
+        if d2 & 1:
+            # Niepełny ostatni bajt: dane, potem bit 1 i zera
+            if not data[-1]:
+                raise ProofError("Nieprawidłowy state_init")
+            bit_length -= (data[-1] & -data[-1]).bit_length()
+        refs = [read_int(size) for _ in range(d1 & 7)]
+        if any(ref <= index or ref >= cell_count for ref in refs):
+            raise ProofError("Nieprawidłowy state_init")
+        cells.append(Cell(bytes((d1, d2)), data, bit_length, []))
+        ref_indexes.append(refs)
+
+    # Referencje wskazują dalej w liście - hashe liczymy od końca
+    for cell, refs in zip(reversed(cells), reversed(ref_indexes)):
+        cell.refs = [cells[ref] for ref in refs]
+        cell.depth = 1 + max(ref.depth for ref in cell.refs) if cell.refs else 0
+        digest = hashlib.sha256(cell.descriptor + cell.data)
+        for ref in cell.refs:
+            digest.update(ref.depth.to_bytes(2, "big"))
+        for ref in cell.refs:
+            digest.update(ref.hash)
+        cell.hash = digest.digest()
+    if root_index >= cell_count:
+        raise ProofError("Nieprawidłowy state_init")
+    return cells[root_index]
+
+
+def wallet_public_key(state_init: bytes, account_hash: bytes) -> bytes:
+    root = parse_boc(state_init)
+    if not hmac.compare_digest(root.hash, account_hash):
+        raise ProofError("state_init nie należy do tego adresu")
+
+    # StateInit: split_depth:(Maybe ## 5) special:(Maybe TickTock) code:(Maybe ^Cell) data:(Maybe ^Cell) ...
+    bits, refs = BitReader(root), iter(root.refs)
+    if bits.read(1):
+        bits.read(5)
+    if bits.read(1):
+        bits.read(2)
+    code = next(refs, None) if bits.read(1) else None
+    data = next(refs, None) if bits.read(1) else None
+
+    offset = WALLET_PUBKEY_OFFSETS.get(code.hash) if code is not None else None
+    if offset is None or data is None:
+        raise ProofError("Nieobsługiwany typ portfela")
+    bits = BitReader(data)
+    bits.read(offset)
+    return bits.read(256).to_bytes(32, "big")
+
+
+# --- PODPIS ---
+
+@dataclass
+class ProofJob:
+    """Zadanie dla puli - same bajty i liczby, żeby przechodziło przez pickle."""
+    workchain: int
+    account_hash: bytes
+    domain: bytes
+    timestamp: int
+    payload: bytes
+    signature: bytes
+    state_init: bytes
+    public_key: bytes | None = None  # z cache - pomija parsowanie state_init
+
+
+def proof_digest(job: ProofJob) -> bytes:
+    message = b"".join((
+        PROOF_PREFIX,
+        job.workchain.to_bytes(4, "big", signed=True),
+        job.account_hash,
+        len(job.domain).to_bytes(4, "little"),
+        job.domain,
+        job.timestamp.to_bytes(8, "little"),
+        job.payload,
+    ))
+    return hashlib.sha256(CONNECT_PREFIX + hashlib.sha256(message).digest()).digest()
+
+
+def check_signature(job: ProofJob) -> bytes:
+    """Uruchamiane w puli: zwraca klucz publiczny portfela albo rzuca ProofError."""
+    public_key = job.public_key or wallet_public_key(job.state_init, job.account_hash)
+    try:
+        Ed25519PublicKey.from_public_bytes(public_key).verify(job.signature, proof_digest(job))
+    except InvalidSignature:
+        raise ProofError("Nieprawidłowy podpis") from None
+    return public_key
+
+
+# --- WYZWANIA ---
+
+def _mac(body: bytes) -> bytes:
+    return hmac.new(SECRET_KEY.encode(), b"ton-proof/" + body, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def new_challenge(now: float | None = None) -> tuple[str, int]:
+    """(payload do podpisania, termin ważności jako unix time)."""
+    expires_at = int((now or time.time()) + TON_PROOF_TTL)
+    body = secrets.token_bytes(NONCE_BYTES) + expires_at.to_bytes(8, "big")
+    return (body + _mac(body)).hex(), expires_at
+
+
+def challenge_expiry(payload: str, now: float) -> int:
+    """Termin ważności wyzwania wydanego przez backend; ProofError dla obcych i wygasłych."""
+    try:
+        raw = bytes.fromhex(payload)
+    except ValueError:
+        raw = b""
+    body, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if len(raw) != NONCE_BYTES + 8 + MAC_BYTES or not hmac.compare_digest(mac, _mac(body)):
+        raise ProofError("Nieznany payload - pobierz nowe wyzwanie")
+    expires_at = int.from_bytes(body[NONCE_BYTES:], "big")
+    if expires_at < now:
+        raise ProofError("Wyzwanie wygasło - pobierz nowe")
+    return expires_at
+
+
+class NonceStore:
+    """
+    Zużyte wyzwania do końca ich ważności. Wpisy wygasają w kolejności dodania
+    (wszystkie wyzwania mają ten sam TTL), więc sprzątanie zdejmuje je z początku.
+    """
+
+    def __init__(self):
+        self._expiry: OrderedDict[str, float] = OrderedDict()
+
+    def use(self, nonce: str, expires_at: float, now: float) -> bool:
+        """False, jeśli wyzwanie już raz posłużyło do logowania."""
+        while self._expiry and next(iter(self._expiry.values())) < now:
+            self._expiry.popitem(last=False)
+        if nonce in self._expiry:
+            return False
+        self._expiry[nonce] = expires_at
+        return True
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+used_nonces = NonceStore()
+public_keys = TTLCache(TON_PUBKEY_CACHE_SIZE, TON_PUBKEY_CACHE_TTL)
+counters = {"verified": 0, "rejected": 0, "overloaded": 0}
+_executor: Executor | None = None
+_pending = 0
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if TON_VERIFY_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=TON_VERIFY_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=TON_VERIFY_WORKERS, thread_name_prefix="ton-verify")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_check(job: ProofJob) -> bytes:
+    global _pending
+    if _pending >= TON_VERIFY_MAX_PENDING:
+        counters["overloaded"] += 1
+        raise ProofError("Zbyt wiele logowań naraz - spróbuj za chwilę")
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), check_signature, job)
+    finally:
+        _pending -= 1
+
+
+async def verify_proof(
+    address: str, timestamp: int, domain: str, domain_length: int, payload: str, signature: str, state_init: str,
+) -> str:
+    """
+    Rzuca ProofError, jeśli dowód nie potwierdza kontroli nad portfelem `address`.
+    Zwraca adres w postaci surowej (raw_address) - ten, dla którego sprawdzono state_init.
+    """
+    try:
+        now = time.time()
+        if domain not in TON_PROOF_DOMAINS or domain_length != len(domain.encode()):
+            raise ProofError("Dowód wystawiony dla innej domeny")
+        if not now - TON_PROOF_TTL <= timestamp <= now + CLOCK_SKEW:
+            raise ProofError("Dowód jest przeterminowany")
+        expires_at = challenge_expiry(payload, now)
+        workchain, account_hash = parse_address(address)
+        try:
+            raw_signature = base64.b64decode(signature, validate=True)
+            raw_state_init = base64.b64decode(state_init, validate=True)
+        except ValueError:
+            raise ProofError("Nieprawidłowe kodowanie podpisu lub state_init") from None
+
+        job = ProofJob(workchain, account_hash, domain.encode(), timestamp, payload.encode(), raw_signature, raw_state_init)
+        cached = public_keys.get(account_hash)
+        if cached is not MISSING:
+            job.public_key = cached
+        public_keys.set(account_hash, await run_check(job))
+
+        # Po podpisie, nie przed - inaczej obcy mógłby "zużywać" cudze wyzwania
+        if not used_nonces.use(payload, expires_at, now):
+            raise ProofError("Ten dowód został już użyty")
+    except ProofError:
+        counters["rejected"] += 1
+        raise
+    counters["verified"] += 1
+    return raw_address(workchain, account_hash)
+
+
+def stats() -> dict:
+    return {
+        **counters,
+        "pending": _pending,
+        "used_nonces": len(used_nonces),
+        "pubkey_cache_size": public_keys.stats()["size"],
+    }